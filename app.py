@@ -1,8 +1,12 @@
 """Flask App for Water Mate."""
 
 import os
+import logging
 from flask import Flask, jsonify
-from models import connect_db
+from sqlalchemy.exc import OperationalError
+from models import connect_db, upgrade_schema
+from seasonal_tables import get_seasonal_table, WATER_INTERVAL_PROVIDER
+from gazetteer import get_gazetteer
 from custom_json_encoder import CustomJSONEncoder
 # from flask_debugtoolbar import DebugToolbarExtension
 from flask_cors import CORS
@@ -35,6 +39,9 @@ app.register_blueprint(plant, url_prefix='/plant')
 from blueprints.schedule import schedule
 app.register_blueprint(schedule, url_prefix='/schedule')
 
+from blueprints.commands import commands
+app.register_blueprint(commands)
+
 #set database uri identifier
 uri = os.getenv('DATABASE_URL', 'postgresql:///water_mate_react')
 if uri.startswith('postgres://'):
@@ -52,6 +59,19 @@ app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0 #Disables Flask file caching
 #connect app to database
 connect_db(app)
 
+#create missing tables and columns before any request queries them, an unreachable database fails the requests instead
+try:
+    upgrade_schema()
+except OperationalError as err:
+    logging.error(f'Database schema could not be upgraded: {err}')
+
+#load the seasonal water interval table once at startup so the water endpoint does not need solar calculations
+if WATER_INTERVAL_PROVIDER == 'table':
+    get_seasonal_table()
+
+#load the city gazetteer once at startup so signups can be geocoded offline
+get_gazetteer()
+
 ####################
 # Error Handling
 # Routes
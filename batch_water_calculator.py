@@ -0,0 +1,173 @@
+"""Batch Water Calculator & helper methods.
+
+Calculates the next water interval for many plants at once. Plants in the same solar cell (see solar_cells) with the
+same light type and the same forecast window (the days after the water date for the water interval) share one light
+forecast for the center of the cell, and the threshold adjustments of WaterCalculator.calculate_water_interval are
+evaluated for every plant at once. Records with the saved average light hours of their forecast window (see
+recompute.add_saved_average_hours) use them instead of a forecast.
+
+The calculations only use plain records so they can run in worker processes without the database."""
+
+import numpy as np
+from datetime import timedelta
+from solar_batch import LIGHT_COEFFICIENTS, get_daily_light_hours
+from solar_cells import get_cell_id, get_cell_center
+
+
+def get_record(water_schedule, plant_type, light_type, user):
+    """Returns the plain record of the inputs calculate_water_intervals needs for a plant."""
+
+    return {'latitude': float(user.latitude),
+            'longitude': float(user.longitude),
+            'solar_cell': user.solar_cell,
+            'water_date': water_schedule.water_date,
+            'water_interval': water_schedule.water_interval,
+            'light_type': light_type,
+            'base_sunlight': plant_type.base_sunlight,
+            'max_days_without_water': plant_type.max_days_without_water}
+
+
+def get_forecast_key(record):
+    """Returns the (solar cell, light type, first date, number of days) of the light forecast for a record,
+    or None if the record has no solar forecast (Artificial light or no water interval).
+    Records without a saved solar cell use the cell of their coordinates."""
+
+    if record['light_type'] not in LIGHT_COEFFICIENTS or record['water_interval'] < 1:
+        return None
+
+    water_date = record['water_date']
+    first_date = (water_date.date() if hasattr(water_date, 'date') else water_date) + timedelta(days=1)
+
+    solar_cell = record.get('solar_cell')
+    if solar_cell is None:
+        solar_cell = get_cell_id(record['latitude'], record['longitude'])
+
+    return (solar_cell,
+            record['light_type'],
+            first_date,
+            record['water_interval'])
+
+
+def get_average_light_hours(forecast_keys):
+    """Accepts a list of distinct forecast keys, calculates every forecast at once and returns an array of the
+    average daily light hours of each forecast window."""
+
+    solar_cells, light_types, first_dates, water_intervals = zip(*forecast_keys)
+    latitudes, longitudes = zip(*map(get_cell_center, solar_cells))
+    water_intervals = np.array(water_intervals)
+
+    light_hours = get_daily_light_hours(latitudes, longitudes, first_dates, water_intervals.max(), light_types)
+    in_window = np.arange(light_hours.shape[1]) < water_intervals[:, np.newaxis]
+
+    return np.where(in_window, light_hours, 0).sum(axis=1) / water_intervals
+
+
+def get_adjustments(differences):
+    """Vectorized threshold adjustments of WaterCalculator.calculate_water_interval. Accepts an array of the average
+    light hours minus the plant type's base sunlight, returns an array of the days to add to each water interval.
+
+    Differences between the thresholds (from 9 to 10 hours either way) are not adjusted, like the single plant
+    calculation."""
+
+    res = np.asarray(differences, dtype=float)
+
+    conditions = [(res >= 0) & (res < 1), (res >= 1) & (res < 3), (res >= 3) & (res < 6), (res >= 6) & (res < 9),
+                  res >= 10,
+                  (res < 0) & (res > -1), (res <= -1) & (res > -3), (res <= -3) & (res > -6), (res <= -6) & (res > -9),
+                  res <= -10]
+    adjustments = [0, -1, -2, -7, -20,
+                   0, 1, 2, 7, 20]
+
+    return np.select(conditions, adjustments, default=0)
+
+
+def get_adjustment(difference):
+    """Returns the days to add to a water interval for one difference, the scalar version of get_adjustments."""
+
+    if difference >= 0:
+        if difference < 1:
+            return 0
+        if difference < 3:
+            return -1
+        if difference < 6:
+            return -2
+        if difference < 9:
+            return -7
+        return -20 if difference >= 10 else 0
+
+    if difference > -1:
+        return 0
+    if difference > -3:
+        return 1
+    if difference > -6:
+        return 2
+    if difference > -9:
+        return 7
+    return 20 if difference <= -10 else 0
+
+
+def limit_water_intervals(water_intervals, max_days_without_water):
+    """Vectorized water interval limits of WaterCalculator.calculate_water_interval: an interval never exceeds the
+    plant type's max_days_without_water and resets to 3 days if it is not positive."""
+
+    water_intervals = np.asarray(water_intervals)
+    water_intervals = np.where(water_intervals >= max_days_without_water, max_days_without_water, water_intervals)
+
+    return np.where(water_intervals <= 0, 3, water_intervals)
+
+
+def calculate_water_intervals(records):
+    """Calculates the new water interval of every record.
+
+    Accepts a list of records (see get_record), returns a list of the new water intervals in the same order, with
+    None for the records without a solar forecast. Records with 'saved_average_hours' are not forecast."""
+
+    forecast_keys = [get_forecast_key(record) for record in records]
+    indexes = [i for i, key in enumerate(forecast_keys) if key]
+    if not indexes:
+        return [None] * len(records)
+
+    planned = [records[i] for i in indexes]
+
+    distinct_keys = list(dict.fromkeys(forecast_keys[i] for i, record in zip(indexes, planned)
+                                       if record.get('saved_average_hours') is None))
+    average_hours = dict(zip(distinct_keys, get_average_light_hours(distinct_keys))) if distinct_keys else {}
+
+    light_hours = [average_hours[forecast_keys[i]] if record.get('saved_average_hours') is None
+                   else record['saved_average_hours'] for i, record in zip(indexes, planned)]
+
+    differences = np.array(light_hours) - [record['base_sunlight'] for record in planned]
+    water_intervals = np.array([record['water_interval'] for record in planned]) + get_adjustments(differences)
+    water_intervals = limit_water_intervals(
+        water_intervals, np.array([record['max_days_without_water'] for record in planned]))
+
+    new_water_intervals = [None] * len(records)
+    for i, water_interval in zip(indexes, water_intervals):
+        new_water_intervals[i] = int(water_interval)
+
+    return new_water_intervals
+
+
+class BatchWaterCalculator:
+    """A class to make water schedule calculations for many plants at once.
+    Takes a list of (water_schedule, plant_type, light_type, user) tuples, like prefetch.get_due_schedules returns."""
+
+    def __init__(self, plants):
+        self.plants = plants
+        self.records = [get_record(*plant) for plant in plants]
+
+    @property
+    def forecast_count(self):
+        """Returns the number of distinct light forecasts the plants need."""
+
+        return len(set(filter(None, map(get_forecast_key, self.records))))
+
+    def calculate_water_intervals(self):
+        """Calculates and returns a dict of the new water interval for each water schedule id.
+        Water schedules without a solar forecast (Artificial light) are left out."""
+
+        new_water_intervals = calculate_water_intervals(self.records)
+
+        return {water_schedule.id: water_interval
+                for (water_schedule, *_), water_interval in zip(self.plants, new_water_intervals)
+                if water_interval is not None}
@@ -0,0 +1,102 @@
+"""Benchmark the water, signup and plant upload paths against the local fake services.
+
+    python -m benchmarks.bench_external --requests 200 --concurrency 8 --latency 0.05 --jitter 0.01
+
+Starts the fakes from fake_services.py in this process, points the app at them, and reports the throughput and
+latency of SolarCalculator.get_solar_schedule (remote provider), UserLocation.get_coordinates and
+Uploader.upload_image. Use the same --seed to reproduce a run."""
+
+import argparse
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from fake_services import FakeServiceConfig, start_fake_server
+
+
+def start_fakes(args):
+    """Starts the fake services and sets the environment so the app modules use them when they are imported."""
+
+    servers = {}
+    for service in ['solar', 'mapquest', 's3']:
+        config = FakeServiceConfig(args.latency, args.jitter, args.error_rate, args.rate_limit, args.seed)
+        servers[service] = start_fake_server(service, config=config)
+
+    os.environ['SUNRISE_SUNSET_URL'] = servers['solar'][1]
+    os.environ['MAPQUEST_URL'] = servers['mapquest'][1]
+    os.environ['S3_ENDPOINT_URL'] = servers['s3'][1]
+    os.environ.setdefault('S3_BUCKET', 'water-mate-bench')
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'bench')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'bench')
+
+    return servers
+
+
+def run(name, operation, requests, concurrency):
+    """Runs the operation requests times on concurrency threads and prints the throughput and latency percentiles."""
+
+    def timed(i):
+        start = time.perf_counter()
+        operation(i)
+        return time.perf_counter() - start
+
+    # one untimed call first, boto3's default session is not safe to set up from several threads at once
+    operation(requests)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = sorted(executor.map(timed, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f'{name:<22} {requests / elapsed:>9.1f} ops/s   p50 {percentile(0.5):>8.1f} ms   '
+          f'p95 {percentile(0.95):>8.1f} ms   p99 {percentile(0.99):>8.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--days', type=int, default=21, help='water interval of each solar schedule')
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--rate-limit', type=float, default=0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    start_fakes(args)
+
+    # imported after the environment points at the fakes
+    from solar_calculator import SolarCalculator
+    from location import UserLocation
+    from uploader import Uploader
+
+    def water(i):
+        SolarCalculator(
+            user_location={"latitude": 47.466748, "longitude": -122.34722},
+            current_date=datetime(2021, 5, 1) + timedelta(days=i),
+            water_interval=args.days,
+            light_type='South',
+            provider='remote').get_solar_schedule()
+
+    def signup(i):
+        UserLocation(city=f'City {i}', state='WA', country='US').get_coordinates()
+
+    def upload(i):
+        image = io.BytesIO(b'0' * 50000)
+        image.filename = f'plant-{i}.png'
+        Uploader(1).upload_image('uploads/user/1/', image)
+
+    print(f'{args.requests} requests, concurrency {args.concurrency}, latency {args.latency}s +/- {args.jitter}s, '
+          f'error rate {args.error_rate}, rate limit {args.rate_limit or "none"}')
+    run(f'water ({args.days} days)', water, args.requests, args.concurrency)
+    run('signup geocoding', signup, args.requests, args.concurrency)
+    run('plant image upload', upload, args.requests, args.concurrency)
+
+
+if __name__ == '__main__':
+    main()
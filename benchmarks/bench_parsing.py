@@ -0,0 +1,134 @@
+"""Benchmark parsing the Sunset and sunrise times API results of one day.
+
+    python -m benchmarks.bench_parsing --days 10000 --repeat 5
+
+Compares the 12-hour formatted results the remote provider used to request (convert_str_to_datetime and
+convert_12_to_24 for each field, kept here since the remote provider no longer uses them) with the formatted=0 ISO-8601
+results parsed by parse_iso_datetime, on results generated offline with the NOAA solar equations, and reports the cost
+per day of each."""
+
+import argparse
+import time
+from datetime import date, datetime, timedelta
+from solar_position import get_solar_times
+from solar_calculator import SolarCalculator
+
+
+def convert_str_to_datetime(date, time):
+    """Takes a date object and a time string, combines both into a string then returns the datetime object."""
+
+    converted_time = None
+    # added this condition to account for total_daylight case which does not have AM/PM.
+    if time[-2:] != 'AM' and time[-2:] != 'PM':
+        converted_time = time
+    elif time[1] == ':':
+        length = len(time)
+        new_time = time.zfill(length + 1)
+        converted_time = convert_12_to_24(new_time)
+    else:
+        converted_time = convert_12_to_24(time)
+
+    date_time_str = date.strftime('%Y-%m-%d') + ' ' + converted_time
+
+    return datetime.strptime(date_time_str, '%Y-%m-%d %H:%M:%S')
+
+
+def convert_12_to_24(string):
+    """Accepts a string, evaluates the string and converts from 12 hour to 24 hour time.
+    Solution found here: https://www.geeksforgeeks.org/python-program-convert-time-12-hour-24-hour-format/."""
+
+    # Check if last two elements of time is AM and first two elements are 12
+    if string[-2:] == 'AM' and string[:2] == '12':
+        return '00' + string[2:-3]
+    # remove the AM
+    if string[-2:] == 'AM':
+        return string[:-3]
+    # Check if last two elements of time is PM and first two elements are 12
+    if string[-2:] == 'PM' and string[:2] == '12':
+        return string[:-3]
+    # add 12 to hours and remove PM
+    return str(int(string[:2]) + 12) + string[2:8]
+
+
+def get_results(day, latitude, longitude):
+    """Returns the formatted=1 and formatted=0 API results of a day, like fake_services.py."""
+
+    times = get_solar_times(latitude, longitude, day)
+
+    def moment(minutes):
+        return datetime(day.year, day.month, day.day) + timedelta(seconds=round(minutes * 60))
+
+    day_length = min(round(times['day_length'] * 60), 86399)
+    formatted = {key: moment(times[key]).strftime('%I:%M:%S %p').lstrip('0')
+                 for key in ('sunrise', 'sunset', 'solar_noon')}
+    iso = {key: moment(times[key]).strftime('%Y-%m-%dT%H:%M:%S+00:00') for key in ('sunrise', 'sunset', 'solar_noon')}
+
+    formatted['day_length'] = str(timedelta(seconds=day_length))
+    iso['day_length'] = day_length
+
+    return formatted, iso
+
+
+def convert_formatted_results(day, results, utc_diff):
+    """The previous conversion of the formatted=1 results of a day."""
+
+    def place(time):
+        date_time = convert_str_to_datetime(day, time)
+        local_date = (date_time + timedelta(hours=utc_diff)).date()
+        return date_time + timedelta(days=(date(day.year, day.month, day.day) - local_date).days)
+
+    return {'date': day,
+            'sunrise': place(results['sunrise']),
+            'sunset': place(results['sunset']),
+            'solar_noon': place(results['solar_noon']),
+            'day_length': convert_str_to_datetime(day, results['day_length'])}
+
+
+def run(name, convert, days, payloads, repeat):
+    """Converts every payload repeat times and prints the best time per day."""
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for day, results in zip(days, payloads):
+            convert(day, results)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    per_day = best / len(days) * 1000000
+    print(f'{name:<22} {per_day:>8.2f} us/day')
+    return per_day
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--latitude', type=float, default=47.466748)
+    parser.add_argument('--longitude', type=float, default=-122.34722)
+    args = parser.parse_args()
+
+    calculator = SolarCalculator(
+        user_location={"latitude": args.latitude, "longitude": args.longitude},
+        current_date=datetime(2021, 1, 1),
+        water_interval=1,
+        light_type='South',
+        provider='remote')
+
+    days = [datetime(2021, 1, 1) + timedelta(days=i % 3650) for i in range(args.days)]
+    formatted, iso = zip(*(get_results(day, args.latitude, args.longitude) for day in days))
+    utc_diff = -7
+
+    # both conversions must place every time on the same datetime
+    for day, before, after in zip(days[:366], formatted, iso):
+        assert convert_formatted_results(day, before, utc_diff) == calculator.convert_remote_results(day, after)
+
+    print(f'{args.days} days, best of {args.repeat}')
+    before = run('formatted (12-hour)', lambda day, results:
+                 convert_formatted_results(day, results, utc_diff), days, formatted, args.repeat)
+    after = run('formatted=0 (ISO-8601)', calculator.convert_remote_results, days, iso, args.repeat)
+    print(f'speedup {before / after:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -4,8 +4,10 @@ from functools import wraps
 from flask import Blueprint, request
 from flask.json import jsonify
 from sqlalchemy.exc import IntegrityError
-from models import db, User
+from models import db, User, GeocodeCache
 from location import UserLocation
+from shared_cache import get_shared_cache
+from gazetteer import get_gazetteer
 from uploader import Uploader
 
 auth = Blueprint('auth', __name__)
@@ -64,7 +66,8 @@ def signup():
         password = data['password']
 
         #try to get coordinates data
-        user_location = UserLocation(city=city, state=state, country=country)
+        user_location = UserLocation(city=city, state=state, country=country, cache=get_shared_cache(),
+                                     geocode_cache=GeocodeCache, gazetteer=get_gazetteer())
         coordinates = user_location.get_coordinates()
 
         if coordinates:
@@ -0,0 +1,179 @@
+""" CLI Commands. """
+
+import click
+from flask import Blueprint
+from models import User, SolarDay, RecomputeJob, GeocodeCache, SOLAR_CACHE_MAX_AGE
+from shared_cache import get_shared_cache
+from solar_providers import get_provider_stats
+from solar_tables import build_solar_table, SOLAR_TABLE_PATH, SOLAR_TABLE_RESOLUTION
+from seasonal_tables import build_seasonal_table, SEASONAL_TABLE_PATH, SEASONAL_TABLE_RESOLUTION
+from prefetch import prefetch_forecasts
+from sql_water_calculator import refresh_water_dates
+from light_exposure import update_light_exposure, LIGHT_EXPOSURE_DAYS, LIGHT_EXPOSURE_PAST_DAYS
+from recompute import (recompute_water_dates, enqueue_recompute_jobs, run_recompute_worker, RECOMPUTE_CHUNK_SIZE,
+                       RECOMPUTE_WORKERS, RECOMPUTE_BATCH_SIZE, RECOMPUTE_LEASE)
+
+commands = Blueprint('commands', __name__, cli_group=None)
+
+####################
+# Solar Cache
+# Commands
+####################
+
+
+@commands.cli.command('evict-solar-cache')
+@click.option('--max-age', default=SOLAR_CACHE_MAX_AGE, help='Days to keep solar data after its date has passed.')
+def evict_solar_cache(max_age):
+    """Delete cached solar data for old dates. Run daily from a scheduler."""
+
+    deleted = SolarDay.evict(max_age)
+    click.echo(f'Evicted {deleted} cached solar days older than {max_age} days.')
+
+
+@commands.cli.command('assign-solar-cells')
+def assign_solar_cells():
+    """Save the solar cell of every user. Run once after upgrading and after changing SOLAR_CELL_PRECISION.
+    The column is added when the app starts, see models.upgrade_schema."""
+
+    updated = User.assign_solar_cells()
+    click.echo(f'Assigned the solar cell of {updated} users.')
+
+
+@commands.cli.command('evict-geocode-cache')
+def evict_geocode_cache():
+    """Delete expired geocoding results. Run daily from a scheduler."""
+
+    deleted = GeocodeCache.evict()
+    click.echo(f'Evicted {deleted} expired geocoding results.')
+
+
+@commands.cli.command('shared-cache-stats')
+def shared_cache_stats():
+    """Print the hits and misses of the shared cache for every worker."""
+
+    shared_cache = get_shared_cache()
+    if not shared_cache:
+        click.echo('The shared cache is disabled, set SHARED_CACHE_BACKEND.')
+        return
+
+    stats = shared_cache.get_stats()
+    click.echo(f"{stats['backend']} cache: {stats['hits']} hits, {stats['misses']} misses "
+               f"({stats['hit_rate']:.0%} hit rate), {stats['sets']} sets, {stats['errors']} errors.")
+
+
+@commands.cli.command('solar-provider-stats')
+def solar_provider_stats():
+    """Print the hits, misses, errors and average latency of every solar provider. The counts of every worker are
+    included when the shared cache is enabled, each worker adds its counts to it every STATS_FLUSH_EVERY calls."""
+
+    for stats in get_provider_stats():
+        click.echo(f"{stats['provider']}: {stats['hits']} hits, {stats['misses']} misses "
+                   f"({stats['hit_rate']:.0%} hit rate), {stats['errors']} errors, {stats['calls']} calls, "
+                   f"{stats['average_ms']:.2f} ms per call.")
+
+####################
+# Solar Table
+# Commands
+####################
+
+
+@commands.cli.command('build-solar-tables')
+@click.option('--output', default=SOLAR_TABLE_PATH, help='Path of the .npy file to write.')
+@click.option('--resolution', default=SOLAR_TABLE_RESOLUTION, help='Degrees of latitude between table rows.')
+def build_solar_tables(output, resolution):
+    """Precompute a year of solar events for SOLAR_PROVIDER=table."""
+
+    table = build_solar_table(output, resolution)
+    click.echo(f'Saved {table.shape[0]} latitudes x {table.shape[1]} days to {output} ({table.nbytes} bytes).')
+
+
+@commands.cli.command('build-seasonal-tables')
+@click.option('--output', default=SEASONAL_TABLE_PATH, help='Path of the .npy file to write.')
+@click.option('--resolution', default=SEASONAL_TABLE_RESOLUTION, help='Degrees of latitude between table rows.')
+def build_seasonal_tables(output, resolution):
+    """Precompute the running daily light totals for WATER_INTERVAL_PROVIDER=table."""
+
+    table = build_seasonal_table(output, resolution)
+    click.echo(f'Saved {table.shape[0]} latitudes x {table.shape[1]} days to {output} ({table.nbytes} bytes).')
+
+####################
+# Light Exposure
+# Commands
+####################
+
+
+@commands.cli.command('update-light-exposure')
+@click.option('--days', default=LIGHT_EXPOSURE_DAYS, help='Days ahead of today to save.')
+@click.option('--past-days', default=LIGHT_EXPOSURE_PAST_DAYS, help='Days before today to keep.')
+def update_light_exposure_daily(days, past_days):
+    """Save the missing daily light hours of every active light source. Run daily from a scheduler."""
+
+    report = update_light_exposure(days, past_days)
+    click.echo(f"{report['light_sources']} active light sources, {report['updated']} updated with {report['added']} "
+               f"days, {report['evicted']} old days deleted in {report['seconds']:.1f}s.")
+
+####################
+# Water Forecast
+# Commands
+####################
+
+
+@commands.cli.command('prefetch-forecasts')
+@click.option('--hours', default=48, help='Prefetch plants due within this many hours.')
+@click.option('--limit', default=None, type=int, help='Maximum number of plants to prefetch.')
+@click.option('--delay', default=0.0, help='Seconds to wait after each plant.')
+def prefetch_water_forecasts(hours, limit, delay):
+    """Prefetch the next water interval of plants coming due. Run hourly from a scheduler."""
+
+    report = prefetch_forecasts(hours, limit, delay)
+    click.echo(f"{report['due']} plants due ({report['overdue']} overdue), {report['warm']} already warm "
+               f"({report['overdue_warm']} overdue), {report['prefetched']} prefetched, {report['failed']} failed. "
+               f"Warm ratio {report['warm_ratio']:.0%}.")
+
+
+@commands.cli.command('recompute-water-dates')
+@click.option('--chunk-size', default=RECOMPUTE_CHUNK_SIZE, help='Water schedules read and written together.')
+@click.option('--workers', default=RECOMPUTE_WORKERS, help='Worker processes, 0 uses every core.')
+def recompute_next_water_dates(chunk_size, workers):
+    """Recompute the next water date of every non-manual plant with natural light. Run nightly from a scheduler.
+    Uses the daily light hours saved in light_exposure_daily, forecast windows with unsaved days use the local solar
+    equations."""
+
+    report = recompute_water_dates(chunk_size, workers)
+    click.echo(f"Recomputed {report['schedules']} plants in {report['seconds']:.1f}s "
+               f"({report['plants_per_second']:.0f} plants/sec), {report['updated']} next water dates changed, "
+               f"{report['failed']} failed.")
+
+
+@commands.cli.command('enqueue-recompute')
+def enqueue_recompute():
+    """Queue every non-manual plant with natural light for the recompute workers, plants whose jobs failed are queued
+    again."""
+
+    added = enqueue_recompute_jobs()
+    counts = RecomputeJob.get_counts()
+    click.echo(f"Queued {added} plants. {counts['queued']} queued, {counts['leased']} leased, "
+               f"{counts['failed']} failed.")
+
+
+@commands.cli.command('recompute-worker')
+@click.option('--worker-id', default=None, help='Name of this worker, defaults to hostname:pid.')
+@click.option('--batch-size', default=RECOMPUTE_BATCH_SIZE, help='Jobs claimed at once.')
+@click.option('--lease', default=RECOMPUTE_LEASE, help='Seconds before the jobs of a crashed worker are claimed again.')
+@click.option('--wait', default=0.0, help='Seconds between polls of an empty queue, 0 stops when the queue is empty.')
+def recompute_worker(worker_id, batch_size, lease, wait):
+    """Recompute the next water dates of queued plants. Run on as many nodes as needed."""
+
+    report = run_recompute_worker(worker_id, batch_size, lease, wait)
+    click.echo(f"{report['worker_id']} completed {report['completed']} of {report['claimed']} claimed plants in "
+               f"{report['batches']} batches and {report['seconds']:.1f}s ({report['plants_per_second']:.0f} plants/sec), "
+               f"{report['updated']} next water dates changed, {report['lost']} lost leases, {report['failed']} failed.")
+
+
+@commands.cli.command('refresh-water-dates-sql')
+def refresh_water_dates_sql():
+    """Recompute the next water date of every non-manual plant with natural light with one SQL statement."""
+
+    report = refresh_water_dates()
+    click.echo(f"Added {report['light_exposure_added']} daily light hours, {report['updated']} next water dates "
+               f"changed in {report['seconds']:.1f}s.")
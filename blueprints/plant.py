@@ -162,6 +162,7 @@ def edit_plant(current_user, plant_id):
                 plant_id=plant.id).first()
             plant_type = PlantType.query.get_or_404(plant.type_id)
             water_schedule.water_interval = plant_type.base_water
+            water_schedule.reset_base_interval()
             water_schedule.next_water_date = water_schedule.water_date + \
                 timedelta(days=plant_type.base_water)
             db.session.commit()
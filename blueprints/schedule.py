@@ -25,9 +25,13 @@ def edit_waterschedule(current_user, schedule_id):
     plant = Plant.query.get_or_404(water_schedule.plant_id)
 
     if current_user.id == plant.user_id:
-        water_schedule.manual_mode = data['manual_mode']
-        water_schedule.water_interval = int(
+        water_interval = int(
             data['water_interval']) if data['manual_mode'] == False else int(data['manual_water_interval'])
+        # an interval set by the user is no longer the water calculator's adjustment
+        if water_interval != water_schedule.water_interval:
+            water_schedule.reset_base_interval()
+        water_schedule.manual_mode = data['manual_mode']
+        water_schedule.water_interval = water_interval
         water_schedule.next_water_date = water_schedule.water_date + \
             timedelta(days=water_schedule.water_interval)
         db.session.commit()
@@ -80,6 +84,10 @@ def water_plant(current_user, schedule_id):
                 new_water_interval = WaterSchedule.calculate_next_water_date(
                     current_user, plant_type, water_schedule, plant_light_source.type)
 
+                # keep the forecast window the interval was calculated from for the nightly recompute
+                water_schedule.base_water_date = water_schedule.water_date
+                water_schedule.base_interval = water_schedule.water_interval
+                water_schedule.calculated_interval = new_water_interval
                 water_schedule.water_interval = new_water_interval
                 water_schedule.water_date = datetime.today()
                 water_schedule.next_water_date = datetime.today() + timedelta(days=new_water_interval)
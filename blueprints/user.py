@@ -3,8 +3,10 @@
 
 from flask import Blueprint, jsonify, request
 from flask.json import jsonify
-from models import db, User, Plant
+from models import db, User, Plant, LightExposure, GeocodeCache
 from location import UserLocation
+from shared_cache import get_shared_cache
+from gazetteer import get_gazetteer
 from sqlalchemy.exc import IntegrityError
 from .auth import auth_required
 from uploader import Uploader
@@ -76,12 +78,13 @@ def edit_location(current_user, user_id):
     data = request.get_json()
 
     if current_user.id == user_id:
-        user_location = UserLocation(city=data['city'], state=data['state'], country=data['country'])
+        user_location = UserLocation(city=data['city'], state=data['state'], country=data['country'],
+                                     cache=get_shared_cache(), geocode_cache=GeocodeCache, gazetteer=get_gazetteer())
         coordinates = user_location.get_coordinates()
 
         if coordinates:
-                current_user.latitude = coordinates['lat']
-                current_user.longitude = coordinates['lng']
+                current_user.set_location(coordinates['lat'], coordinates['lng'])
+                LightExposure.clear_user(current_user.id)
                 db.session.commit()
                 return jsonify({ "msg": "Success! Location updated." }), 200
         return jsonify({ "msg": "There was an error fetching your geolocation. Please check the spelling of your City or State/Country and try again."}), 400
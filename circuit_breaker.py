@@ -0,0 +1,99 @@
+"""Circuit Breaker class & helper methods.
+
+Stops calling an external API after repeated failures so requests fail fast instead of waiting on timeouts, and
+probes the API in a background thread until it recovers."""
+
+import time
+import logging
+import threading
+
+CLOSED = 'closed'
+OPEN = 'open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the external API while the circuit is open."""
+
+
+class CircuitBreaker:
+    """A thread safe circuit breaker.
+
+    The circuit opens after failure_threshold consecutive failures. While it is open calls raise CircuitOpenError right
+    away, and every reset_timeout seconds the probe callable is run in a background thread. The circuit closes when the
+    probe succeeds, so no user request ever waits on a probe."""
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30, probe=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe = probe
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def call(self, function, *args, **kwargs):
+        """Calls the function with the arguments and returns the result, recording the success or failure.
+        Raises CircuitOpenError without calling the function while the circuit is open."""
+
+        if self.is_open():
+            raise CircuitOpenError(f'{self.name} circuit is open')
+
+        try:
+            result = function(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+
+        self.record_success()
+        return result
+
+    def is_open(self):
+        """Returns True if the circuit is open. Starts a background probe when the reset_timeout has passed."""
+
+        with self.lock:
+            if self.state == CLOSED:
+                return False
+
+            if not self.probing and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.probing = True
+                threading.Thread(target=self.run_probe, daemon=True).start()
+
+            return True
+
+    def run_probe(self):
+        """Runs the probe, closes the circuit if it succeeds or restarts the reset_timeout if it fails."""
+
+        try:
+            if self.probe:
+                self.probe()
+            self.record_success()
+            logging.info(f'{self.name} circuit closed after a successful probe')
+
+        except Exception as err:
+            with self.lock:
+                self.opened_at = time.monotonic()
+            logging.warning(f'{self.name} circuit probe failed: {err}')
+
+        finally:
+            with self.lock:
+                self.probing = False
+
+    def record_success(self):
+        """Closes the circuit and resets the failure count."""
+
+        with self.lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        """Counts a failure and opens the circuit when the failure_threshold is reached."""
+
+        with self.lock:
+            self.failures += 1
+            if self.state == CLOSED and self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                logging.error(f'{self.name} circuit opened after {self.failures} failures')
@@ -0,0 +1,284 @@
+"""Local fake servers for the external services.
+
+Stand-ins for the Sunset and sunrise times API, the MapQuest Geocoding API and Amazon S3 that answer with the same
+JSON/XML shapes the app parses, for benchmarks and load tests without a network. Each fake can add latency, jitter,
+errors and throttling.
+
+Run a fake from the command line, then point the app at it:
+    python fake_services.py solar --port 5001 --latency 0.05 --jitter 0.02 --error-rate 0.01 --rate-limit 200
+    SUNRISE_SUNSET_URL=http://127.0.0.1:5001/json
+    MAPQUEST_URL=http://127.0.0.1:5002/geocoding/v1/address
+    S3_ENDPOINT_URL=http://127.0.0.1:5003"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+from xml.sax.saxutils import escape
+from solar_position import get_solar_times
+
+# locations the fake geocoder knows, any other "city, state/country" gets stable made up coordinates
+KNOWN_LOCATIONS = {
+    'seattle': {'lat': 47.603832, 'lng': -122.330062},
+    'paris': {'lat': 48.85661, 'lng': 2.351499},
+    'queenstown': {'lat': -45.03172, 'lng': 168.66081},
+    'victoria': {'lat': 48.428318, 'lng': -123.364953},
+    'bejing': {'lat': 39.905963, 'lng': 116.391248},
+}
+
+
+class FakeServiceConfig:
+    """The latency (seconds), jitter (seconds), error rate (0 to 1) and rate limit (requests/second, 0 for no limit)
+    of a fake service."""
+
+    def __init__(self, latency=0, jitter=0, error_rate=0, rate_limit=0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+        self.tokens = rate_limit
+        self.refilled_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take_token(self):
+        """Returns False if the request is over the rate limit (a token bucket that holds one second of requests)."""
+
+        if not self.rate_limit:
+            return True
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate_limit, self.tokens + (now - self.refilled_at) * self.rate_limit)
+            self.refilled_at = now
+
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+    def get_delay(self):
+        """Returns the seconds to wait before responding."""
+
+        with self.lock:
+            return max(0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    def should_fail(self):
+        """Returns True if this request should get a server error."""
+
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+
+class FakeServiceHandler(BaseHTTPRequestHandler):
+    """Applies the throttling, latency and errors of the server's FakeServiceConfig before handling a request."""
+
+    # keep-alive connections, like the real services
+    protocol_version = 'HTTP/1.1'
+    throttled_status = 429
+
+    def handle_request(self, method):
+        config = self.server.config
+
+        if not config.take_token():
+            # the request body was not read, so the connection can not be reused
+            self.close_connection = True
+            return self.send_body(self.throttled_status, b'', 'text/plain')
+
+        time.sleep(config.get_delay())
+
+        if config.should_fail():
+            self.close_connection = True
+            return self.send_body(500, b'', 'text/plain')
+
+        getattr(self, f'handle_{method}')()
+
+    def do_GET(self):
+        self.handle_request('get')
+
+    def do_PUT(self):
+        self.handle_request('put')
+
+    def do_DELETE(self):
+        self.handle_request('delete')
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, data, status=200):
+        self.send_body(status, json.dumps(data).encode(), 'application/json')
+
+    def log_message(self, format, *args):
+        """Silences the request log, it slows benchmarks down."""
+
+
+class SunriseSunsetHandler(FakeServiceHandler):
+    """Fake Sunset and sunrise times API: GET /json?lat=&lng=&date=&formatted="""
+
+    def format_time(self, day, minutes, formatted):
+        moment = datetime(day.year, day.month, day.day) + timedelta(seconds=round(minutes * 60))
+
+        if formatted:
+            return moment.strftime('%I:%M:%S %p').lstrip('0')
+        return moment.strftime('%Y-%m-%dT%H:%M:%S+00:00')
+
+    def handle_get(self):
+        params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+
+        try:
+            day = datetime.strptime(params.get('date', datetime.utcnow().strftime('%Y-%m-%d')), '%Y-%m-%d')
+            times = get_solar_times(params['lat'], params['lng'], day)
+        except (KeyError, ValueError):
+            return self.send_json({'results': '', 'status': 'INVALID_REQUEST'}, 400)
+
+        formatted = params.get('formatted', '1') != '0'
+        day_length = round(times['day_length'] * 60)
+
+        self.send_json({
+            'results': {
+                'sunrise': self.format_time(day, times['sunrise'], formatted),
+                'sunset': self.format_time(day, times['sunset'], formatted),
+                'solar_noon': self.format_time(day, times['solar_noon'], formatted),
+                'day_length': str(timedelta(seconds=min(day_length, 86399))) if formatted else day_length,
+            },
+            'status': 'OK'
+        })
+
+
+class MapQuestHandler(FakeServiceHandler):
+    """Fake MapQuest Geocoding API: GET /geocoding/v1/address?key=&location="""
+
+    def handle_get(self):
+        params = parse_qs(urlparse(self.path).query)
+        location = params.get('location', [''])[0]
+        city = location.split(',')[0].strip().lower()
+
+        if ',' not in location:
+            # a city alone is too vague to geocode to city level
+            quality_code, lat_lng = 'A1XAX', {'lat': 38.89037, 'lng': -77.03196}
+        elif city in KNOWN_LOCATIONS:
+            quality_code, lat_lng = 'A5XAX', KNOWN_LOCATIONS[city]
+        else:
+            digest = hashlib.md5(location.lower().encode()).digest()
+            quality_code = 'A5XAX'
+            lat_lng = {'lat': round(digest[0] / 255 * 120 - 60, 6), 'lng': round(digest[1] / 255 * 360 - 180, 6)}
+
+        self.send_json({
+            'info': {'statuscode': 0, 'messages': []},
+            'results': [{
+                'providedLocation': {'location': location},
+                'locations': [{'geocodeQualityCode': quality_code, 'geocodeQuality': 'CITY', 'latLng': lat_lng,
+                               'displayLatLng': lat_lng}]
+            }]
+        })
+
+
+class S3Handler(FakeServiceHandler):
+    """Fake Amazon S3 with path style addressing: PUT /bucket/key, GET /bucket?prefix=, DELETE /bucket/key"""
+
+    throttled_status = 503
+
+    def get_bucket_and_key(self):
+        path = unquote(urlparse(self.path).path).lstrip('/')
+        bucket, _, key = path.partition('/')
+        return bucket, key
+
+    def handle_put(self):
+        bucket, key = self.get_bucket_and_key()
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        with self.server.lock:
+            self.server.objects.setdefault(bucket, {})[key] = body
+
+        self.send_response(200)
+        self.send_header('ETag', f'"{hashlib.md5(body).hexdigest()}"')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def handle_get(self):
+        bucket, _ = self.get_bucket_and_key()
+        prefix = parse_qs(urlparse(self.path).query).get('prefix', [''])[0]
+
+        with self.server.lock:
+            objects = sorted((key, body) for key, body in self.server.objects.get(bucket, {}).items()
+                             if key.startswith(prefix))
+
+        contents = ''.join(f'<Contents><Key>{escape(key)}</Key><Size>{len(body)}</Size>'
+                           f'<LastModified>2021-01-01T00:00:00.000Z</LastModified></Contents>'
+                           for key, body in objects)
+        body = ('<?xml version="1.0" encoding="UTF-8"?>'
+                '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                f'<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix><KeyCount>{len(objects)}</KeyCount>'
+                f'<MaxKeys>1000</MaxKeys><IsTruncated>false</IsTruncated>{contents}</ListBucketResult>')
+
+        self.send_body(200, body.encode(), 'application/xml')
+
+    def handle_delete(self):
+        bucket, key = self.get_bucket_and_key()
+
+        with self.server.lock:
+            self.server.objects.get(bucket, {}).pop(key, None)
+
+        self.send_response(204)
+        self.end_headers()
+
+
+HANDLERS = {
+    'solar': SunriseSunsetHandler,
+    'mapquest': MapQuestHandler,
+    's3': S3Handler,
+}
+
+PATHS = {
+    'solar': '/json',
+    'mapquest': '/geocoding/v1/address',
+    's3': '',
+}
+
+
+def create_fake_server(service, port=0, config=None):
+    """Creates a fake server for 'solar', 'mapquest' or 's3' on 127.0.0.1 (port 0 picks a free port).
+    Returns the server and the URL to configure the app with."""
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), HANDLERS[service])
+    server.daemon_threads = True
+    server.config = config or FakeServiceConfig()
+    server.objects = {}
+    server.lock = threading.Lock()
+
+    return server, f'http://127.0.0.1:{server.server_address[1]}{PATHS[service]}'
+
+
+def start_fake_server(service, port=0, config=None):
+    """Starts a fake server in a background thread, returns the server and its URL. Call server.shutdown() to stop it."""
+
+    server, url = create_fake_server(service, port, config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, url
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a local fake of an external service.')
+    parser.add_argument('service', choices=sorted(HANDLERS))
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0, help='random +/- seconds added to the latency')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests that get a 500')
+    parser.add_argument('--rate-limit', type=float, default=0, help='requests/second before throttling')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    server, url = create_fake_server(args.service, args.port, FakeServiceConfig(
+        args.latency, args.jitter, args.error_rate, args.rate_limit, args.seed))
+    print(f'Fake {args.service} service listening on {url}')
+    server.serve_forever()
@@ -0,0 +1,176 @@
+"""Offline Gazetteer Geocoder & helper methods.
+
+Geocodes "city, state, country" locations from a local city gazetteer instead of calling MapQuest. The gazetteer is
+loaded once per process into a sorted array of normalized city names, so a city is found with a binary search in a few
+microseconds, and any prefix of a name is a contiguous slice of the array for autocomplete.
+
+Two formats are supported: the CSV format of generator/cities.csv (a small sample of large cities), and the GeoNames
+cities dump (cities15000.txt from https://download.geonames.org/export/dump/) with the optional admin1CodesASCII.txt
+and countryInfo.txt files for state and country names."""
+
+import os
+import csv
+import logging
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+GAZETTEER_PATH = os.getenv('GAZETTEER_PATH', 'generator/cities.csv')
+# 'csv' for the generator/cities.csv format, 'geonames' for a GeoNames cities dump
+GAZETTEER_FORMAT = os.getenv('GAZETTEER_FORMAT', 'csv')
+GEONAMES_ADMIN1_PATH = os.getenv('GEONAMES_ADMIN1_PATH')
+GEONAMES_COUNTRY_PATH = os.getenv('GEONAMES_COUNTRY_PATH')
+# 'mapquest' always calls MapQuest, 'gazetteer' looks the location up in the gazetteer first and calls MapQuest for
+# misses, 'offline' only uses the gazetteer
+GEOCODER = os.getenv('GEOCODER', 'mapquest')
+
+_gazetteers = {}
+
+
+def normalize(name):
+    """Returns a name in lowercase without accents, punctuation or repeated spaces, so "São Paulo" and "sao  paulo"
+    are the same key."""
+
+    name = unicodedata.normalize('NFKD', name or '')
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    name = ''.join(c if c.isalnum() else ' ' for c in name.lower())
+
+    return ' '.join(name.split())
+
+
+class Gazetteer:
+    """An in-memory index of cities.
+
+    Each city has a set of normalized names for its state (code and name) and its country (codes and name), its
+    coordinates and population. The normalized city names are kept in one sorted list with the index of their city."""
+
+    def __init__(self, cities):
+        """Accepts an iterable of (names, states, countries, latitude, longitude, population) tuples, where names,
+        states and countries are iterables of names."""
+
+        self.states = []
+        self.countries = []
+        self.latitudes = array('d')
+        self.longitudes = array('d')
+        self.populations = array('q')
+        keys = []
+
+        for i, (names, states, countries, latitude, longitude, population) in enumerate(cities):
+            self.states.append(frozenset(filter(None, map(normalize, states))))
+            self.countries.append(frozenset(filter(None, map(normalize, countries))))
+            self.latitudes.append(float(latitude))
+            self.longitudes.append(float(longitude))
+            self.populations.append(int(population or 0))
+            keys.extend((name, i) for name in set(filter(None, map(normalize, names))))
+
+        keys.sort()
+        self.names = [name for name, _ in keys]
+        self.cities = array('i', (i for _, i in keys))
+
+    def __len__(self):
+        return len(self.latitudes)
+
+    def find(self, name):
+        """Returns the indexes of the cities with a name."""
+
+        name = normalize(name)
+        start = bisect_left(self.names, name)
+        end = start
+        while end < len(self.names) and self.names[end] == name:
+            end += 1
+
+        return self.cities[start:end]
+
+    def search(self, prefix, limit=10):
+        """Returns the distinct names that start with a prefix, for autocomplete, at most limit names."""
+
+        prefix = normalize(prefix)
+        names = []
+
+        for i in range(bisect_left(self.names, prefix), len(self.names)):
+            if not self.names[i].startswith(prefix) or len(names) == limit:
+                break
+            if not names or names[-1] != self.names[i]:
+                names.append(self.names[i])
+
+        return names
+
+    def get_coordinates(self, city, state=None, country=None):
+        """Returns a Dict of latitude and longitude coordinates of the largest city with the name in the state and
+        country, like UserLocation.get_coordinates, or None if the gazetteer has no such city."""
+
+        state, country = normalize(state), normalize(country)
+        matches = [i for i in self.find(city)
+                   if (not state or state in self.states[i]) and (not country or country in self.countries[i])]
+        if not matches:
+            return None
+
+        i = max(matches, key=lambda i: self.populations[i])
+        return {'lat': self.latitudes[i], 'lng': self.longitudes[i]}
+
+
+def read_csv_cities(path):
+    """Yields the city tuples of a gazetteer CSV file with the columns name, admin1_code, admin1_name, country_code,
+    country_code3, country_name, latitude, longitude, population."""
+
+    with open(path, newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            yield ((row['name'],),
+                   (row['admin1_code'], row['admin1_name']),
+                   (row['country_code'], row['country_code3'], row['country_name']),
+                   row['latitude'], row['longitude'], row['population'])
+
+
+def read_geonames_cities(path, admin1_path=None, country_path=None):
+    """Yields the city tuples of a GeoNames cities dump, with the state names of admin1_path and the country codes
+    and names of country_path when they are given."""
+
+    admin1_names = {}
+    if admin1_path:
+        with open(admin1_path, encoding='utf-8') as file:
+            for line in file:
+                fields = line.rstrip('\n').split('\t')
+                admin1_names[fields[0]] = fields[1:3]
+
+    country_names = {}
+    if country_path:
+        with open(country_path, encoding='utf-8') as file:
+            for line in file:
+                if line.startswith('#'):
+                    continue
+                fields = line.rstrip('\n').split('\t')
+                country_names[fields[0]] = (fields[1], fields[4])
+
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            fields = line.rstrip('\n').split('\t')
+            country_code, admin1_code = fields[8], fields[10]
+
+            yield ((fields[1], fields[2]),
+                   (admin1_code, *admin1_names.get(f'{country_code}.{admin1_code}', ())),
+                   (country_code, *country_names.get(country_code, ())),
+                   fields[4], fields[5], fields[14])
+
+
+def load_gazetteer(path=GAZETTEER_PATH, file_format=GAZETTEER_FORMAT):
+    """Loads and returns the Gazetteer of a file."""
+
+    if file_format == 'geonames':
+        return Gazetteer(read_geonames_cities(path, GEONAMES_ADMIN1_PATH, GEONAMES_COUNTRY_PATH))
+    return Gazetteer(read_csv_cities(path))
+
+
+def get_gazetteer(path=GAZETTEER_PATH):
+    """Returns the Gazetteer for a path, the file is only loaded once per process.
+    Returns None if the geocoder is MapQuest or the file does not exist."""
+
+    if GEOCODER == 'mapquest':
+        return None
+
+    if path not in _gazetteers:
+        try:
+            _gazetteers[path] = load_gazetteer(path)
+        except FileNotFoundError:
+            logging.warning(f'Gazetteer {path} not found, geocoding with MapQuest')
+            _gazetteers[path] = None
+    return _gazetteers[path]
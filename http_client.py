@@ -0,0 +1,87 @@
+"""Outbound HTTP client & helper methods.
+
+A shared requests Session for calls to external APIs (Sunset and sunrise times, MapQuest). The Session keeps a pool of
+keep-alive connections per host, so repeated calls skip the TCP and TLS handshakes, and retries 429 and 5xx responses
+with a jittered exponential backoff."""
+
+import os
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# number of keep-alive connections kept per host, should be at least SOLAR_MAX_CONCURRENCY
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+# seconds to wait to connect and between bytes of the response
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', 5))
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', 3))
+# retries wait a random time up to HTTP_BACKOFF * 2 ** (retry number - 1) seconds
+HTTP_BACKOFF = float(os.getenv('HTTP_BACKOFF', 0.3))
+# most seconds a retry waits for a 429 or 503 Retry-After header, the wait blocks a web request's thread
+HTTP_MAX_RETRY_AFTER = float(os.getenv('HTTP_MAX_RETRY_AFTER', 2))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_sessions = {}
+_lock = threading.Lock()
+
+
+class JitterRetry(Retry):
+    """A urllib3 Retry that sleeps a random time between 0 and the exponential backoff time ("full jitter"),
+    so clients that failed together do not retry together. Retry-After headers are respected up to
+    HTTP_MAX_RETRY_AFTER seconds."""
+
+    def get_backoff_time(self):
+        return random.uniform(0, super().get_backoff_time())
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, HTTP_MAX_RETRY_AFTER)
+
+
+def create_session(pool_size=HTTP_POOL_SIZE, retries=HTTP_RETRIES, backoff=HTTP_BACKOFF):
+    """Creates and returns a requests Session with a connection pool and retry policy for http and https."""
+
+    retry = JitterRetry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=True,
+        # return the last response after the final retry so the caller can handle the status
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    return session
+
+
+def get_session():
+    """Returns the shared Session for this process. Each gunicorn worker gets its own Session because connections
+    can not be shared across a fork."""
+
+    pid = os.getpid()
+    session = _sessions.get(pid)
+
+    if session is None:
+        with _lock:
+            session = _sessions.get(pid)
+            if session is None:
+                session = create_session()
+                _sessions[pid] = session
+
+    return session
+
+
+def get(url, **kwargs):
+    """Sends a GET request with the shared Session. Accepts the same arguments as requests.get and
+    uses HTTP_TIMEOUT unless a timeout is provided."""
+
+    kwargs.setdefault('timeout', HTTP_TIMEOUT)
+    return get_session().get(url, **kwargs)
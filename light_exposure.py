@@ -0,0 +1,121 @@
+"""Daily Light Exposure.
+
+A light source's daily light hours only depend on the date, its light type and its owner's coordinates, so a
+background job saves them to light_exposure_daily for every active light source from LIGHT_EXPOSURE_PAST_DAYS ago to
+LIGHT_EXPOSURE_DAYS ahead. WaterCalculator averages the saved hours of a forecast window with one SQL aggregate instead
+of calculating a solar forecast.
+
+The job is incremental: each run only calculates the days that are not saved yet (normally the one new day at the end
+of the range) and deletes the days that have fallen out of the range. A user's saved hours are deleted when their
+location changes."""
+
+import os
+import time
+from datetime import date, timedelta
+from models import db, WaterSchedule, Plant, LightSource, User, LightExposure
+from solar_cells import get_cell_coordinates
+from solar_batch import get_daily_light_hours
+
+# days ahead of today to save, enough for the longest water interval
+LIGHT_EXPOSURE_DAYS = int(os.getenv('LIGHT_EXPOSURE_DAYS', 91))
+# days before today to keep, forecast windows start the day after a plant was last watered
+LIGHT_EXPOSURE_PAST_DAYS = int(os.getenv('LIGHT_EXPOSURE_PAST_DAYS', 91))
+# light sources calculated together, and rows inserted together
+LIGHT_EXPOSURE_CHUNK_SIZE = int(os.getenv('LIGHT_EXPOSURE_CHUNK_SIZE', 2000))
+LIGHT_EXPOSURE_INSERT_SIZE = 1000
+
+
+def get_light_exposure_rows(ranges):
+    """Accepts a list of (light_source_id, light_type, latitude, longitude, first_date, days) date ranges, calculates
+    the daily light hours of every range at once with the batch solar equations for the center of the solar cell of
+    the coordinates.
+    Returns a list of {"light_source_id": light_source_id, "date": date, "light_hours": light_hours} dicts, one for each
+    light source and date."""
+
+    light_source_ids, light_types, latitudes, longitudes, first_dates, days = zip(*ranges)
+    latitudes, longitudes = zip(*map(get_cell_coordinates, latitudes, longitudes))
+
+    light_hours = get_daily_light_hours(latitudes, longitudes, first_dates, max(days), light_types)
+
+    rows = {}
+    for light_source_id, first_date, range_days, hours in zip(light_source_ids, first_dates, days, light_hours):
+        for day in range(range_days):
+            rows[(light_source_id, first_date + timedelta(days=day))] = float(hours[day])
+
+    return [{'light_source_id': light_source_id, 'date': day, 'light_hours': hours}
+            for (light_source_id, day), hours in rows.items()]
+
+
+def save_light_exposure(ranges, chunk_size=LIGHT_EXPOSURE_CHUNK_SIZE):
+    """Calculates and saves the daily light hours of the date ranges, keeping the days that are already saved.
+    Returns the number of rows added."""
+
+    added = 0
+
+    for i in range(0, len(ranges), chunk_size):
+        rows = get_light_exposure_rows(ranges[i:i + chunk_size])
+        for j in range(0, len(rows), LIGHT_EXPOSURE_INSERT_SIZE):
+            added += LightExposure.save_hours(rows[j:j + LIGHT_EXPOSURE_INSERT_SIZE])
+
+    return added
+
+
+def get_active_light_sources():
+    """Returns rows of (id, type, latitude, longitude) for the natural light sources of non-manual plants whose owner
+    has coordinates."""
+
+    return (db.session.query(LightSource.id, LightSource.type, User.latitude, User.longitude)
+            .join(Plant, Plant.light_id == LightSource.id)
+            .join(WaterSchedule, WaterSchedule.plant_id == Plant.id)
+            .join(User, Plant.user_id == User.id)
+            .filter(WaterSchedule.manual_mode == False,
+                    LightSource.type != 'Artificial',
+                    User.latitude != None,
+                    User.longitude != None)
+            .distinct()
+            .all())
+
+
+def get_missing_ranges(light_sources, first_date, days):
+    """Returns the (light_source_id, light_type, latitude, longitude, first_date, days) ranges of the days each light
+    source is missing between first_date and first_date + days. A light source whose saved days are contiguous from
+    first_date only needs the days after its last saved date, any other light source is calculated again."""
+
+    saved = LightExposure.get_saved_days(first_date, first_date + timedelta(days=days - 1))
+    ranges = []
+
+    for light_source in light_sources:
+        count, last_date = saved.get(light_source.id, (0, None))
+
+        if count == days:
+            continue
+
+        if count and count == (last_date - first_date).days + 1:
+            start = last_date + timedelta(days=1)
+        else:
+            start = first_date
+
+        ranges.append((light_source.id, light_source.type, light_source.latitude, light_source.longitude, start,
+                       (first_date + timedelta(days=days) - start).days))
+
+    return ranges
+
+
+def update_light_exposure(days=LIGHT_EXPOSURE_DAYS, past_days=LIGHT_EXPOSURE_PAST_DAYS):
+    """Saves the missing daily light hours of every active light source from past_days ago to days ahead of today,
+    and deletes the days before that range.
+
+    Returns a report dict: {"light_sources": light_sources, "updated": updated, "added": added, "evicted": evicted,
+    "seconds": seconds} where updated counts the light sources that were missing days."""
+
+    start = time.perf_counter()
+    first_date = date.today() - timedelta(days=past_days)
+
+    light_sources = get_active_light_sources()
+    ranges = get_missing_ranges(light_sources, first_date, past_days + days + 1)
+
+    added = save_light_exposure(ranges) if ranges else 0
+    evicted = LightExposure.evict(first_date)
+
+    return {'light_sources': len(light_sources), 'updated': len(ranges), 'added': added, 'evicted': evicted,
+            'seconds': time.perf_counter() - start}
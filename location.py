@@ -1,22 +1,35 @@
 from json.decoder import JSONDecodeError
 import os
 from dotenv import load_dotenv
-import requests
+from requests.exceptions import RequestException
+import http_client
+from gazetteer import GEOCODER
 
 load_dotenv()  # take environment variables from .env
 
 MAPQUEST_KEY = os.getenv('MAPQUEST_KEY')
-BASE_URL = f'http://www.mapquestapi.com/geocoding/v1/address?key={MAPQUEST_KEY}'
+MAPQUEST_URL = os.getenv('MAPQUEST_URL', 'http://www.mapquestapi.com/geocoding/v1/address')
+BASE_URL = f'{MAPQUEST_URL}?key={MAPQUEST_KEY}'
 CITY_LEVEL = 'A5'
 
 
 class UserLocation:
-    """A class instance for a User Location."""
+    """A class instance for a User Location.
 
-    def __init__(self, city, state=None, country=None):
+    An optional cache (shared_cache.SharedCache) keeps the coordinates of each location so every worker process can
+    reuse them, and an optional geocode cache (models.GeocodeCache) persists the MapQuest result of each location,
+    including the locations that could not be geocoded. Both are checked before calling MapQuest.
+
+    With an optional gazetteer (gazetteer.Gazetteer) the location is looked up offline first, and MapQuest is only
+    called for the locations the gazetteer does not have unless GEOCODER is 'offline'."""
+
+    def __init__(self, city, state=None, country=None, cache=None, geocode_cache=None, gazetteer=None):
         self.city = city
         self.state = state
         self.country = country
+        self.cache = cache
+        self.geocode_cache = geocode_cache
+        self.gazetteer = gazetteer
 
     def _get_location(self):
         """Returns the location data based on the provided user input."""
@@ -30,6 +43,12 @@ class UserLocation:
         if (self.city and self.country):
             return f'{self.city}, {self.country}'
 
+    def _get_normalized_location(self):
+        """Returns the location in lowercase with single spaces, so different spellings of a location share a cache
+        key."""
+
+        return ', '.join(' '.join(part.split()).lower() for part in self._get_location().split(','))
+
     def get_coordinates(self):
         """Returns a Dict of latitude and longitude coordinates.
         Our target accuracy level is A5 (City level): https://developer.mapquest.com/documentation/geocoding-api/quality-codes/
@@ -99,12 +118,38 @@ class UserLocation:
 
         if (self.city and not self.state and not self.country):
             return
+
+        if self.gazetteer:
+            coordinates = self.gazetteer.get_coordinates(self.city, self.state, self.country)
+            if coordinates or GEOCODER == 'offline':
+                return coordinates
+
+        location = self._get_normalized_location()
+        cache_key = f'geocode:{location}'
+        if self.cache:
+            coordinates = self.cache.get(cache_key)
+            if coordinates:
+                return coordinates
+
+        if self.geocode_cache:
+            cached, coordinates = self.geocode_cache.get_coordinates(location)
+            if cached:
+                if coordinates and self.cache:
+                    self.cache.set(cache_key, coordinates)
+                return coordinates
+
         try:
-            response = requests.get(
+            response = http_client.get(
                 BASE_URL, params={'location': self._get_location()})
             first_result = response.json()['results'][0]['locations'][0]
-
-            if CITY_LEVEL in (first_result['geocodeQualityCode']):
-                return first_result['latLng']
-        except JSONDecodeError:
+        except (JSONDecodeError, RequestException):
             return
+
+        coordinates = first_result['latLng'] if CITY_LEVEL in (first_result['geocodeQualityCode']) else None
+
+        if self.geocode_cache:
+            self.geocode_cache.save_coordinates(location, coordinates, first_result['geocodeQualityCode'])
+        if coordinates and self.cache:
+            self.cache.set(cache_key, coordinates)
+
+        return coordinates
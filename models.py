@@ -1,17 +1,32 @@
 """SQLAlchemy models for Water Mate."""
 
 import os
+import hashlib
+from contextlib import contextmanager
 from dataclasses import dataclass
 from flask_bcrypt import Bcrypt
 from flask_sqlalchemy import SQLAlchemy
 import jwt
 import uuid
 import datetime
+from sqlalchemy import inspect
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 from water_calculator import WaterCalculator
+from seasonal_tables import get_seasonal_table, WATER_INTERVAL_PROVIDER
+from shared_cache import get_solar_cache
+from solar_cells import get_cell_id, get_cell_center, get_cell_coordinates
 
 bcrypt = Bcrypt()
 db = SQLAlchemy()
 
+# number of days solar data is kept after its date has passed
+SOLAR_CACHE_MAX_AGE = int(os.getenv('SOLAR_CACHE_MAX_AGE', 90))
+# hours a location that could not be geocoded is cached, so a typo can be corrected without a long wait
+GEOCODE_NEGATIVE_TTL = int(os.getenv('GEOCODE_NEGATIVE_TTL', 24))
+# number of times a recompute job is claimed before it is left in the queue as failed
+RECOMPUTE_MAX_ATTEMPTS = int(os.getenv('RECOMPUTE_MAX_ATTEMPTS', 3))
+
 
 def connect_db(app):
     """Connect this database to the Flask app.
@@ -21,6 +36,39 @@ def connect_db(app):
     db.app = app
     db.init_app(app)
 
+
+def upgrade_schema():
+    """Creates the missing tables and adds the nullable columns that were added to a model after its table was created,
+    because create_all does not change existing tables. Called when the app starts, so the database always has every
+    mapped column before a query uses it. Workers starting at once take turns with an advisory lock.
+    Returns a list of the "table.column" names that were added."""
+
+    added = []
+
+    with db.engine.begin() as connection:
+        lock_key = int.from_bytes(hashlib.blake2b(b'upgrade_schema', digest_size=8).digest(), 'big', signed=True)
+        connection.execute(db.text('SELECT pg_advisory_xact_lock(:key)'), {'key': lock_key})
+        db.metadata.create_all(connection)
+
+        inspector = inspect(connection)
+        for table in db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable:
+                    raise RuntimeError(f'{table.name}.{column.name} is missing and can not be added without a default')
+
+                connection.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} '
+                                           f'{column.type.compile(connection.dialect)}'))
+                if column.index:
+                    connection.execute(db.text(f'CREATE INDEX IF NOT EXISTS ix_{table.name}_{column.name} '
+                                               f'ON {table.name} ({column.name})'))
+                added.append(f'{table.name}.{column.name}')
+
+    return added
+
 ####################
 # Light Models
 ####################
@@ -118,6 +166,12 @@ class WaterSchedule(db.Model):
     manual_mode = db.Column(db.Boolean, nullable=False, default=False)
     plant_id = db.Column(db.Integer, db.ForeignKey(
         'plants.id', ondelete='cascade'), nullable=False)
+    # the forecast window and interval the water calculator adjusted when the plant was last watered, and the interval
+    # it calculated, so the nightly recompute repeats the same calculation instead of adjusting the adjusted interval.
+    # None while the water_interval has not been adjusted (new plants, manual edits, artificial light).
+    base_water_date = db.Column(db.DateTime)
+    base_interval = db.Column(db.Integer)
+    calculated_interval = db.Column(db.Integer)
 
     water_history = db.relationship(
         'WaterHistory', backref='water_schedule', cascade='all, delete-orphan')
@@ -132,15 +186,38 @@ class WaterSchedule(db.Model):
         """Gets the current water_date and returns a string representation."""
         return self.next_water_date.strftime("%m/%d/%Y")
 
+    def reset_base_interval(self):
+        """Marks the water_interval as not adjusted by the water calculator, after it is set without the calculator."""
+
+        self.base_water_date = None
+        self.base_interval = None
+        self.calculated_interval = None
+
     @classmethod
     def calculate_next_water_date(cls, user, plant_type, water_schedule, light_type):
-        """Creates a new Water Calculator instance with the user, plant type, water schedule and light type. Gets a solar forcast using user, plant and light data and calculates and returns the reccomended water interval for calculating the next water date for a plant."""
+        """Creates a new Water Calculator instance with the user, plant type, water schedule and light type. Gets a solar forcast using user, plant and light data and calculates and returns the reccomended water interval for calculating the next water date for a plant.
+        If the interval was already prefetched for the same inputs the prefetched interval is returned instead.
+        With WATER_INTERVAL_PROVIDER=table the interval is looked up in the seasonal table, falling back to the calculation when the table can not answer."""
+
+        prefetched_interval = WaterForecast.get_interval(user, plant_type, water_schedule, light_type)
+        if prefetched_interval:
+            return prefetched_interval
+
+        seasonal_table = get_seasonal_table() if WATER_INTERVAL_PROVIDER == 'table' else None
+        if seasonal_table and user.latitude is not None:
+            table_interval = seasonal_table.get_water_interval(
+                user.latitude, water_schedule.water_date, water_schedule.water_interval, light_type,
+                plant_type.base_sunlight, plant_type.max_days_without_water)
+            if table_interval:
+                return table_interval
 
         water_calculator = WaterCalculator(
             user=user,
             plant_type=plant_type,
             water_schedule=water_schedule,
-            light_type=light_type
+            light_type=light_type,
+            solar_cache=get_solar_cache(SolarDay),
+            light_exposure=LightExposure
         )
 
         new_water_interval = water_calculator.calculate_water_interval()
@@ -163,6 +240,476 @@ class WaterSchedule(db.Model):
 
         db.session.commit()
 
+@dataclass
+class WaterForecast(db.Model):
+    """A Water Forecast holds the next water interval prefetched for a water schedule before the plant is watered,
+    along with the inputs it was calculated from. It is only used while the inputs are unchanged."""
+
+    __tablename__ = 'water_forecasts'
+
+    id: int
+    water_schedule_id: int
+    water_date: str
+    water_interval: int
+    light_type: str
+    latitude: str
+    longitude: str
+    plant_type_id: int
+    new_water_interval: int
+    created_at: str
+
+    id = db.Column(db.Integer, primary_key=True)
+    water_schedule_id = db.Column(db.Integer, db.ForeignKey(
+        'water_schedules.id', ondelete='cascade'), unique=True, nullable=False)
+    water_date = db.Column(db.DateTime, nullable=False)
+    water_interval = db.Column(db.Integer, nullable=False)
+    light_type = db.Column(db.Text, nullable=False)
+    latitude = db.Column(db.Numeric(8, 6))
+    longitude = db.Column(db.Numeric(9, 6))
+    plant_type_id = db.Column(db.Integer, nullable=False)
+    new_water_interval = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    def matches(self, user, plant_type, water_schedule, light_type):
+        """Returns True if this forecast was calculated from the same inputs."""
+
+        return (self.water_date == water_schedule.water_date
+                and self.water_interval == water_schedule.water_interval
+                and self.light_type == light_type
+                and self.latitude == user.latitude
+                and self.longitude == user.longitude
+                and self.plant_type_id == plant_type.id)
+
+    @classmethod
+    def get_interval(cls, user, plant_type, water_schedule, light_type):
+        """Returns the prefetched water interval for a water schedule, or None if there is no prefetched forecast
+        or it was calculated from different inputs."""
+
+        forecast = cls.query.filter_by(water_schedule_id=water_schedule.id).first()
+
+        if forecast and forecast.matches(user, plant_type, water_schedule, light_type):
+            return forecast.new_water_interval
+
+    @classmethod
+    def save_interval(cls, user, plant_type, water_schedule, light_type, new_water_interval):
+        """Saves the prefetched water interval for a water schedule, replacing any older forecast."""
+
+        forecast = cls.query.filter_by(water_schedule_id=water_schedule.id).first()
+
+        if not forecast:
+            forecast = WaterForecast(water_schedule_id=water_schedule.id)
+            db.session.add(forecast)
+
+        forecast.water_date = water_schedule.water_date
+        forecast.water_interval = water_schedule.water_interval
+        forecast.light_type = light_type
+        forecast.latitude = user.latitude
+        forecast.longitude = user.longitude
+        forecast.plant_type_id = plant_type.id
+        forecast.new_water_interval = new_water_interval
+        forecast.created_at = datetime.datetime.utcnow()
+
+        db.session.commit()
+
+@dataclass
+class RecomputeJob(db.Model):
+    """A Recompute Job queues a water schedule whose next water date needs to be recomputed.
+
+    Workers on any node claim a batch of jobs with SELECT ... FOR UPDATE SKIP LOCKED, so they never wait on each other
+    or claim the same job. A claim is a lease: if the worker crashes the jobs can be claimed again after the lease
+    expires. A job is deleted when it is completed, and a job that failed every attempt is queued again by the next
+    enqueue."""
+
+    __tablename__ = 'recompute_jobs'
+
+    id: int
+    water_schedule_id: int
+    claimed_by: str
+    lease_expires_at: str
+    attempts: int
+    created_at: str
+
+    id = db.Column(db.Integer, primary_key=True)
+    water_schedule_id = db.Column(db.Integer, db.ForeignKey(
+        'water_schedules.id', ondelete='cascade'), unique=True, nullable=False)
+    claimed_by = db.Column(db.Text)
+    lease_expires_at = db.Column(db.DateTime, index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    @classmethod
+    def enqueue(cls, water_schedule_ids):
+        """Adds a job for each water schedule id selected by a query, skipping water schedules that are already queued.
+        Jobs that failed every attempt are reset and queued again. Returns the number of jobs added or reset."""
+
+        statement = insert(cls.__table__).from_select(['water_schedule_id'], water_schedule_ids.statement)
+        statement = statement.on_conflict_do_update(
+            index_elements=['water_schedule_id'],
+            set_={'claimed_by': None, 'lease_expires_at': None, 'attempts': 0,
+                  'created_at': statement.excluded.created_at},
+            where=cls.__table__.c.attempts >= RECOMPUTE_MAX_ATTEMPTS)
+
+        added = db.session.execute(statement).rowcount
+        db.session.commit()
+
+        return added
+
+    @classmethod
+    def claim(cls, worker_id, batch_size, lease_seconds):
+        """Claims up to batch_size unclaimed or expired jobs for a worker for lease_seconds, oldest first.
+        Jobs locked by another worker's claim are skipped. Returns the list of claimed water schedule ids."""
+
+        now = datetime.datetime.utcnow()
+
+        jobs = (cls.query
+                .filter(db.or_(cls.lease_expires_at == None, cls.lease_expires_at < now),
+                        cls.attempts < RECOMPUTE_MAX_ATTEMPTS)
+                .order_by(cls.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+                .all())
+
+        for job in jobs:
+            job.claimed_by = worker_id
+            job.lease_expires_at = now + datetime.timedelta(seconds=lease_seconds)
+            job.attempts += 1
+
+        water_schedule_ids = [job.water_schedule_id for job in jobs]
+        db.session.commit()
+
+        return water_schedule_ids
+
+    @classmethod
+    def complete(cls, worker_id, water_schedule_ids):
+        """Deletes the jobs for the water schedule ids that are still claimed by the worker, without committing,
+        so the results and the completed jobs are committed together. Jobs another worker claimed after this
+        worker's lease expired are left for that worker. Returns the set of completed water schedule ids."""
+
+        jobs = (cls.query
+                .filter(cls.water_schedule_id.in_(water_schedule_ids), cls.claimed_by == worker_id)
+                .with_for_update()
+                .all())
+
+        for job in jobs:
+            db.session.delete(job)
+
+        return {job.water_schedule_id for job in jobs}
+
+    @classmethod
+    def get_counts(cls):
+        """Returns a dict of the number of jobs in the queue:
+        {"queued": queued, "leased": leased, "failed": failed} where failed jobs used all their attempts."""
+
+        now = datetime.datetime.utcnow()
+        failed = cls.attempts >= RECOMPUTE_MAX_ATTEMPTS
+        leased = db.and_(cls.lease_expires_at >= now, db.not_(failed))
+
+        return {'queued': cls.query.filter(db.not_(leased), db.not_(failed)).count(),
+                'leased': cls.query.filter(leased).count(),
+                'failed': cls.query.filter(failed).count()}
+
+####################
+# Solar Models
+####################
+
+
+@dataclass
+class SolarDay(db.Model):
+    """A SolarDay caches the solar data for a date in a solar cell (see solar_cells), keyed on the cell's center.
+    Users in the same city share the cached data instead of calling the Sunset and sunrise times API again."""
+
+    __tablename__ = 'solar_days'
+    __table_args__ = (db.UniqueConstraint('latitude', 'longitude', 'date'),)
+
+    id: int
+    latitude: str
+    longitude: str
+    date: str
+    sunrise: str
+    sunset: str
+    solar_noon: str
+    day_length: str
+
+    id = db.Column(db.Integer, primary_key=True)
+    latitude = db.Column(db.Numeric(8, 6), nullable=False)
+    longitude = db.Column(db.Numeric(9, 6), nullable=False)
+    date = db.Column(db.Date, nullable=False, index=True)
+    sunrise = db.Column(db.DateTime, nullable=False)
+    sunset = db.Column(db.DateTime, nullable=False)
+    solar_noon = db.Column(db.DateTime, nullable=False)
+    day_length = db.Column(db.DateTime, nullable=False)
+
+    @classmethod
+    def get_cell(cls, latitude, longitude):
+        """Returns the latitude and longitude of the center of the solar cell for a set of coordinates."""
+        return get_cell_coordinates(latitude, longitude)
+
+    @classmethod
+    def get_day(cls, latitude, longitude, day):
+        """Returns the cached solar data for a location and date, or None if the date is not cached.
+        {"date": date, "sunrise": sunrise, "sunset": sunset, "day_length": day_length, "solar_noon": solar_noon}"""
+
+        cell_lat, cell_lng = cls.get_cell(latitude, longitude)
+        solar_day = cls.query.filter_by(
+            latitude=cell_lat, longitude=cell_lng, date=datetime.date(day.year, day.month, day.day)).first()
+
+        if solar_day:
+            return {'date': day,
+                    'sunrise': solar_day.sunrise,
+                    'sunset': solar_day.sunset,
+                    'solar_noon': solar_day.solar_noon,
+                    'day_length': solar_day.day_length}
+
+    @classmethod
+    def get_lock_key(cls, latitude, longitude, day):
+        """Returns the Postgres advisory lock key (a signed 64 bit integer) of the location cell and date."""
+
+        cell_lat, cell_lng = cls.get_cell(latitude, longitude)
+        digest = hashlib.blake2b(f'solar_days:{cell_lat}:{cell_lng}:{day:%Y-%m-%d}'.encode(), digest_size=8).digest()
+
+        return int.from_bytes(digest, 'big', signed=True)
+
+    @classmethod
+    @contextmanager
+    def lock_days(cls, latitude, longitude, days):
+        """Holds a Postgres advisory lock on the location cell of each date until the block exits, so when several
+        worker processes miss the same dates only one of them fetches the data and the others read it from the cache
+        after it is saved.
+
+        The locks are held on their own connection so saving the data commits without releasing them, and they are
+        taken in key order so workers locking overlapping dates never deadlock."""
+
+        keys = sorted({cls.get_lock_key(latitude, longitude, day) for day in days})
+        connection = db.engine.connect()
+
+        try:
+            for key in keys:
+                connection.execute(db.text('SELECT pg_advisory_lock(:key)'), {'key': key})
+            yield
+        finally:
+            connection.execute(db.text('SELECT pg_advisory_unlock_all()'))
+            connection.close()
+
+    @classmethod
+    def save_day(cls, latitude, longitude, data):
+        """Saves the solar data for a location to the cache.
+        If another request cached the same location and date first the existing row is kept."""
+
+        cell_lat, cell_lng = cls.get_cell(latitude, longitude)
+        day = data['date']
+
+        db.session.add(SolarDay(
+            latitude=cell_lat,
+            longitude=cell_lng,
+            date=datetime.date(day.year, day.month, day.day),
+            sunrise=data['sunrise'],
+            sunset=data['sunset'],
+            solar_noon=data['solar_noon'],
+            day_length=data['day_length']
+        ))
+
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+
+    @classmethod
+    def evict(cls, max_age=SOLAR_CACHE_MAX_AGE):
+        """Deletes the cached solar data for dates more than max_age days in the past and returns the number of rows deleted.
+        Forecasts start the day after a plant's last water date, so recent past dates are kept for late waterings."""
+
+        oldest_date = datetime.date.today() - datetime.timedelta(days=max_age)
+        deleted = cls.query.filter(cls.date < oldest_date).delete()
+        db.session.commit()
+
+        return deleted
+
+
+@dataclass
+class LightExposure(db.Model):
+    """A LightExposure holds the maximum light hours a light source receives on a date, from its owner's location and
+    its light type. The hours only depend on the date, so they are calculated once and averaged in SQL."""
+
+    __tablename__ = 'light_exposure_daily'
+    __table_args__ = (db.UniqueConstraint('light_source_id', 'date'),)
+
+    id: int
+    light_source_id: int
+    date: str
+    light_hours: float
+
+    id = db.Column(db.Integer, primary_key=True)
+    light_source_id = db.Column(db.Integer, db.ForeignKey(
+        'light_sources.id', ondelete='cascade'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    light_hours = db.Column(db.Float, nullable=False)
+
+    @classmethod
+    def save_hours(cls, rows):
+        """Saves a list of {"light_source_id": light_source_id, "date": date, "light_hours": light_hours} dicts,
+        keeping the rows that are already saved. Returns the number of rows added."""
+
+        if not rows:
+            return 0
+
+        statement = insert(cls.__table__).values(rows).on_conflict_do_nothing(
+            index_elements=['light_source_id', 'date'])
+
+        added = db.session.execute(statement).rowcount
+        db.session.commit()
+
+        return added
+
+    @classmethod
+    def get_saved_days(cls, first_date, last_date):
+        """Returns a dict of {light_source_id: (number of days saved, last date saved)} between two dates."""
+
+        rows = (db.session.query(cls.light_source_id, db.func.count(cls.date), db.func.max(cls.date))
+                .filter(cls.date >= first_date, cls.date <= last_date)
+                .group_by(cls.light_source_id)
+                .all())
+
+        return {light_source_id: (count, last_date) for light_source_id, count, last_date in rows}
+
+    @classmethod
+    def get_average_hours(cls, plant_id, first_date, days):
+        """Returns the average saved light hours of a plant's light source for the number of days from first_date,
+        or None if any of the days are not saved."""
+
+        average_hours, count = (db.session.query(db.func.avg(cls.light_hours), db.func.count(cls.date))
+                                .join(Plant, Plant.light_id == cls.light_source_id)
+                                .filter(Plant.id == plant_id,
+                                        cls.date >= first_date,
+                                        cls.date < first_date + datetime.timedelta(days=days))
+                                .one())
+
+        if count == days:
+            return average_hours
+
+    @classmethod
+    def get_hours(cls, plant_id, first_date, days):
+        """Returns a dict of {date: light_hours} of the saved light hours of a plant's light source for the number of
+        days from first_date."""
+
+        rows = (db.session.query(cls.date, cls.light_hours)
+                .join(Plant, Plant.light_id == cls.light_source_id)
+                .filter(Plant.id == plant_id,
+                        cls.date >= first_date,
+                        cls.date < first_date + datetime.timedelta(days=days))
+                .all())
+
+        return dict(rows)
+
+    @classmethod
+    def get_source_hours(cls, light_source_ids, first_date, last_date):
+        """Returns a dict of {(light_source_id, date): light_hours} of the saved light hours of the light sources
+        between two dates."""
+
+        rows = (db.session.query(cls.light_source_id, cls.date, cls.light_hours)
+                .filter(cls.light_source_id.in_(light_source_ids),
+                        cls.date >= first_date,
+                        cls.date <= last_date)
+                .all())
+
+        return {(light_source_id, day): light_hours for light_source_id, day, light_hours in rows}
+
+    @classmethod
+    def save_plant_hours(cls, plant_id, hours):
+        """Saves a dict of {date: light_hours} for a plant's light source, keeping the days that are already saved.
+        Returns the number of rows added."""
+
+        plant = Plant.query.get(plant_id)
+        if not plant or not plant.light_id:
+            return 0
+
+        return cls.save_hours([{'light_source_id': plant.light_id, 'date': day, 'light_hours': light_hours}
+                               for day, light_hours in hours.items()])
+
+    @classmethod
+    def clear_user(cls, user_id):
+        """Deletes the saved light hours of a user's light sources without committing, for when their location changes."""
+
+        light_source_ids = db.session.query(LightSource.id).join(Room, LightSource.room_id == Room.id).filter(
+            Room.user_id == user_id)
+        cls.query.filter(cls.light_source_id.in_(light_source_ids)).delete(synchronize_session=False)
+
+    @classmethod
+    def evict(cls, oldest_date):
+        """Deletes the saved light hours for dates before oldest_date and returns the number of rows deleted."""
+
+        deleted = cls.query.filter(cls.date < oldest_date).delete()
+        db.session.commit()
+
+        return deleted
+
+####################
+# Location Models
+####################
+
+
+@dataclass
+class GeocodeCache(db.Model):
+    """A GeocodeCache caches the MapQuest geocoding result for a normalized location string, so a popular location
+    is only geocoded once. Locations without city level coordinates are cached until expires_at."""
+
+    __tablename__ = 'geocode_cache'
+
+    location: str
+    latitude: str
+    longitude: str
+    quality_code: str
+    expires_at: str
+
+    location = db.Column(db.Text, primary_key=True)
+    latitude = db.Column(db.Numeric(8, 6), nullable=True)
+    longitude = db.Column(db.Numeric(9, 6), nullable=True)
+    quality_code = db.Column(db.String(10), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=True)
+
+    @classmethod
+    def get_coordinates(cls, location):
+        """Returns a tuple of True and the cached coordinates for a location, {"lat": lat, "lng": lng} or None if the
+        location could not be geocoded, or (False, None) if the location is not cached."""
+
+        cached = cls.query.filter(cls.location == location,
+                                  db.or_(cls.expires_at == None, cls.expires_at > datetime.datetime.utcnow())).first()
+        if not cached:
+            return False, None
+
+        if cached.latitude is None:
+            return True, None
+
+        return True, {'lat': float(cached.latitude), 'lng': float(cached.longitude)}
+
+    @classmethod
+    def save_coordinates(cls, location, coordinates, quality_code, negative_ttl=GEOCODE_NEGATIVE_TTL):
+        """Saves the geocoding result for a location, replacing an older result.
+        Coordinates of None cache the location as not found for negative_ttl hours."""
+
+        values = {'location': location,
+                  'latitude': coordinates['lat'] if coordinates else None,
+                  'longitude': coordinates['lng'] if coordinates else None,
+                  'quality_code': quality_code,
+                  'created_at': datetime.datetime.utcnow(),
+                  'expires_at': None if coordinates else
+                  datetime.datetime.utcnow() + datetime.timedelta(hours=negative_ttl)}
+
+        statement = insert(cls.__table__).values(values)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=['location'],
+            set_={column: statement.excluded[column] for column in values if column != 'location'}))
+        db.session.commit()
+
+    @classmethod
+    def evict(cls):
+        """Deletes the expired results and returns the number of rows deleted."""
+
+        deleted = cls.query.filter(cls.expires_at <= datetime.datetime.utcnow()).delete()
+        db.session.commit()
+
+        return deleted
+
 ####################
 # User Model
 ####################
@@ -190,6 +737,7 @@ class User(db.Model):
     email = db.Column(db.Text, nullable=False)
     latitude = db.Column(db.Numeric(8, 6))
     longitude = db.Column(db.Numeric(9, 6))
+    solar_cell = db.Column(db.BigInteger, nullable=True, index=True)
     username = db.Column(db.Text, unique=True, nullable=False)
     password = db.Column(db.Text, nullable=False)
 
@@ -209,6 +757,53 @@ class User(db.Model):
             "longitude": self.longitude
         }
 
+    @property
+    def get_cell_coordinates(self):
+        """Get and return the center coordinates of this user's solar cell, users in the same cell share forecasts."""
+
+        if self.latitude is None or self.longitude is None:
+            return self.get_coordinates
+
+        solar_cell = self.solar_cell if self.solar_cell is not None else get_cell_id(self.latitude, self.longitude)
+        latitude, longitude = get_cell_center(solar_cell)
+        return {
+            "latitude": latitude,
+            "longitude": longitude
+        }
+
+    def set_location(self, latitude, longitude):
+        """Sets this user's coordinates and solar cell."""
+
+        self.latitude = latitude
+        self.longitude = longitude
+        self.solar_cell = get_cell_id(latitude, longitude) if latitude is not None and longitude is not None else None
+
+    @classmethod
+    def assign_solar_cells(cls, chunk_size=1000):
+        """Saves the solar cell of every user with coordinates whose cell is missing or out of date, for users that
+        signed up before solar cells or after SOLAR_CELL_PRECISION changed. Returns the number of users updated."""
+
+        updated = 0
+        last_id = 0
+
+        while True:
+            rows = (db.session.query(cls.id, cls.latitude, cls.longitude, cls.solar_cell)
+                    .filter(cls.id > last_id, cls.latitude != None, cls.longitude != None)
+                    .order_by(cls.id)
+                    .limit(chunk_size)
+                    .all())
+            if not rows:
+                return updated
+
+            last_id = rows[-1].id
+            mappings = [{'id': row.id, 'solar_cell': get_cell_id(row.latitude, row.longitude)} for row in rows
+                        if row.solar_cell != get_cell_id(row.latitude, row.longitude)]
+
+            if mappings:
+                db.session.bulk_update_mappings(cls, mappings)
+                db.session.commit()
+                updated += len(mappings)
+
     @classmethod
     def create_access_token(cls, user):
         """Generates a JWT for a newly created user or authenticated user. Token is valid for 30 minutes before authentication is required again. """
@@ -259,11 +854,10 @@ class User(db.Model):
             public_id=str(uuid.uuid4()),
             name=name,
             email=email,
-            latitude=latitude,
-            longitude=longitude,
             username=username,
             password=hashed_pwd
         )
+        new_user.set_location(latitude, longitude)
 
         db.session.add(new_user)
         return new_user
@@ -0,0 +1,86 @@
+"""Water Forecast Prefetch.
+
+Calculates the next water interval for plants coming due before their owners water them, so watering a plant only
+needs a WaterForecast lookup instead of a solar forecast."""
+
+import os
+import time
+import datetime
+import logging
+from models import db, WaterSchedule, WaterForecast, Plant, PlantType, LightSource, User, SolarDay, LightExposure
+from water_calculator import WaterCalculator
+from shared_cache import get_solar_cache
+
+# days past their next water date that overdue plants are still prefetched, they are the most likely to be watered next
+PREFETCH_LOOKBACK_DAYS = int(os.getenv('PREFETCH_LOOKBACK_DAYS', 30))
+
+
+def get_due_schedules(hours, limit=None, lookback_days=PREFETCH_LOOKBACK_DAYS):
+    """Returns a list of (water_schedule, plant_type, light_type, user) for the non-manual water schedules with
+    natural light that are due to be watered within the next number of hours, or were due within the last lookback_days,
+    soonest first."""
+
+    now = datetime.datetime.now()
+
+    query = (db.session.query(WaterSchedule, PlantType, LightSource.type, User)
+             .join(Plant, WaterSchedule.plant_id == Plant.id)
+             .join(PlantType, Plant.type_id == PlantType.id)
+             .join(LightSource, Plant.light_id == LightSource.id)
+             .join(User, Plant.user_id == User.id)
+             .filter(WaterSchedule.manual_mode == False,
+                     LightSource.type != 'Artificial',
+                     WaterSchedule.next_water_date >= now - datetime.timedelta(days=lookback_days),
+                     WaterSchedule.next_water_date <= now + datetime.timedelta(hours=hours))
+             .order_by(WaterSchedule.next_water_date))
+
+    if limit:
+        query = query.limit(limit)
+
+    return query.all()
+
+
+def prefetch_forecasts(hours=48, limit=None, delay=0):
+    """Prefetches the water interval of every plant due within the next number of hours, and of the overdue plants.
+    Waits delay seconds after each calculation to throttle the load on the solar provider.
+
+    Returns a report dict: {"due": due, "overdue": overdue, "warm": warm, "overdue_warm": overdue_warm,
+    "prefetched": prefetched, "failed": failed, "warm_ratio": warm_ratio} where due includes the overdue plants and
+    warm counts the forecasts that were already prefetched for the current inputs."""
+
+    report = {'due': 0, 'overdue': 0, 'warm': 0, 'overdue_warm': 0, 'prefetched': 0, 'failed': 0}
+    now = datetime.datetime.now()
+
+    for water_schedule, plant_type, light_type, user in get_due_schedules(hours, limit):
+        overdue = water_schedule.next_water_date < now
+        report['due'] += 1
+        report['overdue'] += overdue
+
+        if WaterForecast.get_interval(user, plant_type, water_schedule, light_type):
+            report['warm'] += 1
+            report['overdue_warm'] += overdue
+            continue
+
+        try:
+            water_calculator = WaterCalculator(
+                user=user,
+                plant_type=plant_type,
+                water_schedule=water_schedule,
+                light_type=light_type,
+                solar_cache=get_solar_cache(SolarDay),
+                light_exposure=LightExposure
+            )
+            WaterForecast.save_interval(user, plant_type, water_schedule, light_type,
+                                        water_calculator.calculate_water_interval())
+            report['prefetched'] += 1
+
+        except Exception as err:
+            db.session.rollback()
+            logging.error(f'Error prefetching water schedule {water_schedule.id}: {err}')
+            report['failed'] += 1
+
+        if delay:
+            time.sleep(delay)
+
+    report['warm_ratio'] = report['warm'] / report['due'] if report['due'] else 0
+
+    return report
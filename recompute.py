@@ -0,0 +1,286 @@
+"""Nightly Water Date Recompute.
+
+Recalculates the next water date of every non-manual water schedule with natural light, so next_water_date follows
+the seasons between waterings instead of only changing when a plant is watered.
+
+Water schedules are streamed from the database in chunks by id, the water intervals of each chunk are calculated with
+the batch water calculator in a pool of worker processes, and the changed next water dates are written back with one
+bulk update per chunk. The water_interval and water_date are left unchanged, so running the job again gives the same
+next water dates.
+
+A water schedule's water_interval was already adjusted by the water calculator when the plant was watered, so the
+recompute repeats that calculation: it adjusts the base_interval over the base_water_date forecast window with the
+current solar data, and moves the next water date by the difference from the calculated_interval, which keeps any
+snoozed days. Schedules whose interval was never adjusted use their own water_date and water_interval.
+
+Like WaterCalculator with saved daily light hours, a schedule whose whole forecast window is saved in
+light_exposure_daily (by the light exposure job, or by waterings forecast with the SOLAR_PROVIDER chain) uses the
+average of the saved hours. The other schedules are forecast with the local solar equations of solar_batch.
+
+To spread the recompute over several nodes, enqueue the water schedules as RecomputeJobs and run a recompute worker on
+each node. Workers claim batches of jobs from Postgres with SKIP LOCKED leases, so no broker is needed."""
+
+import os
+import time
+import socket
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from models import db, WaterSchedule, Plant, PlantType, LightSource, User, RecomputeJob, LightExposure
+from batch_water_calculator import calculate_water_intervals
+
+# water schedules read, calculated and written together
+RECOMPUTE_CHUNK_SIZE = int(os.getenv('RECOMPUTE_CHUNK_SIZE', 2000))
+# worker processes, 0 uses every core
+RECOMPUTE_WORKERS = int(os.getenv('RECOMPUTE_WORKERS', 0))
+# recompute jobs a queue worker claims at once, and seconds before a crashed worker's jobs can be claimed again
+RECOMPUTE_BATCH_SIZE = int(os.getenv('RECOMPUTE_BATCH_SIZE', 500))
+RECOMPUTE_LEASE = int(os.getenv('RECOMPUTE_LEASE', 300))
+
+
+def get_schedule_query():
+    """Returns a query of the columns the calculation needs for the non-manual water schedules with natural light of
+    users with coordinates, in id order. Only the columns are loaded, the ORM objects are never built."""
+
+    return (db.session.query(WaterSchedule.id, WaterSchedule.next_water_date, WaterSchedule.water_date,
+                             WaterSchedule.water_interval, WaterSchedule.base_water_date, WaterSchedule.base_interval,
+                             WaterSchedule.calculated_interval, Plant.light_id, LightSource.type,
+                             PlantType.base_sunlight, PlantType.max_days_without_water, User.latitude,
+                             User.longitude, User.solar_cell)
+            .join(Plant, WaterSchedule.plant_id == Plant.id)
+            .join(PlantType, Plant.type_id == PlantType.id)
+            .join(LightSource, Plant.light_id == LightSource.id)
+            .join(User, Plant.user_id == User.id)
+            .filter(WaterSchedule.manual_mode == False,
+                    LightSource.type != 'Artificial',
+                    User.latitude != None,
+                    User.longitude != None)
+            .order_by(WaterSchedule.id))
+
+
+def get_chunk(rows):
+    """Accepts rows of get_schedule_query, returns a list of (water_schedule_id, next_water_date, record).
+    The record is the forecast window and interval the water calculator adjusts, with the water schedule's next water
+    date before the adjustment in 'unadjusted_next_water_date' and the saved average light hours of the window in
+    'saved_average_hours' (see add_saved_average_hours)."""
+
+    chunk = []
+    for row in rows:
+        if row.base_interval is None:
+            water_date, water_interval, calculated_interval = row.water_date, row.water_interval, row.water_interval
+        else:
+            water_date, water_interval, calculated_interval = (row.base_water_date, row.base_interval,
+                                                               row.calculated_interval)
+
+        chunk.append((row.id, row.next_water_date, {
+            'light_source_id': row.light_id,
+            'latitude': float(row.latitude),
+            'longitude': float(row.longitude),
+            'solar_cell': row.solar_cell,
+            'water_date': water_date,
+            'water_interval': water_interval,
+            'light_type': row.type,
+            'base_sunlight': row.base_sunlight,
+            'max_days_without_water': row.max_days_without_water,
+            'unadjusted_next_water_date': row.water_date + timedelta(days=row.water_interval - calculated_interval)}))
+
+    add_saved_average_hours([record for _, _, record in chunk])
+
+    return chunk
+
+
+def add_saved_average_hours(records):
+    """Sets 'saved_average_hours' of every record whose forecast window is saved in light_exposure_daily to the
+    average of the saved daily light hours, with one query for the records. Records with missing days are forecast
+    by the batch water calculator."""
+
+    windows = []
+    for record in records:
+        water_date = record['water_date']
+        first_date = date(water_date.year, water_date.month, water_date.day) + timedelta(days=1)
+        windows.append((record, [first_date + timedelta(days=day) for day in range(record['water_interval'])]))
+
+    windows = [(record, days) for record, days in windows if days]
+    if not windows:
+        return
+
+    saved_hours = LightExposure.get_source_hours({record['light_source_id'] for record, _ in windows},
+                                                 min(days[0] for _, days in windows),
+                                                 max(days[-1] for _, days in windows))
+
+    for record, days in windows:
+        hours = [saved_hours.get((record['light_source_id'], day)) for day in days]
+        if None not in hours:
+            record['saved_average_hours'] = sum(hours) / len(hours)
+
+
+def get_schedule_chunks(chunk_size):
+    """Yields lists of (water_schedule_id, next_water_date, record) for every water schedule of get_schedule_query,
+    chunk_size at a time in id order."""
+
+    query = get_schedule_query()
+
+    last_id = 0
+    while True:
+        rows = query.filter(WaterSchedule.id > last_id).limit(chunk_size).all()
+        if not rows:
+            return
+
+        last_id = rows[-1].id
+        yield get_chunk(rows)
+
+
+def save_next_water_dates(chunk, new_water_intervals):
+    """Bulk updates the next water date of the water schedules in the chunk whose date changed, without committing.
+    Returns the number of water schedules updated."""
+
+    mappings = []
+    for (water_schedule_id, next_water_date, record), water_interval in zip(chunk, new_water_intervals):
+        if water_interval is None:
+            continue
+
+        new_next_water_date = record['unadjusted_next_water_date'] + timedelta(days=water_interval)
+        if new_next_water_date != next_water_date:
+            mappings.append({'id': water_schedule_id, 'next_water_date': new_next_water_date})
+
+    if mappings:
+        db.session.bulk_update_mappings(WaterSchedule, mappings)
+
+    return len(mappings)
+
+
+def recompute_water_dates(chunk_size=RECOMPUTE_CHUNK_SIZE, workers=RECOMPUTE_WORKERS):
+    """Recomputes the next water date of every non-manual water schedule with natural light.
+    Uses workers processes (0 for one per core, 1 calculates in this process).
+
+    Returns a report dict: {"schedules": schedules, "updated": updated, "failed": failed, "seconds": seconds,
+    "plants_per_second": plants_per_second}"""
+
+    workers = workers or os.cpu_count() or 1
+    report = {'schedules': 0, 'updated': 0, 'failed': 0}
+    start = time.perf_counter()
+
+    def save(chunk, get_water_intervals):
+        report['schedules'] += len(chunk)
+        try:
+            report['updated'] += save_next_water_dates(chunk, get_water_intervals())
+            db.session.commit()
+            return
+        except Exception as err:
+            db.session.rollback()
+            logging.warning(f'Error recomputing water schedules {chunk[0][0]} to {chunk[-1][0]}, '
+                            f'recomputing them one at a time: {err}')
+
+        # only the water schedules that fail on their own are counted as failed
+        for row in chunk:
+            try:
+                report['updated'] += save_next_water_dates([row], calculate_water_intervals([row[2]]))
+                db.session.commit()
+            except Exception as err:
+                db.session.rollback()
+                logging.error(f'Error recomputing water schedule {row[0]}: {err}')
+                report['failed'] += 1
+
+    if workers == 1:
+        for chunk in get_schedule_chunks(chunk_size):
+            save(chunk, lambda: calculate_water_intervals([record for _, _, record in chunk]))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # keep every worker busy while this process reads and writes, without loading the whole table
+            pending = deque()
+            for chunk in get_schedule_chunks(chunk_size):
+                future = executor.submit(calculate_water_intervals, [record for _, _, record in chunk])
+                pending.append((chunk, future.result))
+                if len(pending) >= workers * 2:
+                    save(*pending.popleft())
+
+            while pending:
+                save(*pending.popleft())
+
+    report['seconds'] = time.perf_counter() - start
+    report['plants_per_second'] = report['schedules'] / report['seconds'] if report['seconds'] else 0
+
+    return report
+
+
+def recompute_jobs(worker_id, water_schedule_ids):
+    """Recomputes the next water dates of the water schedule ids claimed by the worker and commits them together with
+    the completed jobs. Returns the set of completed water schedule ids and the number of water schedules updated."""
+
+    chunk = get_chunk(get_schedule_query().filter(WaterSchedule.id.in_(water_schedule_ids)).all())
+    new_water_intervals = calculate_water_intervals([record for _, _, record in chunk])
+
+    # schedules that are no longer recomputed (manual mode, artificial light) are completed without a result
+    completed = RecomputeJob.complete(worker_id, water_schedule_ids)
+    held = [i for i, (water_schedule_id, _, _) in enumerate(chunk) if water_schedule_id in completed]
+    updated = save_next_water_dates([chunk[i] for i in held], [new_water_intervals[i] for i in held])
+    db.session.commit()
+
+    return completed, updated
+
+
+def enqueue_recompute_jobs():
+    """Queues a recompute job for every water schedule of get_schedule_query that is not queued yet.
+    Returns the number of jobs added."""
+
+    return RecomputeJob.enqueue(get_schedule_query().with_entities(WaterSchedule.id))
+
+
+def run_recompute_worker(worker_id=None, batch_size=RECOMPUTE_BATCH_SIZE, lease=RECOMPUTE_LEASE, wait=0,
+                         max_batches=None):
+    """Claims batches of recompute jobs and recomputes their next water dates until the queue is empty.
+    With wait seconds the worker polls the queue instead of stopping when it is empty.
+
+    The new next water dates and the completed jobs are committed together. If the worker loses its lease to another
+    worker the batch is left to that worker. If a batch fails its jobs are recomputed one at a time, and only the jobs
+    that fail on their own are claimed again after the lease expires.
+
+    Returns a report dict: {"worker_id": worker_id, "batches": batches, "claimed": claimed, "completed": completed,
+    "updated": updated, "lost": lost, "failed": failed, "seconds": seconds, "plants_per_second": plants_per_second}"""
+
+    worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+    report = {'worker_id': worker_id, 'batches': 0, 'claimed': 0, 'completed': 0, 'updated': 0, 'lost': 0,
+              'failed': 0}
+    start = time.perf_counter()
+
+    while max_batches is None or report['batches'] < max_batches:
+        water_schedule_ids = RecomputeJob.claim(worker_id, batch_size, lease)
+
+        if not water_schedule_ids:
+            if not wait:
+                break
+            time.sleep(wait)
+            continue
+
+        report['batches'] += 1
+        report['claimed'] += len(water_schedule_ids)
+
+        failed = 0
+        try:
+            completed, updated = recompute_jobs(worker_id, water_schedule_ids)
+            report['updated'] += updated
+        except Exception as err:
+            db.session.rollback()
+            logging.warning(f'Error recomputing water schedules {water_schedule_ids[0]} to {water_schedule_ids[-1]}, '
+                            f'recomputing them one at a time: {err}')
+
+            completed = set()
+            for water_schedule_id in water_schedule_ids:
+                try:
+                    job_completed, updated = recompute_jobs(worker_id, [water_schedule_id])
+                    completed |= job_completed
+                    report['updated'] += updated
+                except Exception as err:
+                    db.session.rollback()
+                    logging.error(f'Error recomputing water schedule {water_schedule_id}: {err}')
+                    failed += 1
+
+        report['completed'] += len(completed)
+        report['lost'] += len(water_schedule_ids) - len(completed) - failed
+        report['failed'] += failed
+
+    report['seconds'] = time.perf_counter() - start
+    report['plants_per_second'] = report['completed'] / report['seconds'] if report['seconds'] else 0
+
+    return report
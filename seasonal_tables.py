@@ -0,0 +1,136 @@
+"""Precomputed Seasonal Light Tables & helper methods.
+
+The new water interval of a plant only depends on the average daily light hours of its light type in the forecast
+window, the plant type's base sunlight and max days without water, and the current interval. A build step precomputes
+the running totals of the daily light hours for a grid of latitudes over two years, so the average light hours of any
+forecast window is the difference of two totals, and the water endpoint can calculate the new interval in constant time
+without any solar calculations.
+
+Every light type's hours are a mix of the day length, the morning (sunrise to solar noon) and the afternoon (solar
+noon to sunset), so the table stores the running totals of those 3 and the light type's coefficients are applied when
+the table is read. Longitude only shifts the solar events in time and is ignored.
+
+Averages close to a threshold of WaterCalculator.calculate_water_interval fall back to the full calculation, so the
+small interpolation error of the table never changes an interval."""
+
+import os
+import logging
+from datetime import date
+import numpy as np
+from batch_water_calculator import get_adjustment
+from solar_batch import LIGHT_COEFFICIENTS, get_solar_times
+from solar_tables import TABLE_YEAR, TROPICAL_YEAR
+
+SEASONAL_TABLE_PATH = os.getenv('SEASONAL_TABLE_PATH', 'generator/seasonal_light.npy')
+# degrees of latitude between the rows of the table
+SEASONAL_TABLE_RESOLUTION = 0.5
+# 'calculator' always runs the full water calculation, 'table' looks the interval up in the seasonal table first
+WATER_INTERVAL_PROVIDER = os.getenv('WATER_INTERVAL_PROVIDER', 'calculator')
+# averages within this many hours of a threshold fall back to the full calculation
+SEASONAL_TABLE_MARGIN = float(os.getenv('SEASONAL_TABLE_MARGIN', 0.05))
+# differences between the average light hours and the base sunlight where the water interval adjustment changes
+THRESHOLDS = (-10, -9, -6, -3, -1, 1, 3, 6, 9, 10)
+TABLE_DAYS = 2 * 366
+
+_tables = {}
+
+
+def build_seasonal_table(path=SEASONAL_TABLE_PATH, resolution=SEASONAL_TABLE_RESOLUTION):
+    """Calculates the running totals of the day length, morning and afternoon hours for every latitude row over two
+    years from January 1st of the table year and saves the table to path. The table shape is
+    (latitudes, TABLE_DAYS + 1, 3), column 0 is all zeros so a window's total is always the difference of two columns.
+    Returns the table."""
+
+    rows = int(round(180 / resolution)) + 1
+    latitudes = np.linspace(-90, 90, rows)
+
+    times = get_solar_times(latitudes, np.zeros(rows), [date(TABLE_YEAR, 1, 1)] * rows, TABLE_DAYS)
+    hours = np.stack([times['day_length'],
+                      times['solar_noon'] - times['sunrise'],
+                      times['sunset'] - times['solar_noon']], axis=-1) / 60
+
+    table = np.zeros((rows, TABLE_DAYS + 1, 3))
+    table[:, 1:] = np.cumsum(hours, axis=1)
+
+    np.save(path, table)
+    return table
+
+
+class SeasonalTable:
+    """A memory-mapped table of the running totals of the daily light hours."""
+
+    def __init__(self, path=SEASONAL_TABLE_PATH):
+        self.path = path
+        self.table = np.load(path, mmap_mode='r')
+        self.resolution = 180 / (self.table.shape[0] - 1)
+
+    def get_day_position(self, day):
+        """Returns the fractional table column of a date, the calendar date in the table year plus the drift of the
+        sun's position between the table year and the date's year."""
+
+        table_date = date(TABLE_YEAR, day.month, day.day)
+        drift = (date(day.year, day.month, day.day) - table_date).days - (day.year - TABLE_YEAR) * TROPICAL_YEAR
+
+        return (table_date - date(TABLE_YEAR, 1, 1)).days + drift
+
+    def get_average_light_hours(self, latitude, first_date, days, light_type):
+        """Returns the average daily light hours of a light type for the number of days starting at first_date,
+        interpolating between the two nearest latitude rows and days. Returns None for light types without a solar
+        forecast or windows longer than a year."""
+
+        if light_type not in LIGHT_COEFFICIENTS or not 0 < days <= 366:
+            return None
+
+        row_position = (float(latitude) + 90) / self.resolution
+        row = min(int(row_position), self.table.shape[0] - 2)
+        row_weight = row_position - row
+
+        column_position = min(max(self.get_day_position(first_date), 0), 366)
+        column = min(int(column_position), 365)
+        column_weight = column_position - column
+
+        # window totals of the 2 rows for the windows starting on the day before and after the position,
+        # plain Python arithmetic on the 8 cells is faster than NumPy operations on such small arrays
+        starts = self.table[row:row + 2, column:column + 2].tolist()
+        ends = self.table[row:row + 2, column + days:column + days + 2].tolist()
+        totals = [[[end - start for start, end in zip(row_starts[i], row_ends[i])] for i in range(2)]
+                  for row_starts, row_ends in zip(starts, ends)]
+
+        coefficients = LIGHT_COEFFICIENTS[light_type][0 if float(latitude) > 0 else 1]
+        hours = [[sum(c * total for c, total in zip(coefficients, window)) for window in windows] for windows in totals]
+
+        total = ((hours[0][0] * (1 - column_weight) + hours[0][1] * column_weight) * (1 - row_weight)
+                 + (hours[1][0] * (1 - column_weight) + hours[1][1] * column_weight) * row_weight)
+
+        return total / days
+
+    def get_water_interval(self, latitude, water_date, water_interval, light_type, base_sunlight,
+                           max_days_without_water, margin=SEASONAL_TABLE_MARGIN):
+        """Returns the new water interval WaterCalculator.calculate_water_interval would calculate, or None if the
+        table can not answer: light types without a solar forecast, windows longer than a year, or averages within
+        margin hours of a threshold."""
+
+        first_date = date(water_date.year, water_date.month, water_date.day).toordinal() + 1
+        average_hours = self.get_average_light_hours(latitude, date.fromordinal(first_date), water_interval, light_type)
+        if average_hours is None:
+            return None
+
+        difference = average_hours - base_sunlight
+        if min(abs(difference - threshold) for threshold in THRESHOLDS) < margin:
+            return None
+
+        new_water_interval = min(water_interval + get_adjustment(difference), max_days_without_water)
+        return new_water_interval if new_water_interval > 0 else 3
+
+
+def get_seasonal_table(path=SEASONAL_TABLE_PATH):
+    """Returns the SeasonalTable for a path, the file is only memory-mapped once per process.
+    Returns None if the table has not been built."""
+
+    if path not in _tables:
+        try:
+            _tables[path] = SeasonalTable(path)
+        except FileNotFoundError:
+            logging.warning(f'Seasonal table {path} not found, run flask build-seasonal-tables')
+            _tables[path] = None
+    return _tables[path]
@@ -0,0 +1,348 @@
+"""Shared Cache classes & helper methods.
+
+Gunicorn runs several worker processes, so a cache in one worker's memory is cold in every other worker. A shared
+cache keeps the solar data and geocoding results where every worker can read them, so one worker's API call warms all
+of them: a SQLite file shared by the workers of a host, or a Redis server shared by every host.
+
+Entries expire after a TTL and the least recently used entries are evicted past max_entries (Redis evicts with its own
+maxmemory-policy, set it to allkeys-lru). Each backend counts its hits and misses, and the counts of every worker are
+added up in the backend so the hit rate covers the whole deployment.
+
+A shared cache that fails is treated as a miss, so the APIs are called as if there was no cache."""
+
+import os
+import time
+import pickle
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+
+# 'none' disables the shared cache, 'memory' caches in each process, 'sqlite' shares a file between the worker
+# processes of a host, 'redis' shares a Redis server between hosts (pip install redis)
+SHARED_CACHE_BACKEND = os.getenv('SHARED_CACHE_BACKEND', 'none')
+SHARED_CACHE_PATH = os.getenv('SHARED_CACHE_PATH', 'shared_cache.sqlite3')
+SHARED_CACHE_URL = os.getenv('SHARED_CACHE_URL', 'redis://localhost:6379/0')
+# seconds an entry is kept, and the number of entries kept by the memory and sqlite backends
+SHARED_CACHE_TTL = int(os.getenv('SHARED_CACHE_TTL', 7 * 24 * 60 * 60))
+SHARED_CACHE_MAX_ENTRIES = int(os.getenv('SHARED_CACHE_MAX_ENTRIES', 100000))
+# operations counted in a process before its hit and miss counts are added to the backend
+STATS_FLUSH_EVERY = 100
+# sets between evictions of the sqlite backend, and seconds before a hit updates an entry's last access again
+SQLITE_EVICT_EVERY = 100
+SQLITE_TOUCH_AFTER = 60
+STATS = ('hits', 'misses', 'sets', 'errors')
+
+_caches = {}
+
+
+class SharedCache:
+    """The interface of a shared cache backend. Values are any picklable objects.
+
+    Backends implement read, write, add_stats and read_stats, this class handles the TTL default, the hit and miss
+    counts and errors."""
+
+    name = None
+
+    def __init__(self, ttl=SHARED_CACHE_TTL):
+        self.ttl = ttl
+        self.counts = dict.fromkeys(STATS, 0)
+        self.unflushed = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the cached value for a key, or None if it is not cached, has expired or the backend failed."""
+
+        try:
+            value = self.read(key)
+        except Exception as err:
+            logging.warning(f'{self.name} cache read failed: {err}')
+            self.count('errors')
+            return None
+
+        self.count('misses' if value is None else 'hits')
+        return value
+
+    def set(self, key, value, ttl=None):
+        """Caches a value for a key for ttl seconds, or the cache's default TTL."""
+
+        try:
+            self.write(key, value, ttl or self.ttl)
+        except Exception as err:
+            logging.warning(f'{self.name} cache write failed: {err}')
+            self.count('errors')
+            return
+
+        self.count('sets')
+
+    def count(self, stat):
+        """Counts an operation, and adds the counts to the backend every STATS_FLUSH_EVERY operations."""
+
+        with self.lock:
+            self.counts[stat] += 1
+            self.unflushed += 1
+            if self.unflushed < STATS_FLUSH_EVERY:
+                return
+            counts, self.counts, self.unflushed = self.counts, dict.fromkeys(STATS, 0), 0
+
+        try:
+            self.add_stats(counts)
+        except Exception as err:
+            logging.warning(f'{self.name} cache stats failed: {err}')
+
+    def get_stats(self):
+        """Returns the counts of every process that uses the backend, plus this process' counts that have not been
+        added yet, and the hit rate.
+        {"backend": name, "hits": hits, "misses": misses, "sets": sets, "errors": errors, "hit_rate": hit_rate}"""
+
+        stats = self.read_stats()
+        with self.lock:
+            stats = {stat: stats.get(stat, 0) + self.counts[stat] for stat in STATS}
+
+        lookups = stats['hits'] + stats['misses']
+        return {'backend': self.name, **stats, 'hit_rate': stats['hits'] / lookups if lookups else 0}
+
+    def read(self, key):
+        raise NotImplementedError
+
+    def write(self, key, value, ttl):
+        raise NotImplementedError
+
+    def add_stats(self, counts):
+        raise NotImplementedError
+
+    def read_stats(self):
+        raise NotImplementedError
+
+
+class MemoryCache(SharedCache):
+    """A least recently used cache in this process' memory, for a single worker and tests."""
+
+    name = 'memory'
+
+    def __init__(self, ttl=SHARED_CACHE_TTL, max_entries=SHARED_CACHE_MAX_ENTRIES):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.stats = dict.fromkeys(STATS, 0)
+
+    def read(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if not entry:
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+            return value
+
+    def write(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.time() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def add_stats(self, counts):
+        with self.lock:
+            for stat, count in counts.items():
+                self.stats[stat] = self.stats.get(stat, 0) + count
+
+    def read_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+
+class SQLiteCache(SharedCache):
+    """A cache in a SQLite file shared by the worker processes of a host.
+
+    Each thread and process opens its own connection. Hits only update an entry's last access once every
+    SQLITE_TOUCH_AFTER seconds, and every SQLITE_EVICT_EVERY sets the expired entries and the least recently used
+    entries past max_entries are deleted."""
+
+    name = 'sqlite'
+
+    def __init__(self, path=SHARED_CACHE_PATH, ttl=SHARED_CACHE_TTL, max_entries=SHARED_CACHE_MAX_ENTRIES):
+        super().__init__(ttl)
+        self.path = path
+        self.max_entries = max_entries
+        self.local = threading.local()
+        self.sets = 0
+
+        with self.get_connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS cache '
+                               '(key TEXT PRIMARY KEY, value BLOB, expires_at REAL, accessed_at REAL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)')
+            connection.execute('CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, count INTEGER)')
+
+    def get_connection(self):
+        """Returns this thread's connection, opening a new one after the process forks."""
+
+        if getattr(self.local, 'pid', None) != os.getpid():
+            self.local.connection = sqlite3.connect(self.path, timeout=5)
+            self.local.connection.execute('PRAGMA journal_mode=WAL')
+            self.local.connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.pid = os.getpid()
+
+        return self.local.connection
+
+    def read(self, key):
+        connection = self.get_connection()
+        row = connection.execute('SELECT value, expires_at, accessed_at FROM cache WHERE key = ?', (key,)).fetchone()
+        if not row:
+            return None
+
+        value, expires_at, accessed_at = row
+        now = time.time()
+        if expires_at <= now:
+            return None
+
+        if now - accessed_at >= SQLITE_TOUCH_AFTER:
+            with connection:
+                connection.execute('UPDATE cache SET accessed_at = ? WHERE key = ?', (now, key))
+
+        return pickle.loads(value)
+
+    def write(self, key, value, ttl):
+        now = time.time()
+        connection = self.get_connection()
+
+        with connection:
+            connection.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)',
+                               (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), now + ttl, now))
+
+        self.sets += 1
+        if self.sets % SQLITE_EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        """Deletes the expired entries and the least recently used entries past max_entries.
+        Returns the number of entries deleted."""
+
+        connection = self.get_connection()
+
+        with connection:
+            deleted = connection.execute('DELETE FROM cache WHERE expires_at <= ?', (time.time(),)).rowcount
+            deleted += connection.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)).rowcount
+
+        return deleted
+
+    def add_stats(self, counts):
+        with self.get_connection() as connection:
+            connection.executemany('INSERT INTO stats VALUES (?, ?) ON CONFLICT (name) DO UPDATE '
+                                   'SET count = count + excluded.count', counts.items())
+
+    def read_stats(self):
+        return dict(self.get_connection().execute('SELECT name, count FROM stats').fetchall())
+
+
+class RedisCache(SharedCache):
+    """A cache on a Redis server shared by every host. Entries expire with Redis' own TTL and the least recently used
+    entries are evicted by the server's maxmemory-policy."""
+
+    name = 'redis'
+
+    def __init__(self, url=SHARED_CACHE_URL, ttl=SHARED_CACHE_TTL, prefix='water_mate:'):
+        super().__init__(ttl)
+
+        # redis is only needed for this backend
+        import redis
+        self.client = redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+        self.prefix = prefix
+
+    def read(self, key):
+        value = self.client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def write(self, key, value, ttl):
+        self.client.set(self.prefix + key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ex=ttl)
+
+    def add_stats(self, counts):
+        pipeline = self.client.pipeline()
+        for stat, count in counts.items():
+            pipeline.hincrby(self.prefix + 'stats', stat, count)
+        pipeline.execute()
+
+    def read_stats(self):
+        return {name.decode(): int(count) for name, count in self.client.hgetall(self.prefix + 'stats').items()}
+
+
+def create_shared_cache(backend=SHARED_CACHE_BACKEND):
+    """Creates and returns the shared cache for a backend name, or None for 'none'."""
+
+    if backend == 'memory':
+        return MemoryCache()
+    if backend == 'sqlite':
+        return SQLiteCache()
+    if backend == 'redis':
+        return RedisCache()
+    if backend != 'none':
+        raise ValueError(f'Unknown shared cache backend {backend}')
+
+
+def get_shared_cache(backend=SHARED_CACHE_BACKEND):
+    """Returns the process' shared cache for a backend, it is only created once per process.
+    Returns None if the shared cache is disabled."""
+
+    if backend not in _caches:
+        _caches[backend] = create_shared_cache(backend)
+    return _caches[backend]
+
+
+class SharedSolarCache:
+    """A solar cache (see SolarCalculator) that reads through the shared cache before a persistent cache
+    (models.SolarDay). Data read from the persistent cache is copied to the shared cache, and new data is saved to
+    both. Entries are keyed on the persistent cache's location cell when it has one."""
+
+    def __init__(self, shared, persistent=None):
+        self.shared = shared
+        self.persistent = persistent
+
+    def get_key(self, latitude, longitude, day):
+        if self.persistent and hasattr(self.persistent, 'get_cell'):
+            latitude, longitude = self.persistent.get_cell(latitude, longitude)
+        return f'solar:{latitude}:{longitude}:{day:%Y-%m-%d}'
+
+    def get_day(self, latitude, longitude, day):
+        """Returns the cached solar data for a location and date, or None if the date is not cached."""
+
+        key = self.get_key(latitude, longitude, day)
+        data = self.shared.get(key)
+        if data:
+            return {**data, 'date': day}
+
+        if self.persistent:
+            data = self.persistent.get_day(latitude, longitude, day)
+            if data:
+                self.shared.set(key, data)
+
+        return data
+
+    def save_day(self, latitude, longitude, data):
+        """Saves the solar data for a location to the shared and persistent caches."""
+
+        self.shared.set(self.get_key(latitude, longitude, data['date']), data)
+        if self.persistent:
+            self.persistent.save_day(latitude, longitude, data)
+
+    def lock_days(self, latitude, longitude, days):
+        """Holds the persistent cache's lock on the dates, see models.SolarDay.lock_days."""
+
+        if self.persistent and hasattr(self.persistent, 'lock_days'):
+            return self.persistent.lock_days(latitude, longitude, days)
+        return nullcontext()
+
+
+def get_solar_cache(persistent=None):
+    """Returns the solar cache to read through: the persistent cache behind the shared cache, or only the persistent
+    cache if the shared cache is disabled."""
+
+    shared = get_shared_cache()
+    return SharedSolarCache(shared, persistent) if shared else persistent
@@ -0,0 +1,65 @@
+"""Single Flight class.
+
+Deduplicates identical concurrent calls in a process: while a call for a key is in flight, other callers with the same
+key wait for it and share its result instead of calling the external API again. Across worker processes the solar
+cache holds a Postgres advisory lock for each location cell and date while it is fetched, see SolarDay.lock_days."""
+
+import threading
+
+
+class Call:
+    """A call in flight, its waiters block on the done event."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """A thread safe group of calls in flight by key.
+
+    The first caller of a key runs the function, callers that arrive before it returns wait for it and get the same
+    result, or the same error raised again. The key is forgotten as soon as the call returns, so results are never
+    cached here."""
+
+    def __init__(self):
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def do(self, key, function, *args, **kwargs):
+        """Calls the function for a key unless a call for the key is already in flight.
+        Returns a tuple of the result and True if it was shared from another caller's call."""
+
+        with self.lock:
+            call = self.calls.get(key)
+            shared = call is not None
+            if shared:
+                call.waiters += 1
+            else:
+                call = self.calls[key] = Call()
+
+        if shared:
+            call.done.wait()
+            if call.error:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = function(*args, **kwargs)
+        except Exception as err:
+            call.error = err
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def in_flight(self):
+        """Returns the number of keys with a call in flight."""
+
+        with self.lock:
+            return len(self.calls)
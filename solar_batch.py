@@ -0,0 +1,126 @@
+"""Batch Solar Forecast & helper methods.
+
+A NumPy version of the solar position equations in solar_position.py that calculates the daily light hours for many
+locations and days at once, for example a nightly recompute of every plant or every plant in a room."""
+
+import numpy as np
+from solar_position import SUNRISE_ZENITH, MINUTES_PER_DAY
+
+# Light hours for a light type are: day_length * day + (solar_noon - sunrise) * morning + (sunset - solar_noon) * afternoon
+# The fractions match SolarCalculator.get_daily_sunlight.
+# {light_type: ((day, morning, afternoon) northern hemisphere, (day, morning, afternoon) southern hemisphere)}
+LIGHT_COEFFICIENTS = {
+    'North': ((0.0625, 0, 0), (0.75, 0, 0)),
+    'East': ((0, 1, 0), (0, 1, 0)),
+    'South': ((0.75, 0, 0), (0.0625, 0, 0)),
+    'West': ((0, 0, 1), (0, 0, 1)),
+    'Northeast': ((0.125, 0, 0), (0.6, 0, 0)),
+    'Northwest': ((0.125, 0, 0), (0.6, 0, 0)),
+    'Southeast': ((0.6, 0, 0), (0.125, 0, 0)),
+    'Southwest': ((0.6, 0, 0), (0.125, 0, 0)),
+}
+
+
+def get_julian_days(start_dates, horizon):
+    """Accepts a list of start dates and a number of days, returns a 2-D array of the Julian Day at midnight UTC
+    for each day from the start date."""
+
+    epoch_days = np.asarray(start_dates, dtype='datetime64[D]').astype(np.int64)
+    return 2440587.5 + epoch_days[:, np.newaxis] + np.arange(horizon)
+
+
+def get_sun_parameters(julian_days):
+    """Vectorized solar_position.get_sun_parameters, returns arrays of the declination (degrees) and the
+    equation of time (minutes)."""
+
+    jc = (julian_days - 2451545) / 36525
+
+    mean_long = np.mod(280.46646 + jc * (36000.76983 + jc * 0.0003032), 360)
+    mean_anom = np.radians(357.52911 + jc * (35999.05029 - 0.0001537 * jc))
+    eccentricity = 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+
+    eq_of_center = (np.sin(mean_anom) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+                    + np.sin(2 * mean_anom) * (0.019993 - 0.000101 * jc)
+                    + np.sin(3 * mean_anom) * 0.000289)
+    omega = np.radians(125.04 - 1934.136 * jc)
+    apparent_long = np.radians(mean_long + eq_of_center - 0.00569 - 0.00478 * np.sin(omega))
+
+    mean_obliquity = 23 + (26 + (21.448 - jc * (46.815 + jc * (0.00059 - jc * 0.001813))) / 60) / 60
+    obliquity = np.radians(mean_obliquity + 0.00256 * np.cos(omega))
+
+    declination = np.degrees(np.arcsin(np.sin(obliquity) * np.sin(apparent_long)))
+
+    mean_long = np.radians(mean_long)
+    var_y = np.tan(obliquity / 2) ** 2
+    eq_of_time = 4 * np.degrees(var_y * np.sin(2 * mean_long)
+                                - 2 * eccentricity * np.sin(mean_anom)
+                                + 4 * eccentricity * var_y * np.sin(mean_anom) * np.cos(2 * mean_long)
+                                - 0.5 * var_y ** 2 * np.sin(4 * mean_long)
+                                - 1.25 * eccentricity ** 2 * np.sin(2 * mean_anom))
+
+    return declination, eq_of_time
+
+
+def get_hour_angles(latitudes, declinations):
+    """Vectorized solar_position.get_hour_angle, returns an array of sunrise hour angles in degrees."""
+
+    lat = np.radians(latitudes)
+    dec = np.radians(declinations)
+    cos_hour_angle = np.cos(np.radians(SUNRISE_ZENITH)) / (np.cos(lat) * np.cos(dec)) - np.tan(lat) * np.tan(dec)
+
+    return np.degrees(np.arccos(np.clip(cos_hour_angle, -1, 1)))
+
+
+def get_solar_times(latitudes, longitudes, start_dates, horizon):
+    """Calculates the solar events for each location for the horizon number of days starting at its start date.
+
+    Returns a dict of 2-D arrays (locations x days) of minutes from midnight UTC on each date:
+    {"sunrise": sunrise, "sunset": sunset, "solar_noon": solar_noon, "day_length": day_length}"""
+
+    latitudes = np.asarray(latitudes, dtype=float)[:, np.newaxis]
+    longitudes = np.asarray(longitudes, dtype=float)[:, np.newaxis]
+    julian_days = get_julian_days(start_dates, horizon)
+
+    solar_noon = 720 - 4 * longitudes + np.zeros(julian_days.shape)
+    for _ in range(2):
+        declination, eq_of_time = get_sun_parameters(julian_days + solar_noon / MINUTES_PER_DAY)
+        solar_noon = 720 - 4 * longitudes - eq_of_time
+
+    events = {}
+    for name, direction in [('sunrise', -1), ('sunset', 1)]:
+        event = solar_noon
+        for _ in range(2):
+            declination, eq_of_time = get_sun_parameters(julian_days + event / MINUTES_PER_DAY)
+            event = 720 - 4 * longitudes - eq_of_time + direction * get_hour_angles(latitudes, declination) * 4
+        events[name] = event
+
+    return {'sunrise': events['sunrise'],
+            'sunset': events['sunset'],
+            'solar_noon': solar_noon,
+            'day_length': np.minimum(events['sunset'] - events['sunrise'], MINUTES_PER_DAY)}
+
+
+def get_light_coefficients(latitudes, light_types):
+    """Returns a (locations x 3) array of the day, morning and afternoon coefficients for each light type,
+    using the northern or southern hemisphere fractions from the latitude."""
+
+    return np.array([LIGHT_COEFFICIENTS[light_type][0 if float(latitude) > 0 else 1]
+                     for latitude, light_type in zip(latitudes, light_types)], dtype=float)
+
+
+def get_daily_light_hours(latitudes, longitudes, start_dates, horizon, light_types):
+    """Calculates the maximum daily light hours for many locations at once.
+
+    Accepts equal length lists of latitudes, longitudes, start dates and light types, and the number of days to forecast.
+    Returns a 2-D array (locations x days) of light hours where column 0 is the start date.
+
+    Raises a KeyError for light types without a solar forecast (Artificial)."""
+
+    times = get_solar_times(latitudes, longitudes, start_dates, horizon)
+    coefficients = get_light_coefficients(latitudes, light_types)
+
+    minutes = (times['day_length'] * coefficients[:, 0:1]
+               + (times['solar_noon'] - times['sunrise']) * coefficients[:, 1:2]
+               + (times['sunset'] - times['solar_noon']) * coefficients[:, 2:3])
+
+    return minutes / 60
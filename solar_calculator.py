@@ -1,27 +1,111 @@
 """Solar Calculator & helper methods."""
 
-import requests
+import os
 import logging
-from requests.exceptions import HTTPError
-from datetime import date, datetime, timedelta
-from tzlocal import get_localzone
+import http_client
+from collections import OrderedDict
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
 import urllib3
+from solar_position import get_solar_times
+from solar_tables import get_solar_table
+from circuit_breaker import CircuitBreaker
+from single_flight import SingleFlight
+from solar_providers import get_provider_chain, get_primary_provider_names
 
 # disable InsecureRequestWarning
 urllib3.disable_warnings()
 
-BASE_URL = 'https://api.sunrise-sunset.org/json'
+BASE_URL = os.getenv('SUNRISE_SUNSET_URL', 'https://api.sunrise-sunset.org/json')
+
+# the ordered chain of solar providers, comma separated, see solar_providers.py. 'local' calculates the solar data
+# offline, 'table' looks it up in the precomputed solar tables, 'remote' reads the cache then calls the Sunset and
+# sunrise times API and falls back to 'local'
+SOLAR_PROVIDER = os.getenv('SOLAR_PROVIDER', 'local')
+# maximum number of remote days fetched at the same time, 1 fetches the days one after another
+SOLAR_MAX_CONCURRENCY = int(os.getenv('SOLAR_MAX_CONCURRENCY', 8))
+# get_daily_sunlight evaluates every k-th day and interpolates the rest, 1 evaluates every day
+SOLAR_SAMPLE_EVERY = int(os.getenv('SOLAR_SAMPLE_EVERY', 1))
+# the largest change in the daily change of day length (hours/day^2) anywhere between latitudes -60 and 60, 0.00349 at
+# latitude -60 in the southern summer when the earth is closest to the sun
+MAX_DAY_LENGTH_CURVATURE = 0.0035
+# consecutive API failures before the circuit opens, and seconds between recovery probes while it is open
+SOLAR_BREAKER_FAILURES = int(os.getenv('SOLAR_BREAKER_FAILURES', 5))
+SOLAR_BREAKER_RESET = float(os.getenv('SOLAR_BREAKER_RESET', 30))
+# number of remote days kept in memory to serve while the API is failing
+LAST_KNOWN_SIZE = 1024
+
+
+def parse_iso_datetime(string):
+    """Takes an ISO-8601 datetime string of the Sunset and sunrise times API, "2021-05-30T12:16:00+00:00",
+    and returns an aware datetime in UTC."""
+
+    # fromisoformat does not accept a Z suffix before Python 3.11
+    if string[-1] == 'Z':
+        string = string[:-1] + '+00:00'
+
+    moment = datetime.fromisoformat(string)
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def fetch_remote_results(latitude, longitude, day):
+    """Calls the Sunset and sunrise times API for a location and date and returns the results dict, with ISO-8601
+    UTC datetimes and the day length in seconds.
+    Raises an error if the API can not be reached, responds with an error, or the results status is not OK."""
+
+    # verify=False will not verify certifificates this is a workaround until the API provider fixes SSL issues
+    # formatted=0 returns ISO-8601 datetimes and seconds, which are parsed without any string conversions
+    response = http_client.get(BASE_URL, params={
+        'lat': str(latitude),
+        'lng': str(longitude),
+        'date': day.strftime('%Y-%m-%d'),
+        'formatted': 0
+    }, verify=False)
+    # if the request is successfull this will not raise an HTTPError
+    response.raise_for_status()
+
+    data = response.json()
+    if data['status'] != 'OK':
+        raise ValueError(f"Sunset and sunrise times API status {data['status']}")
+
+    return data['results']
+
+
+# the probe asks for any location's solar data, it only checks that the API responds
+remote_breaker = CircuitBreaker(
+    'Sunset and sunrise times API',
+    failure_threshold=SOLAR_BREAKER_FAILURES,
+    reset_timeout=SOLAR_BREAKER_RESET,
+    probe=lambda: fetch_remote_results(0, 0, date.today())
+)
+last_known_data = OrderedDict()
+# remote days being fetched in this process, concurrent requests for the same location and date share one API call
+remote_flights = SingleFlight()
 
 
 class SolarCalculator:
     """A class to get the solar forcast calculations based on a user' location,
-    the current date, the water_interval (number of days between waterings), and the light type."""
+    the current date, the water_interval (number of days between waterings), and the light type.
 
-    def __init__(self, user_location, current_date, water_interval, light_type):
+    The solar data comes from the chain of providers named by provider, see solar_providers.py. An optional cache
+    (models.SolarDay) stores the data from the Sunset and sunrise times API so it is only fetched once for each location
+    and date. When many users in a city water at once, identical remote requests in a process share
+    one API call, and a cache with lock_days makes the worker processes fetch each uncached date only once."""
+
+    def __init__(self, user_location, current_date, water_interval, light_type, provider=None, cache=None,
+                 max_concurrency=None):
         self.user_location = user_location
         self.current_date = current_date
         self.water_interval = water_interval
         self.light_type = light_type
+        self.provider = provider or SOLAR_PROVIDER
+        self.cache = cache
+        self.max_concurrency = max_concurrency or SOLAR_MAX_CONCURRENCY
+        # the name of the provider that returned the solar data of each date this calculator evaluated
+        self.solar_sources = {}
 
     def generate_dates(self):
         """Generate and return a list of dates starting with the day after the current date
@@ -34,140 +118,233 @@ class SolarCalculator:
 
         return dates
 
-    def convert_str_to_datetime(self, date, time):
-        """Takes a date object and a time string, combines both into a string then returns the datetime object."""
-
-        converted_time = None
-        # added this condition to account for total_daylight case which does not have AM/PM.
-        if time[-2:] != 'AM' and time[-2:] != 'PM':
-            converted_time = time
-        elif time[1] == ':':
-            length = len(time)
-            new_time = time.zfill(length + 1)
-            converted_time = self.convert_12_to_24(new_time)
-        else:
-            converted_time = self.convert_12_to_24(time)
-
-        date_time_str = date.strftime('%Y-%m-%d') + ' ' + converted_time
-
-        return datetime.strptime(date_time_str, '%Y-%m-%d %H:%M:%S')
-
-    def convert_12_to_24(self, string):
-        """Accepts a string, evaluates the string and converts from 12 hour to 24 hour time.
-        Solution found here: https://www.geeksforgeeks.org/python-program-convert-time-12-hour-24-hour-format/."""
-
-        # Check if last two elements of time is AM and first two elements are 12
-        if string[-2:] == 'AM' and string[:2] == '12':
-            return '00' + string[2:-3]
-        # remove the AM
-        if string[-2:] == 'AM':
-            return string[:-3]
-        # Check if last two elements of time is PM and first two elements are 12
-        if string[-2:] == 'PM' and string[:2] == '12':
-            return string[:-3]
-        # add 12 to hours and remove PM
-        return str(int(string[:2]) + 12) + string[2:8]
-
-    def get_utc_difference(self):
-        """Gets the local system timezone and returns the current timezone difference in hours from UTC."""
-        # get system timezone
-        local_tz = get_localzone()
-        # get current date/timezone
-        date = datetime.now(local_tz)
-        # get the total seconds difference from UTC time
-        utc_offset = date.utcoffset().total_seconds()
-        return utc_offset / 60 / 60
+    def convert_minutes_to_datetime(self, day, minutes):
+        """Takes a date object and the minutes from midnight, returns the datetime object rounded to the nearest second."""
+
+        midnight = datetime(day.year, day.month, day.day)
+        return midnight + timedelta(seconds=round(minutes * 60))
 
     def get_data(self, day):
-        """Calls the Sunset and sunrise times API for a given date with the user_location.
-        Returns the JSON data in dict for this date/location.
+        """Returns the solar data for a given date with the user_location from the configured providers.
+        {"date": date, "sunrise": sunrise, "sunset": sunset, "day_length": day_length, "solar_noon": solar_noon}."""
+
+        return self.get_solar_schedule([day])[0]
+
+    def get_remote_or_fallback_data(self, day):
+        """Returns a tuple of the solar data for a given date and True if it was fetched from the Sunset and sunrise
+        times API.
+
+        While the API is failing, or its circuit breaker is open, the last known API data for the location and date is
+        returned instead with False so it is not cached, or None if the API never returned it.
+
+        If the same location and date is already being fetched in this process the data of that call is returned with
+        False, the caller that fetched it caches it."""
+
+        key = (str(self.user_location['latitude']), str(self.user_location['longitude']), day)
+
+        try:
+            data, shared = remote_flights.do(key, self.get_remote_data, day)
+        except Exception as err:
+            logging.warning(f'Using the last known solar data for {day}: {err}')
+            return last_known_data.get(key), False
+
+        if shared:
+            return data, False
+
+        last_known_data[key] = data
+        if len(last_known_data) > LAST_KNOWN_SIZE:
+            last_known_data.popitem(last=False)
+
+        return data, True
+
+    def get_remote_days(self, days):
+        """Fetches the remote solar data for the dates that are not cached, with up to max_concurrency requests at once
+        so the forecast takes about as long as the slowest request instead of the sum of all of them, and saves them to
+        the cache.
+
+        Returns the data in the same order as the dates, with None for the days that fail to fetch and have no last
+        known data. The cache is only used from this thread because database sessions are not shared between threads."""
+
+        if not days:
+            return []
+
+        with self.lock_cached_days(days):
+            # another worker may have fetched some of the dates while this one waited for the lock
+            solar_schedule = [self.get_cached_data(day) for day in days]
+            missing = [i for i, data in enumerate(solar_schedule) if not data]
+
+            if not missing:
+                return solar_schedule
+
+            if self.max_concurrency > 1 and len(missing) > 1:
+                with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(missing))) as executor:
+                    results = list(executor.map(self.get_remote_or_fallback_data, [days[i] for i in missing]))
+            else:
+                results = [self.get_remote_or_fallback_data(days[i]) for i in missing]
+
+            for i, (data, fetched) in zip(missing, results):
+                solar_schedule[i] = data
+                if fetched:
+                    self.save_cached_data(data)
+
+        return solar_schedule
+
+    def get_cached_data(self, day):
+        """Returns the cached solar data for a given date, or None if there is no cache or the date is not cached."""
+
+        if self.cache:
+            return self.cache.get_day(self.user_location['latitude'], self.user_location['longitude'], day)
+
+    def lock_cached_days(self, days):
+        """Returns a context manager that holds the cache's lock on the dates for the user_location while they are
+        fetched, or does nothing if there is no cache or it can not be locked."""
+
+        if self.cache and hasattr(self.cache, 'lock_days'):
+            return self.cache.lock_days(self.user_location['latitude'], self.user_location['longitude'], days)
+
+        return nullcontext()
+
+    def save_cached_data(self, data):
+        """Saves the solar data to the cache if there is one."""
+
+        if self.cache and data:
+            self.cache.save_day(self.user_location['latitude'], self.user_location['longitude'], data)
+
+    def get_local_data(self, day):
+        """Calculates the solar data for a given date with the user_location without any network calls.
+        Returns the same dict as the Sunset and sunrise times API data.
         {"date": date, "sunrise": sunrise, "sunset": sunset, "day_length": day_length, "solar_noon": solar_noon}.
 
-        The API will always return the data for the provided geocoordinates but in UTC time instead of the local time,
-        and our application only knows dates and times that are timezone naive and assume that sunrise/sunset will
-        fall on the same day (because they do).
+        All times are in UTC, sunrise falls on the previous day or sunset falls on the following day when the event
+        crosses midnight UTC, so the time differences are correct in every timezone without any adjustments.
+        During polar day the day_length is capped at 23:59:59."""
 
-        Therefore, adjustments are needed for different timezones to account for the fact that in some timezones sunset
-        falls on the next day in UTC and in other timezones, sunrise falls on the previous day in UTC.
+        times = get_solar_times(self.user_location['latitude'], self.user_location['longitude'], day)
+        return self.convert_times_to_data(day, times)
 
-        Timezones -12 to +5 must add 1 day to the sunset time so that our application correctly calculates the time difference.
-        This is because sunset time will fall on the following day in UTC time for these timezones.
+    def get_table_data(self, day):
+        """Looks up the solar data for a given date with the user_location in the memory-mapped solar tables.
+        Returns the same dict as get_local_data to within a minute.
+        {"date": date, "sunrise": sunrise, "sunset": sunset, "day_length": day_length, "solar_noon": solar_noon}."""
 
-        For example:
-        - In Seattle, WA on 5/30/21 the UTC difference is -7
-        - Sunrise in localtime is 5:16 AM on Sunday 5/30, but the API provided time is 12:16 PM UTC.
-        - Sunset in localtime is 8:57 PM on Sunday 5/30, but the API provided time is 3:57 AM UTC.
-        - Our application thinks that sunrise is 12:16 PM and sunset is 3:57 AM on 5/30 which will calculate the time difference incorrectly
-        so we add a day to our sunset time so our application knows we are working with 12:16 PM 5/30 to 3:57 AM 5/31.
+        times = get_solar_table().get_solar_times(self.user_location['latitude'], self.user_location['longitude'], day)
+        return self.convert_times_to_data(day, times)
+
+    def convert_times_to_data(self, day, times):
+        """Takes a date object and a dict of solar event minutes from midnight UTC, returns the solar data dict.
+        {"date": date, "sunrise": sunrise, "sunset": sunset, "day_length": day_length, "solar_noon": solar_noon}."""
+
+        day_length = min(round(times['day_length'] * 60), 86399)
+
+        return {'date': day,
+                'sunrise': self.convert_minutes_to_datetime(day, times['sunrise']),
+                'sunset': self.convert_minutes_to_datetime(day, times['sunset']),
+                'solar_noon': self.convert_minutes_to_datetime(day, times['solar_noon']),
+                'day_length': datetime(day.year, day.month, day.day) + timedelta(seconds=day_length)}
 
-        Timezones +6 to +12 must subtract 1 day from the sunrise time so that our application correctly calculates the time difference.
-        This is because sunrise will fall on the previous day in UTC time for these timezones.
+    def validate_data(self, day):
+        """Compares the local solar data for a given date with the Sunset and sunrise times API.
+        Returns a dict of the absolute difference in seconds for each solar event."""
+
+        local_data = self.get_local_data(day)
+        remote_data = self.get_remote_data(day)
+
+        return {key: abs((local_data[key] - remote_data[key]).total_seconds())
+                for key in ('sunrise', 'sunset', 'solar_noon', 'day_length')}
+
+    def get_remote_data(self, day):
+        """Calls the Sunset and sunrise times API for a given date with the user_location.
+        Returns the JSON data in dict for this date/location.
+        {"date": date, "sunrise": sunrise, "sunset": sunset, "day_length": day_length, "solar_noon": solar_noon}.
+        Raises an error if the API call fails or CircuitOpenError while the API's circuit breaker is open.
+
+        The API returns the times of the requested date at the geocoordinates as ISO-8601 UTC datetimes, with their real
+        UTC dates: in timezones behind UTC sunset can fall on the following day in UTC, and in timezones ahead of UTC
+        sunrise can fall on the previous day in UTC. Our application only knows timezone naive datetimes, so each time is
+        converted to a naive UTC datetime and keeps its UTC date, and the time differences are correct in every timezone
+        without knowing the user's timezone.
 
         For example:
-        - In Dhaka, Bangladesh on 5/30/21 the UTC difference is +6
-        - Sunrise in localtime is 5:11 AM on Sunday 5/30, but the time provided by the API is 11:11 PM UTC.
-        - Sunset in localtime is 6:40 PM on Sunday 5/20, but the API  provided time is 12:40 PM UTC.
-        - Our application thinks that sunrise is 11:11 PM 5/30 and sunset is 12:40 PM 5/30 and this will calculate the time difference incorrectly
-        so we subtract 1 day from sunrise so our application knows we are working with 11:11 PM 5/29 to 12:40 PM 5/30.
+        - In Seattle, WA on 5/30/21 sunrise is 5:16 AM and sunset is 8:57 PM local time, the API returns 12:16 PM 5/30
+        and 3:57 AM 5/31 UTC, so our application works with 12:16 PM 5/30 to 3:57 AM 5/31.
+
+        - In Dhaka, Bangladesh on 5/30/21 sunrise is 5:11 AM and sunset is 6:40 PM local time, the API returns 11:11 PM
+        5/29 and 12:40 PM 5/30 UTC, so our application works with 11:11 PM 5/29 to 12:40 PM 5/30.
 
         """
 
-        # convert all of the request params into strings
-        str_lat = str(self.user_location['latitude'])
-        str_lng = str(self.user_location['longitude'])
-        str_day = day.strftime('%Y-%m-%d')
+        results = remote_breaker.call(
+            fetch_remote_results, self.user_location['latitude'], self.user_location['longitude'], day)
 
-        response = ''
-        try:
-            # verify=False will not verify certifificates this is a workaround until the API provider fixes SSL issues
-            response = requests.get(BASE_URL, params={
-                'lat': str_lat,
-                'lng': str_lng,
-                'date': str_day
-            }, verify=False)
-            # if the request is successfull this will not raise an HTTPError
-            response.raise_for_status()
-        except HTTPError as http_err:
-            logging.debug(http_err)
-        except Exception as err:
-            logging.error(err)
-
-        results = response.json()['results']
-
-        # Get the system time UTC difference in hours.
-        # This will tell us which timezone the current local time falls under and therefore which date modification to use in our time calculations.
-        utc_diff = self.get_utc_difference()
-
-        if response.json()['status'] == 'OK':
-            # If the utc_diff is -12 to 5 hours difference from UTC add 1 day to sunset calculation.
-            if utc_diff in range(-12, 6):
-                return {'date': day,
-                        'sunrise': self.convert_str_to_datetime(day, results['sunrise']),
-                        'sunset': self.convert_str_to_datetime(day + timedelta(days=1), results['sunset']),
-                        'solar_noon': self.convert_str_to_datetime(day, results['solar_noon']),
-                        'day_length': self.convert_str_to_datetime(day, results['day_length'])}
-
-            # If the utc_diff is 6 to 12 hours difference from UTC subract 1 day from sunrise calculation.
-            if utc_diff in range(6, 13):
-                return {'date': day,
-                        'sunrise': self.convert_str_to_datetime(day - timedelta(days=1), results['sunrise']),
-                        'sunset': self.convert_str_to_datetime(day, results['sunset']),
-                        'solar_noon': self.convert_str_to_datetime(day, results['solar_noon']),
-                        'day_length': self.convert_str_to_datetime(day, results['day_length'])}
-
-    def get_solar_schedule(self):
-        """Generates and returns a list of data for given number of dates:
-        [{"date": date, "sunrise": sunrise, "sunset": sunset, "day_length": day_length, "solar_noon": solar_noon}, {etc.]"""
-
-        solar_schedule = []
-        dates = self.generate_dates()
-
-        for day in dates:
-            data = self.get_data(day)
-            solar_schedule.append(data)
+        return self.convert_remote_results(day, results)
+
+    def convert_remote_results(self, day, results):
+        """Takes a date object and the formatted=0 results of the Sunset and sunrise times API, returns the solar data
+        dict of the date."""
+
+        midnight = datetime(day.year, day.month, day.day)
+
+        # parse_iso_datetime converts to UTC, the naive datetimes keep the real UTC dates of the times
+        return {'date': day,
+                'sunrise': parse_iso_datetime(results['sunrise']).replace(tzinfo=None),
+                'sunset': parse_iso_datetime(results['sunset']).replace(tzinfo=None),
+                'solar_noon': parse_iso_datetime(results['solar_noon']).replace(tzinfo=None),
+                'day_length': midnight + timedelta(seconds=int(results['day_length']))}
+
+    def get_sample_indexes(self, sample_every):
+        """Returns the indexes of the dates to evaluate when sampling every k-th date: 0, k, 2k, ... and the last date."""
+
+        indexes = list(range(0, self.water_interval, sample_every))
+        if indexes[-1] != self.water_interval - 1:
+            indexes.append(self.water_interval - 1)
+
+        return indexes
+
+    def get_sampling_error_bound(self, sample_every):
+        """Returns the maximum error in hours of an interpolated day in get_daily_sunlight compared to evaluating every day.
+
+        Linear interpolation between samples k days apart is off by at most k^2 / 8 times the largest second derivative
+        of the light hours. Light hours are at most all of the day length, and the day length curves at most
+        MAX_DAY_LENGTH_CURVATURE hours/day^2 between latitudes -60 and 60, so sampling every 7th day is within 0.022 hours
+        (about 1.3 minutes) of the full calculation. Closer to the poles the error can be larger."""
+
+        return sample_every ** 2 / 8 * MAX_DAY_LENGTH_CURVATURE
+
+    def get_solar_schedule(self, dates=None):
+        """Generates and returns a list of data for given number of dates, or for every date in the water_interval:
+        [{"date": date, "sunrise": sunrise, "sunset": sunset, "day_length": day_length, "solar_noon": solar_noon}, {etc.]
+
+        Each provider of the chain is asked for the dates the providers before it missed. Dates that no provider has get
+        the local solar data as a seasonal estimate."""
+
+        dates = dates if dates is not None else self.generate_dates()
+        solar_schedule = [None] * len(dates)
+        missing = list(range(len(dates)))
+
+        for provider in get_provider_chain(self.provider):
+            if not missing:
+                break
+
+            results = provider.get_timed_days(self, [dates[i] for i in missing])
+            for i, data in zip(missing, results):
+                solar_schedule[i] = data
+                if data:
+                    self.solar_sources[dates[i]] = provider.name
+            missing = [i for i in missing if not solar_schedule[i]]
+
+        for i in missing:
+            logging.warning(f'No solar provider has the solar data for {dates[i]}, using the local solar data')
+            solar_schedule[i] = self.get_local_data(dates[i])
+            self.solar_sources[dates[i]] = None
 
         return solar_schedule
 
+    def is_primary_data(self, day):
+        """Returns True if the solar data of a date was evaluated by this calculator with one of the primary providers
+        of its chain, False for dates that were interpolated or that got a fallback estimate."""
+
+        return day in self.solar_sources and self.solar_sources[day] in get_primary_provider_names(self.provider)
+
     def get_fraction_of_time(self, time, fraction):
         """ Accepts time (total daily hours), and a fraction that represents the fraction of total time we need. 
         Converts time into a duration of time then gets the fraction of that time.
@@ -181,14 +358,44 @@ class SolarCalculator:
 
         return fraction_of_total_time
 
-    def get_daily_sunlight(self):
+    def get_daily_sunlight(self, sample_every=1):
         """Calculates the maximum amount of light that a light_type can recieve given the user location, the date, and the type of light source. Uses data from the solar forecast to calculate the maximum sunlight potential for each day.
 
         For calculating East and West lightsource types subtracting the later time from the first time difference = later_time - first_time creates a datetime object that only holds the difference.
 
+        Day length changes smoothly, so with sample_every greater than 1 only every k-th day and the last day are evaluated
+        and the days in between are interpolated, see get_sampling_error_bound for the accuracy.
+
         Returns a list of time deltas that equal the maximum potential sunlight for each day."""
 
-        solar_forcast = self.get_solar_schedule()
+        if sample_every and sample_every > 1 and self.water_interval > 2:
+            dates = self.generate_dates()
+            indexes = self.get_sample_indexes(sample_every)
+            samples = self.get_daily_sunlight_for_dates([dates[i] for i in indexes])
+            return self.interpolate_daily_sunlight(indexes, samples)
+
+        return self.get_daily_sunlight_for_dates(self.generate_dates())
+
+    def interpolate_daily_sunlight(self, indexes, samples):
+        """Accepts the sorted date indexes that were evaluated and their time deltas,
+        returns a time delta for every date in the water_interval with linear interpolation between the samples."""
+
+        daily_sunlight = []
+
+        for i in range(len(indexes) - 1):
+            start, end = indexes[i], indexes[i + 1]
+            for day in range(start, end):
+                fraction = (day - start) / (end - start)
+                daily_sunlight.append(samples[i] + (samples[i + 1] - samples[i]) * fraction)
+
+        daily_sunlight.append(samples[-1])
+
+        return daily_sunlight
+
+    def get_daily_sunlight_for_dates(self, dates):
+        """Calculates the maximum potential sunlight for each of the dates, returns a list of time deltas."""
+
+        solar_forcast = self.get_solar_schedule(dates)
 
         solar_noon_times = [date['solar_noon'] for date in solar_forcast]
         sunrise_times = [date['sunrise'] for date in solar_forcast]
@@ -0,0 +1,40 @@
+"""Solar Cells & helper methods.
+
+Solar data changes by less than a minute a day across a few kilometers, so users are grouped into solar cells: a grid
+of SOLAR_CELL_PRECISION decimal degrees (0.01 degrees is about 1 km). A user's cell is saved on users.solar_cell when
+their location is set, and solar forecasts, the solar caches and batch forecasts use the cell's center instead of the
+user's exact coordinates, so the number of distinct forecasts grows with the number of cells instead of users."""
+
+import os
+import math
+
+# decimals of a degree the grid is divided into, cells are 10 ** -SOLAR_CELL_PRECISION degrees on each side
+SOLAR_CELL_PRECISION = int(os.getenv('SOLAR_CELL_PRECISION', 2))
+
+
+def get_cell_id(latitude, longitude, precision=SOLAR_CELL_PRECISION):
+    """Returns the integer id of the solar cell of a set of coordinates: the cell's row from the south pole times the
+    number of columns, plus its column from longitude -180."""
+
+    scale = 10 ** precision
+    columns = 360 * scale
+
+    row = math.floor((float(latitude) + 90) * scale + 0.5)
+    column = math.floor((float(longitude) + 180) * scale + 0.5) % columns
+
+    return row * columns + column
+
+
+def get_cell_center(cell_id, precision=SOLAR_CELL_PRECISION):
+    """Returns the (latitude, longitude) of the center of a solar cell, rounded to the precision."""
+
+    scale = 10 ** precision
+    row, column = divmod(cell_id, 360 * scale)
+
+    return round(row / scale - 90, precision), round(column / scale - 180, precision)
+
+
+def get_cell_coordinates(latitude, longitude, precision=SOLAR_CELL_PRECISION):
+    """Returns the (latitude, longitude) of the center of the solar cell of a set of coordinates."""
+
+    return get_cell_center(get_cell_id(latitude, longitude, precision), precision)
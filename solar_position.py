@@ -0,0 +1,107 @@
+"""Solar Position equations & helper methods.
+
+An offline replacement for the Sunset and sunrise times API that uses the NOAA solar calculator equations:
+https://gml.noaa.gov/grad/solcalc/calcdetails.html
+
+All times are returned as minutes from midnight UTC on the requested date. Times may be negative (the event falls
+on the previous day in UTC) or greater than 1440 (the event falls on the following day in UTC), which keeps sunrise,
+solar noon and sunset in order for every timezone."""
+
+from datetime import datetime
+from math import acos, asin, cos, degrees, radians, sin, tan
+
+# the sun's apparent radius plus atmospheric refraction at the horizon
+SUNRISE_ZENITH = 90.833
+MINUTES_PER_DAY = 1440
+
+
+def get_julian_day(day, minutes=0):
+    """Accepts a date or datetime and the minutes past midnight UTC, returns the Julian Day for that moment."""
+
+    midnight = datetime(day.year, day.month, day.day)
+    # 2440587.5 is the Julian Day of the unix epoch (1970-01-01 00:00 UTC)
+    return 2440587.5 + (midnight - datetime(1970, 1, 1)).days + minutes / MINUTES_PER_DAY
+
+
+def get_sun_parameters(julian_day):
+    """Accepts a Julian Day and returns a tuple of the sun's declination (degrees) and the equation of time (minutes)."""
+
+    jc = (julian_day - 2451545) / 36525
+
+    mean_long = (280.46646 + jc * (36000.76983 + jc * 0.0003032)) % 360
+    mean_anom = 357.52911 + jc * (35999.05029 - 0.0001537 * jc)
+    eccentricity = 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+
+    eq_of_center = (sin(radians(mean_anom)) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+                    + sin(radians(2 * mean_anom)) * (0.019993 - 0.000101 * jc)
+                    + sin(radians(3 * mean_anom)) * 0.000289)
+    true_long = mean_long + eq_of_center
+    omega = radians(125.04 - 1934.136 * jc)
+    apparent_long = true_long - 0.00569 - 0.00478 * sin(omega)
+
+    mean_obliquity = 23 + (26 + (21.448 - jc * (46.815 + jc * (0.00059 - jc * 0.001813))) / 60) / 60
+    obliquity = mean_obliquity + 0.00256 * cos(omega)
+
+    declination = degrees(asin(sin(radians(obliquity)) * sin(radians(apparent_long))))
+
+    var_y = tan(radians(obliquity / 2)) ** 2
+    eq_of_time = 4 * degrees(var_y * sin(2 * radians(mean_long))
+                             - 2 * eccentricity * sin(radians(mean_anom))
+                             + 4 * eccentricity * var_y * sin(radians(mean_anom)) * cos(2 * radians(mean_long))
+                             - 0.5 * var_y ** 2 * sin(4 * radians(mean_long))
+                             - 1.25 * eccentricity ** 2 * sin(2 * radians(mean_anom)))
+
+    return declination, eq_of_time
+
+
+def get_hour_angle(latitude, declination):
+    """Returns the sunrise hour angle in degrees for a latitude and solar declination.
+
+    Returns 0 during polar night (the sun never rises) and 180 during polar day (the sun never sets)."""
+
+    lat = radians(latitude)
+    dec = radians(declination)
+    cos_hour_angle = cos(radians(SUNRISE_ZENITH)) / (cos(lat) * cos(dec)) - tan(lat) * tan(dec)
+
+    if cos_hour_angle >= 1:
+        return 0.0
+    if cos_hour_angle <= -1:
+        return 180.0
+    return degrees(acos(cos_hour_angle))
+
+
+def get_event_time(latitude, longitude, day, solar_noon, direction):
+    """Returns the minutes from midnight UTC of sunrise (direction=-1) or sunset (direction=1).
+    The sun's declination is re-evaluated at the time of the event rather than at solar noon."""
+
+    event = solar_noon
+    for _ in range(2):
+        declination, eq_of_time = get_sun_parameters(get_julian_day(day, event))
+        hour_angle = get_hour_angle(latitude, declination)
+        event = 720 - 4 * longitude - eq_of_time + direction * hour_angle * 4
+
+    return event
+
+
+def get_solar_times(latitude, longitude, day):
+    """Calculates the solar events for a latitude, longitude and date.
+
+    Returns a dict of minutes from midnight UTC on the date:
+    {"sunrise": sunrise, "sunset": sunset, "solar_noon": solar_noon, "day_length": day_length}"""
+
+    latitude = float(latitude)
+    longitude = float(longitude)
+
+    # evaluate the sun's position at the approximate local solar noon, then refine once with the corrected noon
+    solar_noon = 720 - 4 * longitude
+    for _ in range(2):
+        declination, eq_of_time = get_sun_parameters(get_julian_day(day, solar_noon))
+        solar_noon = 720 - 4 * longitude - eq_of_time
+
+    sunrise = get_event_time(latitude, longitude, day, solar_noon, -1)
+    sunset = get_event_time(latitude, longitude, day, solar_noon, 1)
+
+    return {'sunrise': sunrise,
+            'sunset': sunset,
+            'solar_noon': solar_noon,
+            'day_length': min(sunset - sunrise, MINUTES_PER_DAY)}
@@ -0,0 +1,187 @@
+"""Solar Providers & helper methods.
+
+A SolarCalculator gets its solar data from an ordered chain of providers. Each provider is asked for the days the
+providers before it did not have, so the fastest provider goes first and a miss or an error falls through to the next
+one. The chain is configured with SOLAR_PROVIDER, a comma separated list of provider names, or one of the names of
+PROVIDER_CHAINS:
+
+- local: calculates the solar data offline with the NOAA solar equations, it never misses
+- table: looks the solar data up in the precomputed solar tables
+- cache: reads the calculator's cache (the shared and persistent solar caches), it misses dates that are not cached
+- remote: calls the Sunset and sunrise times API and saves the days it fetches to the cache, while the API is failing
+  it returns the last known data and misses days it has never fetched
+
+The leading providers of a chain up to the first one that is not the cache are its primary providers, the cache only
+holds the data the remote provider saved. The providers after them are fallbacks whose estimates are used for the
+forecast but never saved.
+
+Every provider counts its hits, misses, errors, calls and time spent in this process, and adds the counts to the shared
+cache's stats every STATS_FLUSH_EVERY calls so `flask solar-provider-stats` shows the counts of every worker."""
+
+import time
+import logging
+import threading
+from shared_cache import get_shared_cache, STATS_FLUSH_EVERY
+
+PROVIDER_STATS = ('hits', 'misses', 'errors', 'calls', 'microseconds')
+# the chains of the single provider names, remote falls back to the local data as a seasonal estimate
+PROVIDER_CHAINS = {
+    'local': ('local',),
+    'table': ('table',),
+    'remote': ('cache', 'remote', 'local'),
+}
+
+
+class SolarProvider:
+    """The interface of a solar provider.
+
+    Providers implement get_days, this class times the calls and counts the hits, misses and errors."""
+
+    name = None
+
+    def __init__(self):
+        self.counts = dict.fromkeys(PROVIDER_STATS, 0)
+        self.unflushed = 0
+        self.lock = threading.Lock()
+
+    def get_days(self, calculator, days):
+        """Returns a list of the solar data of the calculator's user_location for each date, in the same order as the
+        dates, with None for the dates the provider does not have."""
+
+        raise NotImplementedError
+
+    def get_timed_days(self, calculator, days):
+        """Returns the get_days list, or a list of None if the provider raised an error, and counts the call."""
+
+        start = time.perf_counter()
+        try:
+            data = self.get_days(calculator, days)
+        except Exception as err:
+            logging.warning(f'{self.name} solar provider failed: {err}')
+            self.count(time.perf_counter() - start, errors=1)
+            return [None] * len(days)
+
+        hits = sum(1 for day in data if day)
+        self.count(time.perf_counter() - start, hits=hits, misses=len(days) - hits)
+        return data
+
+    def count(self, seconds, hits=0, misses=0, errors=0):
+        """Counts a call, and adds the counts to the shared cache every STATS_FLUSH_EVERY calls."""
+
+        with self.lock:
+            for stat, count in (('hits', hits), ('misses', misses), ('errors', errors), ('calls', 1),
+                                ('microseconds', round(seconds * 1000000))):
+                self.counts[stat] += count
+            self.unflushed += 1
+            if self.unflushed < STATS_FLUSH_EVERY:
+                return
+            self.unflushed = 0
+
+            shared_cache = get_shared_cache()
+            if not shared_cache:
+                # without a shared cache the counts stay in this process
+                return
+            counts, self.counts = self.counts, dict.fromkeys(PROVIDER_STATS, 0)
+
+        try:
+            shared_cache.add_stats({f'solar_provider:{self.name}:{stat}': count for stat, count in counts.items()})
+        except Exception as err:
+            logging.warning(f'{self.name} solar provider stats failed: {err}')
+
+    def get_stats(self, shared_stats=None):
+        """Returns the counts of the provider in every process whose counts were added to shared_stats, plus this
+        process' counts that have not been added yet, the hit rate and the average milliseconds per call.
+        {"provider": name, "hits": hits, "misses": misses, "errors": errors, "calls": calls,
+         "microseconds": microseconds, "hit_rate": hit_rate, "average_ms": average_ms}"""
+
+        shared_stats = shared_stats or {}
+        with self.lock:
+            stats = {stat: shared_stats.get(f'solar_provider:{self.name}:{stat}', 0) + self.counts[stat]
+                     for stat in PROVIDER_STATS}
+
+        lookups = stats['hits'] + stats['misses']
+        return {'provider': self.name, **stats,
+                'hit_rate': stats['hits'] / lookups if lookups else 0,
+                'average_ms': stats['microseconds'] / stats['calls'] / 1000 if stats['calls'] else 0}
+
+
+class LocalProvider(SolarProvider):
+    """Calculates the solar data offline."""
+
+    name = 'local'
+
+    def get_days(self, calculator, days):
+        return [calculator.get_local_data(day) for day in days]
+
+
+class TableProvider(SolarProvider):
+    """Looks the solar data up in the memory-mapped solar tables."""
+
+    name = 'table'
+
+    def get_days(self, calculator, days):
+        return [calculator.get_table_data(day) for day in days]
+
+
+class CacheProvider(SolarProvider):
+    """Reads the solar data from the calculator's cache, or misses every date if it has none."""
+
+    name = 'cache'
+
+    def get_days(self, calculator, days):
+        return [calculator.get_cached_data(day) for day in days]
+
+
+class RemoteProvider(SolarProvider):
+    """Fetches the solar data from the Sunset and sunrise times API and saves it to the calculator's cache."""
+
+    name = 'remote'
+
+    def get_days(self, calculator, days):
+        return calculator.get_remote_days(days)
+
+
+# one instance of each provider per process, so their counts cover every calculator
+solar_providers = {provider.name: provider for provider in
+                   (LocalProvider(), TableProvider(), CacheProvider(), RemoteProvider())}
+
+
+def get_provider_chain(names):
+    """Returns the list of providers for a comma separated string of provider names, or one of PROVIDER_CHAINS.
+    Raises ValueError for an unknown provider name."""
+
+    names = PROVIDER_CHAINS.get(names) or [name.strip() for name in names.split(',') if name.strip()]
+
+    for name in names:
+        if name not in solar_providers:
+            raise ValueError(f'Unknown solar provider {name}')
+
+    return [solar_providers[name] for name in names]
+
+
+def get_primary_provider_names(names):
+    """Returns the names of the primary providers of a chain of provider names: the providers up to and including the
+    first one that is not the cache."""
+
+    primary = []
+    for provider in get_provider_chain(names):
+        primary.append(provider.name)
+        if provider.name != 'cache':
+            break
+
+    return primary
+
+
+def get_provider_stats():
+    """Returns a list of the stats of every provider for every process that adds its counts to the shared cache."""
+
+    shared_cache = get_shared_cache()
+    shared_stats = None
+
+    if shared_cache:
+        try:
+            shared_stats = shared_cache.read_stats()
+        except Exception as err:
+            logging.warning(f'Solar provider stats could not be read: {err}')
+
+    return [provider.get_stats(shared_stats) for provider in solar_providers.values()]
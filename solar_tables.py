@@ -0,0 +1,97 @@
+"""Precomputed Solar Tables & helper methods.
+
+A build step precomputes a full year of sunrise, sunset and solar noon times for a grid of latitudes and saves them as
+one int16 .npy file. SolarCalculator memory-maps the file, so every gunicorn worker shares the same pages from the OS
+page cache and a solar lookup is array indexing.
+
+Longitude only shifts the solar events in time (4 minutes per degree), so the table stores the times at longitude 0
+and the user's longitude is applied when the times are looked up. The table is indexed by calendar date (a leap year
+is used to build it), offset by the fraction of a day the sun's position has drifted since the table year."""
+
+import os
+from datetime import date
+import numpy as np
+from solar_batch import get_solar_times
+from solar_position import MINUTES_PER_DAY
+
+SOLAR_TABLE_PATH = os.getenv('SOLAR_TABLE_PATH', 'generator/solar_tables.npy')
+# degrees of latitude between the rows of the table
+SOLAR_TABLE_RESOLUTION = 0.1
+TABLE_YEAR = 2020
+TROPICAL_YEAR = 365.2422
+SUNRISE, SUNSET, SOLAR_NOON = 0, 1, 2
+
+_tables = {}
+
+
+def build_solar_table(path=SOLAR_TABLE_PATH, resolution=SOLAR_TABLE_RESOLUTION):
+    """Calculates the solar events for every latitude row and calendar date and saves the table to path.
+    The table shape is (latitudes, 366 days, 3 events) of minutes from midnight UTC at longitude 0.
+    Returns the table."""
+
+    rows = int(round(180 / resolution)) + 1
+    latitudes = np.linspace(-90, 90, rows)
+
+    times = get_solar_times(latitudes, np.zeros(rows), [date(TABLE_YEAR, 1, 1)] * rows, 366)
+    table = np.stack([times['sunrise'], times['sunset'], times['solar_noon']], axis=-1)
+    table = np.round(table).astype(np.int16)
+
+    np.save(path, table)
+    return table
+
+
+class SolarTable:
+    """A memory-mapped table of precomputed solar events."""
+
+    def __init__(self, path=SOLAR_TABLE_PATH):
+        self.path = path
+        self.table = np.load(path, mmap_mode='r')
+        self.resolution = 180 / (self.table.shape[0] - 1)
+
+    def get_day_position(self, day, longitude):
+        """Returns the fractional table column for a date and longitude.
+
+        The column is the calendar date in the table year, plus the drift of the sun's position between the table year
+        and the date's year, minus the fraction of a day the solar events happen earlier in UTC east of longitude 0."""
+
+        table_date = date(TABLE_YEAR, day.month, day.day)
+        drift = (date(day.year, day.month, day.day) - table_date).days - (day.year - TABLE_YEAR) * TROPICAL_YEAR
+
+        return (table_date - date(TABLE_YEAR, 1, 1)).days + drift - float(longitude) / 360
+
+    def get_solar_times(self, latitude, longitude, day):
+        """Looks up the solar events for a latitude, longitude and date, interpolating between the two nearest
+        latitude rows and the two nearest days.
+
+        Returns the same dict as solar_position.get_solar_times, in minutes from midnight UTC on the date:
+        {"sunrise": sunrise, "sunset": sunset, "solar_noon": solar_noon, "day_length": day_length}"""
+
+        row_position = (float(latitude) + 90) / self.resolution
+        row = min(int(row_position), self.table.shape[0] - 2)
+        row_weight = row_position - row
+
+        column_position = min(max(self.get_day_position(day, longitude), 0), self.table.shape[1] - 1)
+        column = min(int(column_position), self.table.shape[1] - 2)
+        column_weight = column_position - column
+
+        # plain Python arithmetic on the 4 cells is faster than NumPy operations on such small arrays
+        (a, b), (c, d) = self.table[row:row + 2, column:column + 2].tolist()
+        events = [((a[i] * (1 - column_weight) + b[i] * column_weight) * (1 - row_weight)
+                   + (c[i] * (1 - column_weight) + d[i] * column_weight) * row_weight) for i in range(3)]
+        shift = -4 * float(longitude)
+
+        sunrise = events[SUNRISE] + shift
+        sunset = events[SUNSET] + shift
+
+        return {'sunrise': sunrise,
+                'sunset': sunset,
+                'solar_noon': events[SOLAR_NOON] + shift,
+                'day_length': min(sunset - sunrise, MINUTES_PER_DAY)}
+
+
+def get_solar_table(path=SOLAR_TABLE_PATH):
+    """Returns the SolarTable for a path, the file is only memory-mapped once per process."""
+
+    if path not in _tables:
+        _tables[path] = SolarTable(path)
+    return _tables[path]
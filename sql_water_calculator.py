@@ -0,0 +1,141 @@
+"""SQL Water Calculator & helper methods.
+
+A set-based version of the nightly recompute that runs inside Postgres. The threshold adjustments of
+WaterCalculator.calculate_water_interval are installed as the calculate_water_interval() SQL function, the daily light
+hours of each light source are saved in light_exposure_daily, and one UPDATE averages the light hours of every water
+schedule's forecast window and writes the new next water dates without loading any rows into Python.
+
+The results match the batch water calculator: the daily light hours are calculated with the same solar cells, and like
+the nightly recompute the base_interval is adjusted over the base_water_date window when the plant was watered with an
+adjusted interval."""
+
+import time
+from datetime import date, timedelta
+from models import db, WaterSchedule, Plant, LightSource, User
+from light_exposure import save_light_exposure
+
+WATER_INTERVAL_FUNCTION = """
+CREATE OR REPLACE FUNCTION calculate_water_interval(
+    average_hours double precision, base_sunlight integer, water_interval integer, max_days_without_water integer)
+RETURNS integer LANGUAGE plpgsql IMMUTABLE AS $$
+DECLARE
+    res double precision := average_hours - base_sunlight;
+    new_water_interval integer;
+BEGIN
+    -- the thresholds of WaterCalculator.calculate_water_interval, differences from 9 to 10 hours are not adjusted
+    new_water_interval := water_interval + CASE
+        WHEN res >= 0 AND res < 1 THEN 0
+        WHEN res >= 1 AND res < 3 THEN -1
+        WHEN res >= 3 AND res < 6 THEN -2
+        WHEN res >= 6 AND res < 9 THEN -7
+        WHEN res >= 10 THEN -20
+        WHEN res < 0 AND res > -1 THEN 0
+        WHEN res <= -1 AND res > -3 THEN 1
+        WHEN res <= -3 AND res > -6 THEN 2
+        WHEN res <= -6 AND res > -9 THEN 7
+        WHEN res <= -10 THEN 20
+        ELSE 0
+    END;
+
+    IF new_water_interval >= max_days_without_water THEN
+        new_water_interval := max_days_without_water;
+    END IF;
+
+    IF new_water_interval <= 0 THEN
+        new_water_interval := 3;
+    END IF;
+
+    RETURN new_water_interval;
+END
+$$;
+"""
+
+# water schedules without every day of their window in light_exposure_daily (artificial light, no coordinates)
+# are left unchanged
+REFRESH_WATER_DATES = """
+WITH windows AS (
+    SELECT water_schedules.id, water_schedules.plant_id,
+           coalesce(water_schedules.base_water_date, water_schedules.water_date)::date AS window_date,
+           coalesce(water_schedules.base_interval, water_schedules.water_interval) AS window_interval,
+           water_schedules.water_date + (water_schedules.water_interval - coalesce(
+               water_schedules.calculated_interval, water_schedules.water_interval)) * interval '1 day'
+               AS unadjusted_next_water_date
+    FROM water_schedules
+    WHERE water_schedules.manual_mode = false
+),
+new_water_dates AS (
+    SELECT windows.id,
+           windows.unadjusted_next_water_date + calculate_water_interval(
+               avg(light_exposure_daily.light_hours), plant_types.base_sunlight, windows.window_interval,
+               plant_types.max_days_without_water) * interval '1 day' AS next_water_date
+    FROM windows
+    JOIN plants ON plants.id = windows.plant_id
+    JOIN plant_types ON plant_types.id = plants.type_id
+    JOIN light_exposure_daily ON light_exposure_daily.light_source_id = plants.light_id
+         AND light_exposure_daily.date > windows.window_date
+         AND light_exposure_daily.date <= windows.window_date + windows.window_interval
+    GROUP BY windows.id, windows.window_interval, windows.unadjusted_next_water_date, plant_types.id
+    HAVING count(light_exposure_daily.date) = windows.window_interval
+)
+UPDATE water_schedules
+SET next_water_date = new_water_dates.next_water_date
+FROM new_water_dates
+WHERE water_schedules.id = new_water_dates.id
+  AND water_schedules.next_water_date IS DISTINCT FROM new_water_dates.next_water_date
+"""
+
+
+def install_water_interval_function():
+    """Creates or replaces the calculate_water_interval() SQL function."""
+
+    db.session.execute(db.text(WATER_INTERVAL_FUNCTION))
+    db.session.commit()
+
+
+def get_forecast_windows():
+    """Returns rows of the distinct (light source id, light type, coordinates, water date, water interval) forecast
+    windows of the non-manual water schedules with natural light of users with coordinates."""
+
+    water_date = db.func.coalesce(WaterSchedule.base_water_date, WaterSchedule.water_date)
+    water_interval = db.func.coalesce(WaterSchedule.base_interval, WaterSchedule.water_interval)
+
+    return (db.session.query(LightSource.id, LightSource.type, User.latitude, User.longitude,
+                             water_date.label('water_date'), water_interval.label('water_interval'))
+            .join(Plant, Plant.light_id == LightSource.id)
+            .join(WaterSchedule, WaterSchedule.plant_id == Plant.id)
+            .join(User, Plant.user_id == User.id)
+            .filter(WaterSchedule.manual_mode == False,
+                    LightSource.type != 'Artificial',
+                    User.latitude != None,
+                    User.longitude != None,
+                    water_interval > 0)
+            .distinct()
+            .all())
+
+
+def fill_light_exposure():
+    """Saves the daily light hours of every forecast window to light_exposure_daily, keeping the days that are already
+    saved. Returns the number of rows added."""
+
+    ranges = [(window.id, window.type, window.latitude, window.longitude,
+               date(window.water_date.year, window.water_date.month, window.water_date.day) + timedelta(days=1),
+               window.water_interval)
+              for window in get_forecast_windows()]
+
+    return save_light_exposure(ranges) if ranges else 0
+
+
+def refresh_water_dates():
+    """Recomputes the next water date of every non-manual water schedule with natural light with one UPDATE.
+
+    Returns a report dict: {"light_exposure_added": added, "updated": updated, "seconds": seconds}"""
+
+    start = time.perf_counter()
+
+    install_water_interval_function()
+    added = fill_light_exposure()
+
+    updated = db.session.execute(db.text(REFRESH_WATER_DATES)).rowcount
+    db.session.commit()
+
+    return {'light_exposure_added': added, 'updated': updated, 'seconds': time.perf_counter() - start}
@@ -0,0 +1,84 @@
+"""Batch Water Calculator Tests."""
+
+# python3 -m unittest tests.test_batch_water_calculator
+
+import random
+from unittest import TestCase
+from datetime import datetime
+from batch_water_calculator import (BatchWaterCalculator, calculate_water_intervals, get_adjustment, get_adjustments,
+                                    get_record, limit_water_intervals)
+from water_calculator import WaterCalculator
+from models import User, PlantType, WaterSchedule
+
+
+class TestBatchWaterCalculator(TestCase):
+    """Tests for the batch water calculator."""
+
+    def setUp(self):
+        """Setup plants in a few cities with a mix of plant types, light types and schedules."""
+
+        rand = random.Random(7)
+        cities = [(47.47, -122.35), (-33.87, 151.21), (21.31, -157.86), (64.14, -21.94)]
+        plant_types = [PlantType(id=1, name='Cactus', base_water=21, base_sunlight=14, max_days_without_water=90),
+                       PlantType(id=2, name='Begonia', base_water=7, base_sunlight=4, max_days_without_water=10),
+                       PlantType(id=3, name='Fern', base_water=5, base_sunlight=8, max_days_without_water=12)]
+        light_types = ['North', 'East', 'South', 'West', 'Northeast', 'Northwest', 'Southeast', 'Southwest']
+
+        self.plants = []
+        for i in range(60):
+            latitude, longitude = rand.choice(cities)
+            user = User(id=i, latitude=latitude, longitude=longitude)
+            water_schedule = WaterSchedule(
+                id=i,
+                water_date=datetime(2021, rand.choice([1, 4, 6, 10]), rand.choice([1, 15])),
+                next_water_date=datetime(2021, 11, 1),
+                water_interval=rand.choice([3, 7, 14]),
+                manual_mode=False,
+                plant_id=i)
+            self.plants.append((water_schedule, rand.choice(plant_types), rand.choice(light_types), user))
+
+    def test_matches_water_calculator(self):
+        """Test every batch interval matches the single plant WaterCalculator."""
+
+        new_water_intervals = BatchWaterCalculator(self.plants).calculate_water_intervals()
+
+        for water_schedule, plant_type, light_type, user in self.plants:
+            water_calculator = WaterCalculator(user, plant_type, water_schedule, light_type)
+            self.assertEqual(new_water_intervals[water_schedule.id], water_calculator.calculate_water_interval())
+
+    def test_shared_forecasts(self):
+        """Test plants in the same solar cell with the same light type and window share a forecast."""
+
+        plants = self.plants[:1] * 5
+        plants.append((plants[0][0], plants[0][1], plants[0][2],
+                       User(latitude=float(plants[0][3].latitude) + 0.001, longitude=plants[0][3].longitude)))
+
+        self.assertEqual(BatchWaterCalculator(plants).forecast_count, 1)
+        self.assertLess(BatchWaterCalculator(self.plants).forecast_count, len(self.plants))
+
+    def test_get_adjustments(self):
+        """Test the vectorized thresholds, including the differences between thresholds that are not adjusted."""
+
+        differences = [0, 0.5, 1, 2.9, 3, 6, 8.9, 9, 9.5, 10, 30, -0.5, -1, -3, -6, -9, -9.5, -10, -30]
+        adjustments = [0, 0, -1, -1, -2, -7, -7, 0, 0, -20, -20, 0, 1, 2, 7, 0, 0, 20, 20]
+
+        self.assertEqual(get_adjustments(differences).tolist(), adjustments)
+        self.assertEqual([get_adjustment(difference) for difference in differences], adjustments)
+
+    def test_limit_water_intervals(self):
+        """Test intervals are capped at max_days_without_water and reset to 3 days when not positive."""
+
+        self.assertEqual(limit_water_intervals([5, 12, 0, -4], [10, 10, 10, 10]).tolist(), [5, 10, 3, 3])
+
+    def test_artificial_light_type(self):
+        """Test plants without a solar forecast get no interval."""
+
+        water_schedule, plant_type, _, user = self.plants[0]
+        records = [get_record(water_schedule, plant_type, 'Artificial', user),
+                   get_record(*self.plants[0])]
+
+        new_water_intervals = calculate_water_intervals(records)
+
+        self.assertIsNone(new_water_intervals[0])
+        self.assertIsInstance(new_water_intervals[1], int)
+        self.assertEqual(calculate_water_intervals(records[:1]), [None])
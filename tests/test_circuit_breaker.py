@@ -0,0 +1,79 @@
+"""Circuit Breaker Tests."""
+
+# python3 -m unittest tests.test_circuit_breaker
+
+import time
+from unittest import TestCase
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN
+
+
+class TestCircuitBreaker(TestCase):
+    """Tests for the Circuit Breaker."""
+
+    def setUp(self):
+        """Setup a circuit breaker with a probe that fails until the API recovers."""
+
+        self.api_up = False
+        self.probes = 0
+
+        def probe():
+            self.probes += 1
+            if not self.api_up:
+                raise ConnectionError
+
+        self.breaker = CircuitBreaker('Test API', failure_threshold=3, reset_timeout=0.05, probe=probe)
+
+    def fail(self):
+        raise ConnectionError
+
+    def wait_for_probe(self):
+        """Waits for the background probe thread to finish."""
+
+        for _ in range(100):
+            if not self.breaker.probing:
+                return
+            time.sleep(0.01)
+
+    def test_opens_after_failures(self):
+        """Test the circuit opens after the failure threshold and then fails fast."""
+
+        for _ in range(3):
+            with self.assertRaises(ConnectionError):
+                self.breaker.call(self.fail)
+
+        self.assertEqual(self.breaker.state, OPEN)
+
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.call(lambda: 'not called')
+
+    def test_success_resets_failures(self):
+        """Test a success between failures keeps the circuit closed."""
+
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                self.breaker.call(self.fail)
+
+        self.assertEqual(self.breaker.call(lambda: 'ok'), 'ok')
+        self.assertEqual(self.breaker.failures, 0)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_background_probe(self):
+        """Test the circuit stays open while the probe fails and closes when the probe succeeds."""
+
+        for _ in range(3):
+            with self.assertRaises(ConnectionError):
+                self.breaker.call(self.fail)
+
+        time.sleep(0.06)
+        self.assertTrue(self.breaker.is_open())
+        self.wait_for_probe()
+        self.assertEqual(self.probes, 1)
+        self.assertEqual(self.breaker.state, OPEN)
+
+        self.api_up = True
+        time.sleep(0.06)
+        self.assertTrue(self.breaker.is_open())
+        self.wait_for_probe()
+        self.assertEqual(self.probes, 2)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.call(lambda: 'ok'), 'ok')
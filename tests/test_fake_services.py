@@ -0,0 +1,86 @@
+"""Fake Services Tests."""
+
+# python3 -m unittest tests.test_fake_services
+
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import patch
+import requests
+import location
+import solar_calculator
+from fake_services import FakeServiceConfig, start_fake_server
+from location import UserLocation
+from solar_calculator import SolarCalculator
+
+
+class TestFakeServices(TestCase):
+    """Tests for the local fake external services."""
+
+    def start(self, service, config=None):
+        server, url = start_fake_server(service, config=config)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return url
+
+    def test_solar_matches_local(self):
+        """Test the remote provider against the fake returns the local forecast."""
+
+        url = self.start('solar')
+        kwargs = {'user_location': {"latitude": 47.466748, "longitude": -122.34722},
+                  'current_date': datetime(2021, 6, 1), 'water_interval': 5, 'light_type': 'South'}
+
+        with patch.object(solar_calculator, 'BASE_URL', url):
+            remote = SolarCalculator(provider='remote', max_concurrency=1, **kwargs).get_solar_schedule()
+        local = SolarCalculator(provider='local', **kwargs).get_solar_schedule()
+
+        self.assertEqual(len(remote), 5)
+        for remote_day, local_day in zip(remote, local):
+            self.assertEqual(remote_day['date'], local_day['date'])
+            for event in ['sunrise', 'sunset', 'solar_noon']:
+                self.assertLessEqual(abs((remote_day[event] - local_day[event]).total_seconds()), 1)
+
+    def test_mapquest(self):
+        """Test the fake geocoder returns known coordinates and rejects vague locations."""
+
+        url = self.start('mapquest')
+
+        with patch.object(location, 'BASE_URL', url + '?key=test'):
+            coordinates = UserLocation(city='Seattle', state='WA', country='US').get_coordinates()
+            self.assertEqual(coordinates, {'lat': 47.603832, 'lng': -122.330062})
+
+            self.assertIsNotNone(UserLocation(city='Springfield', state='IL').get_coordinates())
+            self.assertIsNone(UserLocation(city='Springfield').get_coordinates())
+
+    def test_s3(self):
+        """Test the fake S3 stores, lists and deletes objects."""
+
+        url = self.start('s3')
+
+        self.assertEqual(requests.put(f'{url}/bucket/uploads/a.png', data=b'image').status_code, 200)
+        self.assertIn('<Key>uploads/a.png</Key>', requests.get(f'{url}/bucket', params={'prefix': 'uploads/'}).text)
+
+        self.assertEqual(requests.delete(f'{url}/bucket/uploads/a.png').status_code, 204)
+        self.assertNotIn('<Key>', requests.get(f'{url}/bucket').text)
+
+    def test_errors_and_throttling(self):
+        """Test the fakes return server errors at the error rate and throttle over the rate limit."""
+
+        url = self.start('solar', FakeServiceConfig(error_rate=1))
+        self.assertEqual(requests.get(url, params={'lat': 0, 'lng': 0}).status_code, 500)
+
+        url = self.start('solar', FakeServiceConfig(rate_limit=2))
+        statuses = [requests.get(url, params={'lat': 0, 'lng': 0}).status_code for _ in range(5)]
+        self.assertEqual(statuses[:2], [200, 200])
+        self.assertIn(429, statuses)
+
+        url = self.start('s3', FakeServiceConfig(rate_limit=1))
+        statuses = [requests.put(f'{url}/bucket/key', data=b'x').status_code for _ in range(3)]
+        self.assertIn(503, statuses)
+
+    def test_latency(self):
+        """Test the fakes wait the configured latency before responding."""
+
+        url = self.start('mapquest', FakeServiceConfig(latency=0.1))
+        response = requests.get(url, params={'location': 'Seattle, WA'})
+
+        self.assertGreaterEqual(response.elapsed.total_seconds(), 0.1)
@@ -0,0 +1,130 @@
+"""Gazetteer Tests."""
+
+# python3 -m unittest tests.test_gazetteer
+
+import os
+import time
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+from requests.exceptions import RequestException
+from gazetteer import Gazetteer, load_gazetteer, read_geonames_cities, normalize, get_gazetteer
+from models import User
+from location import UserLocation
+
+
+class TestGazetteer(TestCase):
+    """Tests for geocoding with the sample city gazetteer."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the sample gazetteer once."""
+
+        cls.gazetteer = load_gazetteer('generator/cities.csv', 'csv')
+
+    def test_normalize(self):
+        """Test names are compared without case, accents, punctuation or extra spaces."""
+
+        self.assertEqual(normalize(' São  Paulo '), 'sao paulo')
+        self.assertEqual(normalize('Washington, D.C.'), 'washington d c')
+        self.assertEqual(normalize(None), '')
+
+    def test_get_coordinates(self):
+        """Test "city, state, country" locations resolve to the same coordinates as MapQuest."""
+
+        self.assertEqual(self.gazetteer.get_coordinates('Seattle', 'WA', 'USA'), {'lat': 47.603832, 'lng': -122.330062})
+        self.assertEqual(self.gazetteer.get_coordinates('Paris', None, 'France'), {'lat': 48.85661, 'lng': 2.351499})
+        self.assertEqual(self.gazetteer.get_coordinates('queenstown', None, 'NZ'), {'lat': -45.03172, 'lng': 168.66081})
+        self.assertEqual(self.gazetteer.get_coordinates('Victoria', 'British Columbia', 'Canada'),
+                         {'lat': 48.428318, 'lng': -123.364953})
+
+    def test_state_and_country_filter(self):
+        """Test the state and country pick between cities with the same name, otherwise the largest city is used."""
+
+        self.assertEqual(self.gazetteer.get_coordinates('Springfield', 'MA', 'US')['lat'], 42.101483)
+        self.assertEqual(self.gazetteer.get_coordinates('Springfield', 'Missouri', 'US')['lat'], 37.215326)
+        self.assertEqual(self.gazetteer.get_coordinates('Portland', None, 'US')['lat'], 45.520247)
+        self.assertEqual(self.gazetteer.get_coordinates('Perth', 'WA', 'Australia')['lat'], -31.955893)
+
+        self.assertIsNone(self.gazetteer.get_coordinates('Perth', 'WA', 'US'))
+        self.assertIsNone(self.gazetteer.get_coordinates('Faker', None, 'Mexico'))
+
+    def test_search(self):
+        """Test the prefix index returns the distinct names that start with a prefix."""
+
+        self.assertEqual(self.gazetteer.search('Spr'), ['springfield'])
+        self.assertEqual(self.gazetteer.search('san', limit=3), ['san antonio', 'san diego', 'san francisco'])
+        self.assertEqual(self.gazetteer.search('xyz'), [])
+
+    def test_lookup_time(self):
+        """Test a location resolves in microseconds."""
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            self.gazetteer.get_coordinates('Seattle', 'WA', 'US')
+
+        self.assertLess((time.perf_counter() - start) / 1000, 0.0001)
+
+    def test_geonames_format(self):
+        """Test the GeoNames cities dump is read with its state and country names."""
+
+        with tempfile.TemporaryDirectory() as directory:
+            cities = os.path.join(directory, 'cities.txt')
+            admin1 = os.path.join(directory, 'admin1.txt')
+            countries = os.path.join(directory, 'countries.txt')
+
+            with open(cities, 'w', encoding='utf-8') as file:
+                file.write('\t'.join(['5809844', 'Seattle', 'Seattle', 'Seatl', '47.60621', '-122.33207', 'P', 'PPLA2',
+                                      'US', '', 'WA', '033', '', '', '737015', '', '56', 'America/Los_Angeles',
+                                      '2022-01-01']) + '\n')
+            with open(admin1, 'w', encoding='utf-8') as file:
+                file.write('US.WA\tWashington\tWashington\t5815135\n')
+            with open(countries, 'w', encoding='utf-8') as file:
+                file.write('#ISO\tISO3\tISO-Numeric\tfips\tCountry\n')
+                file.write('US\tUSA\t840\tUS\tUnited States\n')
+
+            gazetteer = Gazetteer(read_geonames_cities(cities, admin1, countries))
+
+        self.assertEqual(len(gazetteer), 1)
+        self.assertEqual(gazetteer.get_coordinates('Seattle', 'Washington', 'United States'),
+                         {'lat': 47.60621, 'lng': -122.33207})
+        self.assertEqual(gazetteer.get_coordinates('Seattle', 'WA', 'USA'), {'lat': 47.60621, 'lng': -122.33207})
+
+
+class TestUserLocationGazetteer(TestCase):
+    """Tests for geocoding a User Location with the gazetteer first."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.gazetteer = load_gazetteer('generator/cities.csv', 'csv')
+
+    def test_offline_hit(self):
+        """Test a city in the gazetteer is geocoded without calling MapQuest."""
+
+        with patch('location.http_client.get') as get:
+            coordinates = UserLocation(city='Seattle', state='WA', country='USA',
+                                       gazetteer=self.gazetteer).get_coordinates()
+
+        self.assertEqual(coordinates, {'lat': 47.603832, 'lng': -122.330062})
+        get.assert_not_called()
+
+    def test_miss_falls_back(self):
+        """Test MapQuest is called for a city the gazetteer does not have, unless the geocoder is offline."""
+
+        with patch('location.http_client.get', side_effect=RequestException) as get:
+            UserLocation(city='Smallville', state='KS', country='US', gazetteer=self.gazetteer).get_coordinates()
+            self.assertEqual(get.call_count, 1)
+
+            with patch('location.GEOCODER', 'offline'):
+                self.assertIsNone(UserLocation(city='Smallville', state='KS', country='US',
+                                               gazetteer=self.gazetteer).get_coordinates())
+            self.assertEqual(get.call_count, 1)
+
+    def test_mapquest_only(self):
+        """Test with GEOCODER=mapquest the gazetteer is never loaded, not even when a user's location is set."""
+
+        with patch('gazetteer.GEOCODER', 'mapquest'), patch('gazetteer.load_gazetteer') as load:
+            User().set_location(47.466748, -122.34722)
+
+            self.assertIsNone(get_gazetteer('generator/missing.csv'))
+            load.assert_not_called()
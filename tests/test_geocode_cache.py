@@ -0,0 +1,93 @@
+"""Geocode Cache Tests."""
+
+# FLASK_ENV=production python3 -m unittest tests.test_geocode_cache
+
+import os
+from unittest import TestCase
+from unittest.mock import patch, Mock
+from requests.exceptions import RequestException
+from models import *
+
+#set DB environment to test DB
+os.environ['DATABASE_URL'] = 'postgresql:///water_mate_react_test'
+
+from app import *
+from location import UserLocation
+
+
+def get_response(quality_code, lat=47.603832, lng=-122.330062):
+    """Returns a stand-in MapQuest response with one location."""
+
+    response = Mock()
+    response.json.return_value = {'results': [{'locations': [
+        {'geocodeQualityCode': quality_code, 'latLng': {'lat': lat, 'lng': lng}}]}]}
+    return response
+
+
+class TestGeocodeCache(TestCase):
+    """A class to test the persistent geocoding cache."""
+
+    def setUp(self):
+        """Clear any old data."""
+
+        db.session.rollback()
+        db.session.query(GeocodeCache).delete()
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up any fouled transactions."""
+
+        db.session.rollback()
+
+    def test_geocoded_once(self):
+        """Test a location is saved after it is geocoded and then read from the table without calling MapQuest."""
+
+        with patch('location.http_client.get', return_value=get_response('A5XAX')) as get:
+            first = UserLocation(city='Seattle', state='WA', country='US', geocode_cache=GeocodeCache).get_coordinates()
+            second = UserLocation(city=' seattle ', state='wa', country='US',
+                                  geocode_cache=GeocodeCache).get_coordinates()
+
+        self.assertEqual(first, {'lat': 47.603832, 'lng': -122.330062})
+        self.assertEqual(second, first)
+        self.assertEqual(get.call_count, 1)
+
+        cached = GeocodeCache.query.get('seattle, wa, us')
+        self.assertEqual(cached.quality_code, 'A5XAX')
+        self.assertIsNone(cached.expires_at)
+
+    def test_negative_result(self):
+        """Test a location without city level coordinates is cached as not found until it expires."""
+
+        with patch('location.http_client.get', return_value=get_response('A1XAX')) as get:
+            self.assertIsNone(UserLocation(city='Faker', country='Mexico',
+                                           geocode_cache=GeocodeCache).get_coordinates())
+            self.assertIsNone(UserLocation(city='Faker', country='Mexico',
+                                           geocode_cache=GeocodeCache).get_coordinates())
+
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(GeocodeCache.get_coordinates('faker, mexico'), (True, None))
+
+        cached = GeocodeCache.query.get('faker, mexico')
+        cached.expires_at = datetime.datetime.utcnow() - datetime.timedelta(minutes=1)
+        db.session.commit()
+
+        self.assertEqual(GeocodeCache.get_coordinates('faker, mexico'), (False, None))
+        self.assertEqual(GeocodeCache.evict(), 1)
+
+    def test_replace_negative_result(self):
+        """Test a newer result replaces an older one."""
+
+        GeocodeCache.save_coordinates('paris, france', None, 'A1XAX')
+        GeocodeCache.save_coordinates('paris, france', {'lat': 48.85661, 'lng': 2.351499}, 'A5XAX')
+
+        self.assertEqual(GeocodeCache.get_coordinates('paris, france'), (True, {'lat': 48.85661, 'lng': 2.351499}))
+        self.assertIsNone(GeocodeCache.query.get('paris, france').expires_at)
+
+    def test_request_error_not_cached(self):
+        """Test a location is not cached when MapQuest can not be reached."""
+
+        with patch('location.http_client.get', side_effect=RequestException):
+            self.assertIsNone(UserLocation(city='Seattle', state='WA', country='US',
+                                           geocode_cache=GeocodeCache).get_coordinates())
+
+        self.assertEqual(GeocodeCache.get_coordinates('seattle, wa, us'), (False, None))
@@ -0,0 +1,60 @@
+"""HTTP Client Tests."""
+
+# python3 -m unittest tests.test_http_client
+
+from unittest import TestCase
+from unittest.mock import Mock
+import http_client
+from http_client import JitterRetry, create_session, get_session
+
+
+class TestHttpClient(TestCase):
+    """Tests for the shared outbound HTTP client."""
+
+    def test_jitter_retry(self):
+        """Test the backoff time is a random time between 0 and the exponential backoff."""
+
+        retry = JitterRetry(total=5, backoff_factor=1)
+        for _ in range(3):
+            retry = retry.increment(method='GET', url='/')
+
+        # the 3rd consecutive error backs off up to 1 * 2 ** 2 seconds
+        backoffs = [retry.get_backoff_time() for _ in range(50)]
+        self.assertTrue(all(0 <= backoff <= 4 for backoff in backoffs))
+        self.assertGreater(len(set(backoffs)), 1)
+
+        # retries keep the jitter
+        self.assertIsInstance(retry.new(), JitterRetry)
+
+    def test_retry_after_cap(self):
+        """Test a long Retry-After header is capped so a retry does not block a request's thread for minutes."""
+
+        retry = JitterRetry(total=3, respect_retry_after_header=True)
+        response = Mock()
+
+        response.getheader.return_value = '3600'
+        self.assertEqual(retry.get_retry_after(response), http_client.HTTP_MAX_RETRY_AFTER)
+
+        response.getheader.return_value = '1'
+        self.assertEqual(retry.get_retry_after(response), min(1, http_client.HTTP_MAX_RETRY_AFTER))
+
+        response.getheader.return_value = None
+        self.assertIsNone(retry.get_retry_after(response))
+
+    def test_create_session(self):
+        """Test the session has a connection pool and retry policy for http and https."""
+
+        session = create_session(pool_size=4, retries=2, backoff=0.1)
+
+        for prefix in ['http://', 'https://']:
+            adapter = session.get_adapter(prefix + 'api.sunrise-sunset.org')
+            self.assertEqual(adapter._pool_maxsize, 4)
+            self.assertEqual(adapter.max_retries.total, 2)
+            self.assertIn(503, adapter.max_retries.status_forcelist)
+            self.assertIn(429, adapter.max_retries.status_forcelist)
+
+    def test_get_session(self):
+        """Test the session is shared by every call in this process."""
+
+        self.assertIs(get_session(), get_session())
+        self.assertGreater(http_client.HTTP_TIMEOUT, 0)
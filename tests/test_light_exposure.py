@@ -0,0 +1,200 @@
+"""Daily Light Exposure Tests."""
+
+# FLASK_ENV=production python3 -m unittest tests.test_light_exposure
+
+import os
+from unittest import TestCase
+from unittest.mock import patch
+from models import *
+from datetime import date, datetime, timedelta
+
+#set DB environment to test DB
+os.environ['DATABASE_URL'] = 'postgresql:///water_mate_react_test'
+
+from app import *
+from light_exposure import update_light_exposure, get_light_exposure_rows
+from water_calculator import WaterCalculator
+from solar_calculator import SolarCalculator
+
+
+class TestLightExposure(TestCase):
+    """A class to test the daily light exposure table and job."""
+
+    def setUp(self):
+        """Setup DB rows and clear any old data."""
+
+        db.session.rollback()
+        db.session.remove()
+
+        #delete any old data from the tables
+        db.session.query(LightExposure).delete()
+        db.session.query(RecomputeJob).delete()
+        db.session.query(WaterForecast).delete()
+        db.session.query(WaterHistory).delete()
+        db.session.query(WaterSchedule).delete()
+        db.session.query(Plant).delete()
+        db.session.query(LightSource).delete()
+        db.session.query(Room).delete()
+        db.session.query(Collection).delete()
+        db.session.query(User).delete()
+        db.session.commit()
+
+        self.user1 = User.signup(
+            name='Pepper Cat',
+            email='peppercat@gmail.com',
+            latitude='47.466748',
+            longitude='-122.34722',
+            username='peppercat',
+            password='meowmeow')
+
+        self.user1.id = 1000
+        db.session.commit()
+
+        db.session.add(Collection(id=1, name='Home', user_id=1000))
+        db.session.add(Room(id=1, name='Kitchen', user_id=1000, collection_id=1))
+        db.session.add(LightSource(id=1, type='South', type_id=4, daily_total=8, room_id=1))
+        db.session.add(LightSource(id=2, type='Artificial', type_id=1, daily_total=8, room_id=1))
+        db.session.add(LightSource(id=3, type='East', type_id=3, daily_total=8, room_id=1))
+        db.session.commit()
+
+        db.session.add_all([
+            Plant(id=1, name='Hoya', user_id=1000, type_id=37, room_id=1, light_id=1),
+            Plant(id=2, name='Fern', user_id=1000, type_id=37, room_id=1, light_id=2),
+            Plant(id=3, name='Pothos', user_id=1000, type_id=37, room_id=1, light_id=3)])
+        db.session.commit()
+
+        today = datetime.today()
+        db.session.add_all([
+            WaterSchedule(id=1, water_date=today - timedelta(days=3), next_water_date=today + timedelta(days=4),
+                          water_interval=7, plant_id=1),
+            WaterSchedule(id=2, water_date=today, next_water_date=today + timedelta(days=7),
+                          water_interval=7, plant_id=2),
+            # manual mode plants do not need light exposure
+            WaterSchedule(id=3, water_date=today, next_water_date=today + timedelta(days=7),
+                          water_interval=7, manual_mode=True, plant_id=3)])
+        db.session.commit()
+
+    def tearDown(self):
+        """Rollback any sessions."""
+        db.session.rollback()
+        db.session.remove()
+
+    def test_update_light_exposure(self):
+        """Test the job saves every day for active light sources only, and only the missing days on the next run."""
+
+        report = update_light_exposure(days=10, past_days=5)
+        self.assertEqual(report['light_sources'], 1)
+        self.assertEqual(report['added'], 16)
+        self.assertEqual(LightExposure.query.filter(LightExposure.light_source_id != 1).count(), 0)
+
+        report = update_light_exposure(days=10, past_days=5)
+        self.assertEqual(report['updated'], 0)
+        self.assertEqual(report['added'], 0)
+
+        # the next run only needs the days after the last saved day, and deletes the days before the range
+        report = update_light_exposure(days=12, past_days=4)
+        self.assertEqual(report['added'], 2)
+        self.assertEqual(report['evicted'], 1)
+
+    def test_light_hours(self):
+        """Test the saved hours match the batch solar forecast."""
+
+        update_light_exposure(days=10, past_days=5)
+
+        rows = get_light_exposure_rows([(1, 'South', 47.47, -122.35, date.today(), 1)])
+        saved = LightExposure.query.filter_by(light_source_id=1, date=date.today()).one()
+
+        self.assertAlmostEqual(saved.light_hours, rows[0]['light_hours'])
+
+    def test_water_calculator(self):
+        """Test the water calculator uses the saved hours when every day is saved, and the solar forcast otherwise."""
+
+        water_schedule = WaterSchedule.query.get(1)
+        plant_type = PlantType.query.get(37)
+
+        water_calculator = WaterCalculator(self.user1, plant_type, water_schedule, 'South', light_exposure=LightExposure)
+        self.assertIsNone(water_calculator.saved_average_hours)
+        self.assertIsNotNone(water_calculator.light_forcast)
+        expected = water_calculator.calculate_water_interval()
+
+        update_light_exposure(days=10, past_days=5)
+
+        water_calculator = WaterCalculator(self.user1, plant_type, water_schedule, 'South', light_exposure=LightExposure)
+        self.assertIsNone(water_calculator.light_forcast)
+        self.assertAlmostEqual(water_calculator.saved_average_hours,
+                               WaterCalculator(self.user1, plant_type, water_schedule, 'South').calculate_average_hours(
+                                   water_calculator.get_light_forcast()), places=2)
+        self.assertEqual(water_calculator.calculate_water_interval(), expected)
+
+    def test_clear_user(self):
+        """Test a user's saved hours are deleted when their location changes."""
+
+        update_light_exposure(days=10, past_days=5)
+
+        LightExposure.clear_user(1000)
+        db.session.commit()
+
+        self.assertEqual(LightExposure.query.count(), 0)
+
+    def test_incremental_forcast(self):
+        """Test consecutive waterings only forcast the days that were not forcast before."""
+
+        plant_type = PlantType.query.get(37)
+        water_schedule = WaterSchedule.query.get(1)
+        water_date = datetime(2021, 5, 1)
+        water_schedule.water_date = water_date
+        db.session.commit()
+
+        WaterCalculator(self.user1, plant_type, water_schedule, 'South', light_exposure=LightExposure)
+        self.assertEqual(LightExposure.query.filter_by(light_source_id=1).count(), 7)
+
+        # the next watering 3 days later overlaps the first forcast by 4 days
+        water_schedule.water_date = water_date + timedelta(days=3)
+        db.session.commit()
+
+        forcast_dates = []
+        get_daily_sunlight_for_dates = SolarCalculator.get_daily_sunlight_for_dates
+
+        def spy(calculator, dates):
+            forcast_dates.extend(dates)
+            return get_daily_sunlight_for_dates(calculator, dates)
+
+        with patch.object(SolarCalculator, 'get_daily_sunlight_for_dates', spy):
+            water_calculator = WaterCalculator(self.user1, plant_type, water_schedule, 'South',
+                                               light_exposure=LightExposure)
+
+        self.assertEqual(forcast_dates, [water_date + timedelta(days=i) for i in range(8, 11)])
+        self.assertEqual(LightExposure.query.filter_by(light_source_id=1).count(), 10)
+
+        full_calculator = WaterCalculator(self.user1, plant_type, water_schedule, 'South')
+        self.assertEqual(water_calculator.calculate_average_hours(water_calculator.light_forcast),
+                         full_calculator.calculate_average_hours(full_calculator.light_forcast))
+        self.assertEqual(water_calculator.calculate_water_interval(), full_calculator.calculate_water_interval())
+
+    def test_saved_forcast_days(self):
+        """Test only the forcast days that were evaluated with the primary solar providers are saved."""
+
+        plant_type = PlantType.query.get(37)
+        water_schedule = WaterSchedule.query.get(1)
+        water_date = datetime(2021, 5, 1)
+        water_schedule.water_date = water_date
+        db.session.commit()
+
+        # the interpolated days are not saved
+        with patch('water_calculator.SOLAR_SAMPLE_EVERY', 3):
+            WaterCalculator(self.user1, plant_type, water_schedule, 'South', light_exposure=LightExposure)
+
+        self.assertEqual(sorted(row.date for row in LightExposure.query.filter_by(light_source_id=1)),
+                         [date(2021, 5, 2), date(2021, 5, 5), date(2021, 5, 8)])
+
+        # the fallback estimates are not saved
+        db.session.query(LightExposure).delete()
+        db.session.commit()
+
+        with patch('solar_calculator.SOLAR_PROVIDER', 'table,local'), \
+                patch.object(SolarCalculator, 'get_table_data', side_effect=FileNotFoundError):
+            water_calculator = WaterCalculator(self.user1, plant_type, water_schedule, 'South',
+                                               light_exposure=LightExposure)
+
+        self.assertEqual(len(water_calculator.light_forcast), 7)
+        self.assertEqual(LightExposure.query.filter_by(light_source_id=1).count(), 0)
@@ -0,0 +1,122 @@
+"""Water Forecast Prefetch Tests."""
+
+# FLASK_ENV=production python3 -m unittest tests.test_prefetch
+
+import os
+from unittest import TestCase
+from models import *
+from datetime import datetime, timedelta
+
+#set DB environment to test DB
+os.environ['DATABASE_URL'] = 'postgresql:///water_mate_react_test'
+
+from app import *
+from prefetch import prefetch_forecasts
+
+
+class TestPrefetch(TestCase):
+    """A class to test prefetching the water forecasts of plants coming due."""
+
+    def setUp(self):
+        """Setup DB rows and clear any old data."""
+
+        db.session.rollback()
+        db.session.remove()
+
+        #delete any old data from the tables
+        db.session.query(WaterForecast).delete()
+        db.session.query(WaterHistory).delete()
+        db.session.query(WaterSchedule).delete()
+        db.session.query(Plant).delete()
+        db.session.query(LightSource).delete()
+        db.session.query(Room).delete()
+        db.session.query(Collection).delete()
+        db.session.query(User).delete()
+        db.session.commit()
+
+        self.user1 = User.signup(
+            name='Pepper Cat',
+            email='peppercat@gmail.com',
+            latitude='47.466748',
+            longitude='-122.34722',
+            username='peppercat',
+            password='meowmeow')
+
+        self.user1.id = 1000
+        db.session.commit()
+
+        db.session.add(Collection(id=1, name='Home', user_id=1000))
+        db.session.add(Room(id=1, name='Kitchen', user_id=1000, collection_id=1))
+        db.session.add(LightSource(id=1, type='East', type_id=3, daily_total=8, room_id=1))
+        db.session.add(LightSource(id=2, type='Artificial', type_id=1, daily_total=8, room_id=1))
+        db.session.commit()
+
+        db.session.add_all([
+            Plant(id=1, name='Hoya', user_id=1000, type_id=37, room_id=1, light_id=1),
+            Plant(id=2, name='Pothos', user_id=1000, type_id=37, room_id=1, light_id=1),
+            Plant(id=3, name='Fern', user_id=1000, type_id=37, room_id=1, light_id=2),
+            Plant(id=4, name='Monstera', user_id=1000, type_id=37, room_id=1, light_id=1),
+            Plant(id=5, name='Cactus', user_id=1000, type_id=37, room_id=1, light_id=1)])
+        db.session.commit()
+
+        today = datetime.today()
+        db.session.add_all([
+            # due tomorrow
+            WaterSchedule(id=1, water_date=today - timedelta(days=6), next_water_date=today + timedelta(days=1),
+                          water_interval=7, plant_id=1),
+            # due next week
+            WaterSchedule(id=2, water_date=today, next_water_date=today + timedelta(days=7),
+                          water_interval=7, plant_id=2),
+            # due tomorrow, artificial light does not use a solar forecast
+            WaterSchedule(id=3, water_date=today - timedelta(days=6), next_water_date=today + timedelta(days=1),
+                          water_interval=7, plant_id=3),
+            # overdue by two days
+            WaterSchedule(id=4, water_date=today - timedelta(days=9), next_water_date=today - timedelta(days=2),
+                          water_interval=7, plant_id=4),
+            # overdue for longer than the lookback, the plant is likely abandoned
+            WaterSchedule(id=5, water_date=today - timedelta(days=97), next_water_date=today - timedelta(days=90),
+                          water_interval=7, plant_id=5)])
+        db.session.commit()
+
+    def tearDown(self):
+        """Rollback any sessions."""
+        db.session.rollback()
+        db.session.remove()
+
+    def test_prefetch_forecasts(self):
+        """Test plants due soon and overdue plants are prefetched once and the prefetched interval is used when
+        watering."""
+
+        report = prefetch_forecasts(hours=48)
+        self.assertEqual(report['due'], 2)
+        self.assertEqual(report['overdue'], 1)
+        self.assertEqual(report['prefetched'], 2)
+        self.assertEqual(report['warm'], 0)
+
+        forecast = WaterForecast.query.filter_by(water_schedule_id=1).first()
+        self.assertIsNotNone(forecast)
+        self.assertIsNotNone(WaterForecast.query.filter_by(water_schedule_id=4).first())
+        self.assertIsNone(WaterForecast.query.filter_by(water_schedule_id=2).first())
+        self.assertIsNone(WaterForecast.query.filter_by(water_schedule_id=5).first())
+
+        report = prefetch_forecasts(hours=48)
+        self.assertEqual(report['warm'], 2)
+        self.assertEqual(report['overdue_warm'], 1)
+        self.assertEqual(report['warm_ratio'], 1)
+
+        water_schedule = WaterSchedule.query.get(1)
+        plant_type = PlantType.query.get(37)
+        self.assertEqual(WaterSchedule.calculate_next_water_date(self.user1, plant_type, water_schedule, 'East'),
+                         forecast.new_water_interval)
+
+    def test_stale_forecast(self):
+        """Test a prefetched forecast is not used after its inputs change."""
+
+        prefetch_forecasts(hours=48)
+
+        water_schedule = WaterSchedule.query.get(1)
+        water_schedule.water_interval = 10
+        db.session.commit()
+
+        plant_type = PlantType.query.get(37)
+        self.assertIsNone(WaterForecast.get_interval(self.user1, plant_type, water_schedule, 'East'))
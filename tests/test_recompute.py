@@ -0,0 +1,282 @@
+"""Nightly Water Date Recompute Tests."""
+
+# FLASK_ENV=production python3 -m unittest tests.test_recompute
+
+import os
+from threading import Thread
+from unittest import TestCase
+from unittest.mock import patch
+from models import *
+from datetime import datetime, timedelta
+
+#set DB environment to test DB
+os.environ['DATABASE_URL'] = 'postgresql:///water_mate_react_test'
+
+from app import *
+from recompute import recompute_water_dates, enqueue_recompute_jobs, run_recompute_worker
+from water_calculator import WaterCalculator
+import batch_water_calculator
+
+
+class TestRecompute(TestCase):
+    """A class to test recomputing the next water dates of every plant."""
+
+    def setUp(self):
+        """Setup DB rows and clear any old data."""
+
+        db.session.rollback()
+        db.session.remove()
+
+        #delete any old data from the tables
+        db.session.query(RecomputeJob).delete()
+        db.session.query(WaterForecast).delete()
+        db.session.query(WaterHistory).delete()
+        db.session.query(WaterSchedule).delete()
+        db.session.query(Plant).delete()
+        db.session.query(LightSource).delete()
+        db.session.query(Room).delete()
+        db.session.query(Collection).delete()
+        db.session.query(User).delete()
+        db.session.commit()
+
+        self.user1 = User.signup(
+            name='Pepper Cat',
+            email='peppercat@gmail.com',
+            latitude='47.466748',
+            longitude='-122.34722',
+            username='peppercat',
+            password='meowmeow')
+
+        self.user1.id = 1000
+        db.session.commit()
+
+        db.session.add(Collection(id=1, name='Home', user_id=1000))
+        db.session.add(Room(id=1, name='Kitchen', user_id=1000, collection_id=1))
+        db.session.add(LightSource(id=1, type='South', type_id=4, daily_total=8, room_id=1))
+        db.session.add(LightSource(id=2, type='Artificial', type_id=1, daily_total=8, room_id=1))
+        db.session.commit()
+
+        db.session.add_all([Plant(id=i, name=f'Plant {i}', user_id=1000, type_id=37, room_id=1, light_id=1)
+                            for i in range(1, 6)])
+        db.session.add(Plant(id=6, name='Fern', user_id=1000, type_id=37, room_id=1, light_id=2))
+        db.session.commit()
+
+        self.water_date = datetime(2021, 11, 1)
+        self.next_water_date = self.water_date + timedelta(days=7)
+        db.session.add_all([WaterSchedule(id=i, water_date=self.water_date, next_water_date=self.next_water_date,
+                                          water_interval=7, plant_id=i) for i in range(1, 5)])
+        db.session.add_all([
+            # manual mode and artificial light schedules are not recomputed
+            WaterSchedule(id=5, water_date=self.water_date, next_water_date=self.next_water_date, water_interval=7,
+                          manual_mode=True, plant_id=5),
+            WaterSchedule(id=6, water_date=self.water_date, next_water_date=self.next_water_date, water_interval=7,
+                          plant_id=6)])
+        db.session.commit()
+
+    def tearDown(self):
+        """Rollback any sessions."""
+        db.session.rollback()
+        db.session.remove()
+
+    def test_recompute_water_dates(self):
+        """Test the next water dates match the water calculator in one process and in a process pool."""
+
+        water_calculator = WaterCalculator(self.user1, PlantType.query.get(37), WaterSchedule.query.get(1), 'South')
+        expected = self.water_date + timedelta(days=water_calculator.calculate_water_interval())
+
+        for workers in [1, 2]:
+            WaterSchedule.query.update({'next_water_date': self.next_water_date})
+            db.session.commit()
+
+            report = recompute_water_dates(chunk_size=3, workers=workers)
+
+            self.assertEqual(report['schedules'], 4)
+            self.assertEqual(report['failed'], 0)
+            self.assertEqual(report['updated'], 0 if expected == self.next_water_date else 4)
+            self.assertGreater(report['plants_per_second'], 0)
+
+            db.session.expire_all()
+            for i in range(1, 5):
+                water_schedule = WaterSchedule.query.get(i)
+                self.assertEqual(water_schedule.next_water_date, expected)
+                self.assertEqual(water_schedule.water_interval, 7)
+
+            self.assertEqual(WaterSchedule.query.get(5).next_water_date, self.next_water_date)
+            self.assertEqual(WaterSchedule.query.get(6).next_water_date, self.next_water_date)
+
+    def test_recompute_is_repeatable(self):
+        """Test running the recompute again does not change any dates."""
+
+        recompute_water_dates(workers=1)
+        report = recompute_water_dates(workers=1)
+
+        self.assertEqual(report['schedules'], 4)
+        self.assertEqual(report['updated'], 0)
+
+    def test_freshly_watered(self):
+        """Test the next water date of a plant watered with the water calculator's interval, and then snoozed, does not
+        change when it is recomputed."""
+
+        water_schedule = WaterSchedule.query.get(1)
+        water_calculator = WaterCalculator(self.user1, PlantType.query.get(37), water_schedule, 'South')
+        new_water_interval = water_calculator.calculate_water_interval()
+
+        # what water_plant saves for a plant with natural light
+        water_date = self.water_date + timedelta(days=8)
+        water_schedule.base_water_date = water_schedule.water_date
+        water_schedule.base_interval = water_schedule.water_interval
+        water_schedule.calculated_interval = new_water_interval
+        water_schedule.water_interval = new_water_interval
+        water_schedule.water_date = water_date
+        water_schedule.next_water_date = water_date + timedelta(days=new_water_interval)
+        db.session.commit()
+
+        recompute_water_dates(workers=1)
+        db.session.expire_all()
+        self.assertEqual(WaterSchedule.query.get(1).next_water_date, water_date + timedelta(days=new_water_interval))
+
+        # what snooze_plant saves
+        water_schedule = WaterSchedule.query.get(1)
+        water_schedule.water_interval += 3
+        water_schedule.next_water_date = water_date + timedelta(days=water_schedule.water_interval)
+        db.session.commit()
+
+        recompute_water_dates(workers=1)
+        db.session.expire_all()
+        self.assertEqual(WaterSchedule.query.get(1).next_water_date,
+                         water_date + timedelta(days=new_water_interval + 3))
+
+    def test_saved_light_hours(self):
+        """Test schedules whose forecast window is saved in light_exposure_daily use the saved light hours, and
+        schedules with a missing day are forecast."""
+
+        plant_type = PlantType.query.get(37)
+        days = [self.water_date.date() + timedelta(days=day) for day in range(1, 8)]
+        LightExposure.save_hours([{'light_source_id': 1, 'date': day, 'light_hours': plant_type.base_sunlight + 4}
+                                  for day in days])
+
+        recompute_water_dates(workers=1)
+        db.session.expire_all()
+        self.assertEqual(WaterSchedule.query.get(1).next_water_date, self.water_date + timedelta(days=5))
+
+        LightExposure.query.filter_by(date=days[-1]).delete()
+        db.session.commit()
+
+        water_calculator = WaterCalculator(self.user1, plant_type, WaterSchedule.query.get(1), 'South')
+        recompute_water_dates(workers=1)
+        db.session.expire_all()
+        self.assertEqual(WaterSchedule.query.get(1).next_water_date,
+                         self.water_date + timedelta(days=water_calculator.calculate_water_interval()))
+
+    def test_enqueue_recompute_jobs(self):
+        """Test only recomputed schedules are queued, once."""
+
+        self.assertEqual(enqueue_recompute_jobs(), 4)
+        self.assertEqual(enqueue_recompute_jobs(), 0)
+        self.assertEqual(RecomputeJob.get_counts(), {'queued': 4, 'leased': 0, 'failed': 0})
+
+    def test_recompute_worker(self):
+        """Test a worker recomputes every queued schedule like the nightly recompute and empties the queue."""
+
+        enqueue_recompute_jobs()
+        report = run_recompute_worker('worker-1', batch_size=3)
+
+        self.assertEqual(report['batches'], 2)
+        self.assertEqual(report['completed'], 4)
+        self.assertEqual(report['lost'], 0)
+        self.assertEqual(RecomputeJob.query.count(), 0)
+
+        expected = {i: WaterSchedule.query.get(i).next_water_date for i in range(1, 5)}
+        recompute_water_dates(workers=1)
+        db.session.expire_all()
+        self.assertEqual({i: WaterSchedule.query.get(i).next_water_date for i in range(1, 5)}, expected)
+
+    def test_lease(self):
+        """Test claimed jobs are skipped until the lease expires, and the first worker then loses them."""
+
+        enqueue_recompute_jobs()
+
+        self.assertEqual(len(RecomputeJob.claim('worker-1', 10, 300)), 4)
+        self.assertEqual(RecomputeJob.claim('worker-2', 10, 300), [])
+        self.assertEqual(RecomputeJob.get_counts()['leased'], 4)
+
+        # worker-1 crashes, its lease expires and worker-2 claims the jobs
+        RecomputeJob.query.update({'lease_expires_at': datetime.utcnow() - timedelta(seconds=1)})
+        db.session.commit()
+        self.assertEqual(len(RecomputeJob.claim('worker-2', 10, 300)), 4)
+
+        self.assertEqual(RecomputeJob.complete('worker-1', [1, 2, 3, 4]), set())
+        self.assertEqual(RecomputeJob.complete('worker-2', [1, 2, 3, 4]), {1, 2, 3, 4})
+        db.session.commit()
+        self.assertEqual(RecomputeJob.query.count(), 0)
+
+    def test_max_attempts(self):
+        """Test jobs that failed every attempt stay in the queue as failed."""
+
+        enqueue_recompute_jobs()
+        RecomputeJob.query.update({'attempts': RECOMPUTE_MAX_ATTEMPTS})
+        db.session.commit()
+
+        self.assertEqual(RecomputeJob.claim('worker-1', 10, 300), [])
+        self.assertEqual(RecomputeJob.get_counts(), {'queued': 0, 'leased': 0, 'failed': 4})
+
+    def test_enqueue_failed_jobs(self):
+        """Test enqueueing again resets the jobs that failed every attempt, and leaves leased jobs alone."""
+
+        enqueue_recompute_jobs()
+        RecomputeJob.claim('worker-1', 10, 300)
+        RecomputeJob.query.filter(RecomputeJob.water_schedule_id.in_([1, 2])).update(
+            {'attempts': RECOMPUTE_MAX_ATTEMPTS, 'lease_expires_at': datetime.utcnow() - timedelta(seconds=1)},
+            synchronize_session=False)
+        db.session.commit()
+
+        self.assertEqual(enqueue_recompute_jobs(), 2)
+        self.assertEqual(RecomputeJob.get_counts(), {'queued': 2, 'leased': 2, 'failed': 0})
+        self.assertEqual(RecomputeJob.query.filter_by(water_schedule_id=1).one().claimed_by, None)
+        self.assertEqual(RecomputeJob.query.filter_by(water_schedule_id=3).one().claimed_by, 'worker-1')
+
+    def test_failed_schedule(self):
+        """Test a water schedule that can not be recomputed only fails itself, not the rest of its batch."""
+
+        WaterSchedule.query.get(2).water_interval = 99
+        db.session.commit()
+
+        def calculate_water_intervals(records):
+            if any(record['water_interval'] == 99 for record in records):
+                raise ValueError('Bad water schedule')
+            return batch_water_calculator.calculate_water_intervals(records)
+
+        with patch('recompute.calculate_water_intervals', calculate_water_intervals):
+            report = recompute_water_dates(chunk_size=10, workers=1)
+
+            self.assertEqual(report['schedules'], 4)
+            self.assertEqual(report['failed'], 1)
+
+            enqueue_recompute_jobs()
+            report = run_recompute_worker('worker-1', batch_size=10)
+
+        self.assertEqual(report['completed'], 3)
+        self.assertEqual(report['failed'], 1)
+        self.assertEqual(report['lost'], 0)
+        self.assertEqual([job.water_schedule_id for job in RecomputeJob.query.all()], [2])
+
+    def test_concurrent_workers(self):
+        """Test workers running at the same time never complete the same job."""
+
+        enqueue_recompute_jobs()
+        reports = []
+
+        def work(worker_id):
+            with app.app_context():
+                reports.append(run_recompute_worker(worker_id, batch_size=1))
+                db.session.remove()
+
+        threads = [Thread(target=work, args=(f'worker-{i}',)) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sum(report['completed'] for report in reports), 4)
+        self.assertEqual(sum(report['lost'] for report in reports), 0)
+        self.assertEqual(RecomputeJob.query.count(), 0)
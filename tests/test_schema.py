@@ -0,0 +1,36 @@
+"""Schema Upgrade Tests."""
+
+# FLASK_ENV=production python3 -m unittest tests.test_schema
+
+import os
+from unittest import TestCase
+from models import *
+
+#set DB environment to test DB
+os.environ['DATABASE_URL'] = 'postgresql:///water_mate_react_test'
+
+from app import *
+
+
+class TestUpgradeSchema(TestCase):
+    """A class to test adding the columns of the models to an existing database."""
+
+    def tearDown(self):
+        """Clean up any fouled transactions."""
+
+        db.session.rollback()
+        db.session.remove()
+
+    def test_add_missing_columns(self):
+        """Test columns added to a model after its table was created are added with their index, once."""
+
+        db.session.remove()
+        with db.engine.begin() as connection:
+            connection.execute(db.text('ALTER TABLE users DROP COLUMN IF EXISTS solar_cell'))
+
+        self.assertEqual(upgrade_schema(), ['users.solar_cell'])
+        self.assertEqual(upgrade_schema(), [])
+
+        User.query.first()
+        indexes = db.inspect(db.engine).get_indexes('users')
+        self.assertIn('ix_users_solar_cell', [index['name'] for index in indexes])
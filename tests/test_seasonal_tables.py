@@ -0,0 +1,74 @@
+"""Seasonal Table Tests."""
+
+# python3 -m unittest tests.test_seasonal_tables
+
+import os
+import random
+import tempfile
+from unittest import TestCase
+from datetime import datetime, timedelta
+from seasonal_tables import build_seasonal_table, get_seasonal_table
+from batch_water_calculator import calculate_water_intervals
+import seasonal_tables
+
+
+class TestSeasonalTables(TestCase):
+    """Tests for the precomputed seasonal light tables."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Build the seasonal table once for all of the tests."""
+
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, 'seasonal_light.npy')
+        build_seasonal_table(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        seasonal_tables._tables.clear()
+        cls.directory.cleanup()
+
+    def test_matches_batch_water_calculator(self):
+        """Test every interval the table answers matches the full calculation."""
+
+        rand = random.Random(3)
+        table = get_seasonal_table(self.path)
+        answered = 0
+
+        records = [{'latitude': rand.uniform(-65, 65),
+                    'longitude': rand.uniform(-180, 180),
+                    'water_date': datetime(rand.choice([2021, 2024, 2030]), 1, 1) + timedelta(days=rand.randint(0, 364)),
+                    'water_interval': rand.choice([3, 7, 14, 30]),
+                    'light_type': rand.choice(['North', 'South', 'East', 'West', 'Southeast', 'Northwest']),
+                    'base_sunlight': rand.randint(2, 14),
+                    'max_days_without_water': rand.choice([10, 30, 60])} for _ in range(1000)]
+
+        for record, water_interval in zip(records, calculate_water_intervals(records)):
+            table_interval = table.get_water_interval(
+                record['latitude'], record['water_date'], record['water_interval'], record['light_type'],
+                record['base_sunlight'], record['max_days_without_water'])
+
+            if table_interval is not None:
+                answered += 1
+                self.assertEqual(table_interval, water_interval)
+
+        # only averages close to a threshold fall back to the full calculation
+        self.assertGreater(answered, 900)
+
+    def test_fallback(self):
+        """Test the table does not answer near a threshold, for artificial light, or for windows over a year."""
+
+        table = get_seasonal_table(self.path)
+        water_date = datetime(2021, 6, 1)
+        average_hours = table.get_average_light_hours(47.5, datetime(2021, 6, 2), 7, 'East')
+
+        self.assertIsNone(table.get_water_interval(47.5, water_date, 7, 'East', average_hours - 3.01, 30))
+        self.assertIsNotNone(table.get_water_interval(47.5, water_date, 7, 'East', average_hours - 3.5, 30))
+        self.assertIsNotNone(table.get_water_interval(47.5, water_date, 7, 'East', average_hours - 3.01, 30, margin=0))
+        self.assertIsNone(table.get_water_interval(47.5, water_date, 7, 'Artificial', 8, 30))
+        self.assertIsNone(table.get_water_interval(47.5, water_date, 400, 'East', 8, 500))
+
+    def test_missing_table(self):
+        """Test a table that has not been built is None."""
+
+        self.assertIsNone(get_seasonal_table(os.path.join(self.directory.name, 'missing.npy')))
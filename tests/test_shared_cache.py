@@ -0,0 +1,194 @@
+"""Shared Cache Tests."""
+
+# python3 -m unittest tests.test_shared_cache
+
+import os
+import time
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch, Mock
+from datetime import datetime
+import shared_cache
+from shared_cache import MemoryCache, SQLiteCache, SharedSolarCache, STATS_FLUSH_EVERY
+from solar_calculator import SolarCalculator
+from location import UserLocation
+
+
+class TestMemoryCache(TestCase):
+    """Tests for the in-process memory cache."""
+
+    def test_get_set(self):
+        """Test a value is returned until it expires."""
+
+        cache = MemoryCache(ttl=0.05)
+        cache.set('key', {'lat': 1})
+
+        self.assertEqual(cache.get('key'), {'lat': 1})
+        self.assertIsNone(cache.get('other'))
+
+        time.sleep(0.06)
+        self.assertIsNone(cache.get('key'))
+
+    def test_lru(self):
+        """Test the least recently used entry is evicted past max_entries."""
+
+        cache = MemoryCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_stats(self):
+        """Test the hits and misses are counted, including the counts already added to the backend."""
+
+        cache = MemoryCache()
+        cache.set('key', 1)
+        for _ in range(STATS_FLUSH_EVERY):
+            cache.get('key')
+        cache.get('other')
+
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['sets']), (STATS_FLUSH_EVERY, 1, 1))
+        self.assertAlmostEqual(stats['hit_rate'], STATS_FLUSH_EVERY / (STATS_FLUSH_EVERY + 1))
+
+    def test_errors_are_misses(self):
+        """Test a backend that fails is treated as a miss."""
+
+        cache = MemoryCache()
+        cache.read = Mock(side_effect=ConnectionError)
+        cache.write = Mock(side_effect=ConnectionError)
+
+        cache.set('key', 1)
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.get_stats()['errors'], 2)
+
+
+class TestSQLiteCache(TestCase):
+    """Tests for the SQLite file cache."""
+
+    def setUp(self):
+        """Setup a cache file."""
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'cache.sqlite3')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_shared_between_caches(self):
+        """Test a value set by one worker's cache is read by another worker's cache of the same file."""
+
+        first = SQLiteCache(self.path)
+        second = SQLiteCache(self.path)
+
+        first.set('solar:47.47:-122.35:2021-05-02', {'sunrise': datetime(2021, 5, 2, 12, 40)})
+        self.assertEqual(second.get('solar:47.47:-122.35:2021-05-02'), {'sunrise': datetime(2021, 5, 2, 12, 40)})
+
+    def test_expired(self):
+        """Test an expired value is not returned."""
+
+        cache = SQLiteCache(self.path, ttl=0.05)
+        cache.set('key', 1)
+        time.sleep(0.06)
+
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.evict(), 1)
+
+    def test_evict_least_recently_used(self):
+        """Test eviction keeps the max_entries most recently used values."""
+
+        cache = SQLiteCache(self.path, max_entries=2)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+            time.sleep(0.01)
+
+        self.assertEqual(cache.evict(), 1)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('c'), 'c')
+
+    def test_stats_added_up(self):
+        """Test the counts of every worker are added up in the file."""
+
+        first = SQLiteCache(self.path)
+        second = SQLiteCache(self.path)
+
+        first.set('key', 1)
+        for _ in range(STATS_FLUSH_EVERY - 1):
+            first.get('key')
+        second.get('other')
+
+        stats = second.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['sets']), (STATS_FLUSH_EVERY - 1, 1, 1))
+
+
+class TestSharedSolarCache(TestCase):
+    """Tests for reading the solar data through the shared cache."""
+
+    def setUp(self):
+        """Setup a remote Solar Calculator with a shared cache in front of a persistent cache."""
+
+        self.persistent = Mock(spec=['get_day', 'save_day'])
+        self.persistent.get_day.return_value = None
+        self.shared = MemoryCache()
+
+        self.calculator = SolarCalculator(
+            user_location={"latitude": "47.466748", "longitude": "-122.34722"},
+            current_date=datetime(2021, 5, 1),
+            water_interval=3,
+            light_type="West",
+            provider="remote",
+            cache=SharedSolarCache(self.shared, self.persistent),
+            max_concurrency=1)
+        self.calculator.get_remote_data = self.calculator.get_local_data
+
+    def test_warms_other_workers(self):
+        """Test data fetched by one worker is read from the shared cache by another worker."""
+
+        first = self.calculator.get_solar_schedule()
+        self.assertEqual(self.persistent.save_day.call_count, 3)
+
+        self.calculator.get_remote_data = Mock(side_effect=AssertionError)
+        other_worker = SharedSolarCache(self.shared, Mock(spec=['get_day', 'save_day']))
+        self.calculator.cache = other_worker
+
+        self.assertEqual(self.calculator.get_solar_schedule(), first)
+        other_worker.persistent.get_day.assert_not_called()
+
+    def test_copies_persistent_data(self):
+        """Test data read from the persistent cache is copied to the shared cache."""
+
+        data = self.calculator.get_local_data(datetime(2021, 5, 2))
+        self.persistent.get_day.return_value = data
+
+        self.assertEqual(self.calculator.get_data(datetime(2021, 5, 2)), data)
+        self.assertEqual(self.shared.get('solar:47.466748:-122.34722:2021-05-02'), data)
+
+
+class TestUserLocationCache(TestCase):
+    """Tests for reading geocoding results through the shared cache."""
+
+    def test_cached_coordinates(self):
+        """Test a location is only geocoded once and then read from the cache."""
+
+        response = Mock()
+        response.json.return_value = {'results': [{'locations': [
+            {'geocodeQualityCode': 'A5XAX', 'latLng': {'lat': 47.603832, 'lng': -122.330062}}]}]}
+        cache = MemoryCache()
+
+        with patch('location.http_client.get', return_value=response) as get:
+            first = UserLocation(city='Seattle', state='WA', country='US', cache=cache).get_coordinates()
+            second = UserLocation(city='seattle', state='wa', country='us', cache=cache).get_coordinates()
+
+        self.assertEqual(first, {'lat': 47.603832, 'lng': -122.330062})
+        self.assertEqual(second, first)
+        self.assertEqual(get.call_count, 1)
+
+    def test_disabled(self):
+        """Test the shared cache is disabled by default."""
+
+        self.assertIsNone(shared_cache.create_shared_cache('none'))
+        self.assertRaises(ValueError, shared_cache.create_shared_cache, 'memcached')
@@ -0,0 +1,92 @@
+"""Single Flight Tests."""
+
+# python3 -m unittest tests.test_single_flight
+
+import time
+import threading
+from unittest import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from single_flight import SingleFlight
+
+
+class TestSingleFlight(TestCase):
+    """Tests for the Single Flight."""
+
+    def setUp(self):
+        """Setup a single flight and a slow function that counts its calls."""
+
+        self.flight = SingleFlight()
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def fetch(self, value):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        return value
+
+    def fail(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        raise ConnectionError
+
+    def test_concurrent_calls_share_result(self):
+        """Test callers of a key in flight wait for it and share the result of one call."""
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            leader = executor.submit(self.flight.do, 'key', self.fetch, 'data')
+            self.started.wait(5)
+            waiters = [executor.submit(self.flight.do, 'key', self.fetch, 'other') for _ in range(4)]
+
+            # wait for the waiters to join the call before it returns
+            for _ in range(100):
+                if self.flight.calls['key'].waiters == 4:
+                    break
+                time.sleep(0.01)
+            self.release.set()
+
+            self.assertEqual(leader.result(), ('data', False))
+            self.assertEqual([waiter.result() for waiter in waiters], [('data', True)] * 4)
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.flight.in_flight(), 0)
+
+    def test_different_keys(self):
+        """Test calls with different keys do not wait for each other."""
+
+        self.release.set()
+
+        self.assertEqual(self.flight.do('a', self.fetch, 1), (1, False))
+        self.assertEqual(self.flight.do('b', self.fetch, 2), (2, False))
+        self.assertEqual(self.calls, 2)
+
+    def test_result_not_cached(self):
+        """Test a key is called again after its call returns."""
+
+        self.release.set()
+
+        self.flight.do('key', self.fetch, 1)
+        self.assertEqual(self.flight.do('key', self.fetch, 2), (2, False))
+        self.assertEqual(self.calls, 2)
+
+    def test_error_shared(self):
+        """Test the error of a call is raised for every caller that waited for it."""
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            leader = executor.submit(self.flight.do, 'key', self.fail)
+            self.started.wait(5)
+            waiters = [executor.submit(self.flight.do, 'key', self.fail) for _ in range(2)]
+
+            for _ in range(100):
+                if self.flight.calls['key'].waiters == 2:
+                    break
+                time.sleep(0.01)
+            self.release.set()
+
+            for future in [leader, *waiters]:
+                self.assertRaises(ConnectionError, future.result)
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.flight.in_flight(), 0)
@@ -0,0 +1,61 @@
+"""Batch Solar Forecast Tests."""
+
+# python3 -m unittest tests.test_solar_batch
+
+from unittest import TestCase
+from datetime import datetime
+from solar_batch import get_daily_light_hours, get_solar_times
+from solar_calculator import SolarCalculator
+import solar_position
+
+
+class TestSolarBatch(TestCase):
+    """Tests for the vectorized batch solar forecast."""
+
+    def setUp(self):
+        """Setup the batch locations."""
+
+        self.latitudes = [47.466748, -33.865143, 21.309919, 69.6492]
+        self.longitudes = [-122.34722, 151.2099, -157.858154, 18.9553]
+        self.start_dates = [datetime(2021, 5, 2), datetime(2021, 5, 30), datetime(2021, 5, 30), datetime(2021, 12, 1)]
+        self.light_types = ['West', 'West', 'South', 'North']
+
+    def test_get_solar_times(self):
+        """Test the batch solar times match the scalar solar position equations."""
+
+        times = get_solar_times(self.latitudes, self.longitudes, self.start_dates, 3)
+
+        self.assertEqual(times['sunrise'].shape, (4, 3))
+
+        scalar = solar_position.get_solar_times(self.latitudes[1], self.longitudes[1], datetime(2021, 6, 1))
+        for key in ['sunrise', 'sunset', 'solar_noon', 'day_length']:
+            self.assertAlmostEqual(times[key][1, 2], scalar[key], places=6)
+
+    def test_get_daily_light_hours(self):
+        """Test the batch light hours match SolarCalculator.get_daily_sunlight for each location."""
+
+        light_hours = get_daily_light_hours(
+            self.latitudes, self.longitudes, self.start_dates, 10, self.light_types)
+
+        self.assertEqual(light_hours.shape, (4, 10))
+
+        for i in range(3):
+            calculator = SolarCalculator(
+                user_location={"latitude": self.latitudes[i], "longitude": self.longitudes[i]},
+                current_date=datetime(self.start_dates[i].year, self.start_dates[i].month, self.start_dates[i].day - 1),
+                water_interval=10,
+                light_type=self.light_types[i],
+                provider="local")
+
+            for day, light in enumerate(calculator.get_daily_sunlight()):
+                # the scalar calculator rounds each solar event to the second
+                self.assertAlmostEqual(light_hours[i, day], light.total_seconds() / 3600, delta=0.001)
+
+        # Tromso is in polar night in December
+        self.assertEqual(light_hours[3].max(), 0)
+
+    def test_artificial_light_type(self):
+        """Test light types without a solar forecast raise a KeyError."""
+
+        with self.assertRaises(KeyError):
+            get_daily_light_hours([47.4], [-122.3], [datetime(2021, 5, 1)], 3, ['Artificial'])
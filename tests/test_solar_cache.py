@@ -0,0 +1,168 @@
+"""Solar Cache Tests."""
+
+# python3 -m unittest tests.test_solar_cache
+
+import time
+import threading
+from unittest import TestCase
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from solar_calculator import SolarCalculator
+
+
+class DictCache:
+    """An in-memory stand-in for models.SolarDay."""
+
+    def __init__(self):
+        self.days = {}
+
+    def get_day(self, latitude, longitude, day):
+        return self.days.get((latitude, longitude, day))
+
+    def save_day(self, latitude, longitude, data):
+        self.days[(latitude, longitude, data['date'])] = data
+
+
+class LockingCache(DictCache):
+    """A DictCache where another worker saves the locked dates while this one waits for the lock."""
+
+    def __init__(self, other_worker_data):
+        super().__init__()
+        self.other_worker_data = other_worker_data
+        self.locked = []
+
+    @contextmanager
+    def lock_days(self, latitude, longitude, days):
+        self.locked.append(days)
+        for day in days:
+            self.save_day(latitude, longitude, self.other_worker_data(day))
+        yield
+
+
+class TestSolarCache(TestCase):
+    """Tests for reading the remote solar data through a cache."""
+
+    def setUp(self):
+        """Setup a remote Solar Calculator that counts its API calls."""
+
+        self.cache = DictCache()
+        self.calculator = SolarCalculator(
+            user_location={"latitude": "47.466748", "longitude": "-122.34722"},
+            current_date=datetime(2021, 5, 1),
+            water_interval=5,
+            light_type="West",
+            provider="remote",
+            cache=self.cache,
+            max_concurrency=1)
+
+        self.api_calls = []
+
+        def get_remote_data(day):
+            self.api_calls.append(day)
+            return self.calculator.get_local_data(day)
+
+        self.calculator.get_remote_data = get_remote_data
+
+    def test_read_through_cache(self):
+        """Test a cache miss is fetched and saved, and a cache hit does not call the API."""
+
+        first = self.calculator.get_solar_schedule()
+        self.assertEqual(len(self.api_calls), 5)
+        self.assertEqual(len(self.cache.days), 5)
+
+        second = self.calculator.get_solar_schedule()
+        self.assertEqual(len(self.api_calls), 5)
+        self.assertEqual(first, second)
+
+    def test_local_provider_skips_cache(self):
+        """Test the local provider calculates the data without using the cache."""
+
+        self.calculator.provider = 'local'
+        self.calculator.get_solar_schedule()
+
+        self.assertEqual(len(self.api_calls), 0)
+        self.assertEqual(len(self.cache.days), 0)
+
+    def test_concurrent_solar_schedule(self):
+        """Test fetching the missing days concurrently keeps the order of the dates and fills the cache."""
+
+        self.calculator.max_concurrency = 4
+        self.cache.save_day("47.466748", "-122.34722", self.calculator.get_local_data(datetime(2021, 5, 3)))
+
+        solar_schedule = self.calculator.get_solar_schedule()
+
+        self.assertEqual([data['date'] for data in solar_schedule], self.calculator.generate_dates())
+        self.assertEqual(len(self.api_calls), 4)
+        self.assertNotIn(datetime(2021, 5, 3), self.api_calls)
+        self.assertEqual(len(self.cache.days), 5)
+
+    def test_concurrent_error(self):
+        """Test a day that fails to fetch gets the local solar data as an estimate and is not cached."""
+
+        self.calculator.max_concurrency = 4
+
+        def get_remote_data(day):
+            raise ConnectionError
+
+        self.calculator.get_remote_data = get_remote_data
+
+        solar_schedule = self.calculator.get_solar_schedule()
+
+        self.assertEqual(solar_schedule[0], self.calculator.get_local_data(datetime(2021, 5, 2)))
+        self.assertEqual(len(self.cache.days), 0)
+
+    def test_last_known_fallback(self):
+        """Test the last known API data is served for a location and date while the API is failing."""
+
+        self.calculator.cache = None
+        remote = self.calculator.get_data(datetime(2021, 5, 2))
+        remote['sunrise'] = remote['sunrise'] + timedelta(seconds=30)
+
+        def get_remote_data(day):
+            raise ConnectionError
+
+        self.calculator.get_remote_data = get_remote_data
+
+        self.assertEqual(self.calculator.get_data(datetime(2021, 5, 2)), remote)
+        self.assertEqual(self.calculator.get_data(datetime(2021, 5, 3)),
+                         self.calculator.get_local_data(datetime(2021, 5, 3)))
+
+    def test_single_flight(self):
+        """Test concurrent requests for the same location and date share one API call and are cached once."""
+
+        self.calculator.cache = None
+        release = threading.Event()
+
+        def get_remote_data(day):
+            self.api_calls.append(day)
+            release.wait(5)
+            return self.calculator.get_local_data(day)
+
+        self.calculator.get_remote_data = get_remote_data
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = [executor.submit(self.calculator.get_remote_or_fallback_data, datetime(2021, 5, 2))
+                       for _ in range(4)]
+            time.sleep(0.1)
+            release.set()
+            results = [result.result() for result in results]
+
+        self.assertEqual(len(self.api_calls), 1)
+        self.assertEqual(len({id(data) for data, _ in results}), 1)
+        self.assertEqual(sorted(fetched for _, fetched in results), [False, False, False, True])
+
+    def test_locked_dates_fetched_by_other_worker(self):
+        """Test dates another worker cached while this one waited for the cache lock are not fetched again."""
+
+        self.calculator.cache = LockingCache(self.calculator.get_local_data)
+
+        self.assertEqual(self.calculator.get_data(datetime(2021, 5, 2)),
+                         self.calculator.get_local_data(datetime(2021, 5, 2)))
+        self.assertEqual(self.calculator.cache.locked, [[datetime(2021, 5, 2)]])
+
+        self.calculator.max_concurrency = 4
+        self.calculator.get_solar_schedule()
+
+        self.assertEqual(self.calculator.cache.locked[1], self.calculator.generate_dates()[1:])
+        self.assertEqual(self.api_calls, [])
@@ -3,13 +3,15 @@
 # FLASK_ENV=production python3 -m unittest tests.test_solar_calculator
 
 from unittest import TestCase
-from datetime import datetime, timedelta
-from solar_calculator import SolarCalculator
+from unittest.mock import patch
+from datetime import datetime, timedelta, timezone
+from solar_calculator import SolarCalculator, parse_iso_datetime
+from circuit_breaker import CircuitBreaker
 
 BASE_URL = 'https://api.sunrise-sunset.org/json'
 
 class TestSolarCalculator(TestCase):
-    """Tests for the Solar Calculator."""
+    """Tests for the Solar Calculator with the Sunset and sunrise times API provider."""
 
     def setUp(self):
         """Setup Solar Calculator Objects."""
@@ -18,79 +20,92 @@ class TestSolarCalculator(TestCase):
             user_location={"latitude": "47.466748", "longitude": "-122.34722"}, 
             current_date=datetime(2021, 5, 1), 
             water_interval=10, 
-            light_type="West")
+            light_type="West",
+            provider="remote")
 
         test2 = SolarCalculator(
             user_location={"latitude": "45.520247", "longitude": "-122.674195"}, 
             current_date=datetime(2021, 5, 1), 
             water_interval=21, 
-            light_type="North")
+            light_type="North",
+            provider="remote")
         
         test3 = SolarCalculator(
             user_location={"latitude": "45.520247", "longitude": "-122.674195"}, 
             current_date=datetime(2021, 5, 1), 
             water_interval=7, 
-            light_type="East")
+            light_type="East",
+            provider="remote")
 
         eerie = SolarCalculator(
             user_location={"latitude": "42.1394945", "longitude": "-80.084963"}, 
             current_date=datetime(2021, 5, 30), 
             water_interval=3, 
-            light_type="East")
+            light_type="East",
+            provider="remote")
 
         sydney = SolarCalculator(
             user_location={"latitude": "-33.865143", "longitude": "151.209900"}, 
             current_date=datetime(2021, 5, 29), 
             water_interval=3, 
-            light_type="West")
+            light_type="West",
+            provider="remote")
 
         nanortalik = SolarCalculator(
             user_location={"latitude": "60.142494", "longitude": "-45.239494"}, 
             current_date=datetime(2021, 5, 29), 
             water_interval=3, 
-            light_type="East")
+            light_type="East",
+            provider="remote")
         
         honolulu = SolarCalculator(
             user_location={"latitude": "21.309919", "longitude": "-157.858154"}, 
             current_date=datetime(2021, 5, 29), 
             water_interval=3, 
-            light_type="West")
+            light_type="West",
+            provider="remote")
         
         multan = SolarCalculator(
             user_location={"latitude": "30.157457", "longitude": "71.524918"}, 
             current_date=datetime(2021, 5, 29), 
             water_interval=3, 
-            light_type="East")
+            light_type="East",
+            provider="remote")
 
         tokyo = SolarCalculator(
             user_location={"latitude": "35.689487", "longitude": "139.691711"}, 
             current_date=datetime(2021, 5, 29), 
             water_interval=3, 
-            light_type="East")
+            light_type="East",
+            provider="remote")
         
         auckland = SolarCalculator(
             user_location={"latitude": "-36.848461", "longitude": "174.763336"}, 
             current_date=datetime(2021, 5, 29), 
             water_interval=3, 
-            light_type="East")
+            light_type="East",
+            provider="remote")
         
         beijing = SolarCalculator(
             user_location={"latitude": "39.916668", "longitude": "116.383331"}, 
             current_date=datetime(2021, 5, 29), 
             water_interval=3, 
-            light_type="East")
+            light_type="East",
+            provider="remote")
         
         medan = SolarCalculator(
             user_location={"latitude": "3.5896654", "longitude": "98.6738261"}, 
             current_date=datetime(2021, 5, 29), 
             water_interval=3, 
-            light_type="East")
+            light_type="East",
+            provider="remote")
         
         dhaka = SolarCalculator(
             user_location={"latitude": "23.70605", "longitude": "90.47172"}, 
             current_date=datetime(2021, 5, 29), 
             water_interval=3, 
-            light_type="East")
+            light_type="East",
+            provider="remote")
 
         self.test1 = test1 # seattle UTC -7
         self.test2 = test2 #  seattle UTC -7
@@ -124,37 +139,16 @@ class TestSolarCalculator(TestCase):
         self.assertIsInstance(list1[5], datetime)
         self.assertIsInstance(list2[12], datetime)
     
-    def test_convert_str_to_datetime(self):
-        """Test taking a datetime object and a string and combining both into a datetime object."""
+    def test_parse_iso_datetime(self):
+        """Test parsing the API's formatted=0 ISO-8601 datetimes into aware UTC datetimes."""
 
-        date1 = datetime(1990, 1, 5)
-        date2 = datetime(2021, 4, 21)
-        time1 = '1:30:20 PM'
-        time2 = '9:55:17 AM'
+        self.assertEqual(parse_iso_datetime('2021-05-31T03:57:02+00:00'),
+                         datetime(2021, 5, 31, 3, 57, 2, tzinfo=timezone.utc))
+        self.assertEqual(parse_iso_datetime('2021-05-31T03:57:02Z'), datetime(2021, 5, 31, 3, 57, 2, tzinfo=timezone.utc))
+        self.assertEqual(parse_iso_datetime('2021-05-30T20:57:02-07:00'),
+                         datetime(2021, 5, 31, 3, 57, 2, tzinfo=timezone.utc))
+        self.assertEqual(parse_iso_datetime('2021-05-30T20:57:02-07:00').tzinfo, timezone.utc)
 
-        conversion1 = self.test1.convert_str_to_datetime(date1, time1)
-        conversion2 = self.test2.convert_str_to_datetime(date2, time2)
-
-        self.assertIsInstance(conversion1, datetime)
-        self.assertIsInstance(conversion2, datetime)
-        self.assertEqual(conversion1, datetime(1990, 1, 5, 13, 30, 20))
-        self.assertEqual(conversion2, datetime(2021, 4, 21, 9, 55, 17))
-    
-    def test_convert_12_to_24(self):
-        """Test converting a 12-hour format string time into a 24-hour format string time."""
-
-        time1 = '01:09:55 PM'
-        time2 = '03:17:20 PM'
-        time3 = '12:40:01 PM'
-        time4 = '10:30:45 AM'
-        time5 = '12:00:59 AM'
-
-        self.assertEqual(self.test1.convert_12_to_24(time1), '13:09:55')
-        self.assertEqual(self.test1.convert_12_to_24(time2), '15:17:20')
-        self.assertEqual(self.test1.convert_12_to_24(time3), '12:40:01')
-        self.assertEqual(self.test1.convert_12_to_24(time4), '10:30:45')
-        self.assertEqual(self.test1.convert_12_to_24(time5), '00:00:59')
-    
     def test_get_data(self):
         """Test getting data from the sunrise/sunset API for a specific day/time."""
 
@@ -410,4 +404,65 @@ class TestSolarCalculator(TestCase):
         
         print('######## EERIE, PA UTC -4 ########')
         for day in daily_sunlight12:
-            print(day)
\ No newline at end of file
+            print(day)
+
+
+def get_results(sunrise, sunset, solar_noon, day_length):
+    """Returns stand-in Sunset and sunrise times API results."""
+
+    return {'sunrise': sunrise, 'sunset': sunset, 'solar_noon': solar_noon, 'day_length': day_length}
+
+
+class TestRemoteDataUtcDates(TestCase):
+    """Tests for keeping the real UTC dates of the Sunset and sunrise times API's times, with the API's results on
+    5/30/21."""
+
+    def get_remote_data(self, latitude, longitude, results):
+        """Returns the remote data of a location on 5/30/21 with stand-in API results."""
+
+        calculator = SolarCalculator(
+            user_location={'latitude': latitude, 'longitude': longitude},
+            current_date=datetime(2021, 5, 30),
+            water_interval=1,
+            light_type='North',
+            provider='remote')
+
+        # a closed breaker, the shared one may have been opened by tests that call the real API
+        with patch('solar_calculator.fetch_remote_results', return_value=results), \
+                patch('solar_calculator.remote_breaker', CircuitBreaker('Sunset and sunrise times API')):
+            return calculator.get_remote_data(datetime(2021, 5, 30))
+
+    def test_behind_utc(self):
+        """Test sunset in Seattle stays on the following UTC day."""
+
+        data = self.get_remote_data(47.6, -122.33,
+                                    get_results('2021-05-30T12:16:00+00:00', '2021-05-31T03:57:00+00:00',
+                                                '2021-05-30T20:06:00+00:00', 56460))
+
+        self.assertEqual(data['sunrise'], datetime(2021, 5, 30, 12, 16))
+        self.assertEqual(data['sunset'], datetime(2021, 5, 31, 3, 57))
+        self.assertEqual(data['solar_noon'], datetime(2021, 5, 30, 20, 6))
+        self.assertEqual(data['day_length'], datetime(2021, 5, 30, 15, 41))
+
+    def test_ahead_of_utc(self):
+        """Test sunrise in Delhi, with a half hour UTC offset, stays on the previous UTC day."""
+
+        data = self.get_remote_data(28.6, 77.2,
+                                    get_results('2021-05-29T23:54:00+00:00', '2021-05-30T13:48:00+00:00',
+                                                '2021-05-30T06:51:00+00:00', 50040))
+
+        self.assertEqual(data['sunrise'], datetime(2021, 5, 29, 23, 54))
+        self.assertEqual(data['sunset'], datetime(2021, 5, 30, 13, 48))
+        self.assertEqual(data['solar_noon'], datetime(2021, 5, 30, 6, 51))
+
+    def test_matches_local_data(self):
+        """Test the remote data is on the same UTC dates as the local solar data."""
+
+        data = self.get_remote_data(28.6, 77.2,
+                                    get_results('2021-05-29T23:54:00+00:00', '2021-05-30T13:48:00+00:00',
+                                                '2021-05-30T06:51:00+00:00', 50040))
+        local_data = SolarCalculator({'latitude': 28.6, 'longitude': 77.2}, datetime(2021, 5, 30), 1,
+                                     'North').get_local_data(datetime(2021, 5, 30))
+
+        for key in ('sunrise', 'sunset', 'solar_noon'):
+            self.assertEqual(data[key].date(), local_data[key].date())
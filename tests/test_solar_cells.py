@@ -0,0 +1,66 @@
+"""Solar Cells Tests."""
+
+# python3 -m unittest tests.test_solar_cells
+
+from unittest import TestCase
+from datetime import datetime
+from solar_cells import get_cell_id, get_cell_center, get_cell_coordinates
+from batch_water_calculator import get_forecast_key, get_record
+from water_calculator import WaterCalculator
+from models import User, PlantType, WaterSchedule
+
+
+class TestSolarCells(TestCase):
+    """Tests for grouping coordinates into solar cells."""
+
+    def test_cell_center(self):
+        """Test a cell id maps back to the coordinates rounded to the grid."""
+
+        self.assertEqual(get_cell_coordinates('47.466748', '-122.34722'), (47.47, -122.35))
+        self.assertEqual(get_cell_coordinates(-33.868820, 151.209296), (-33.87, 151.21))
+        self.assertEqual(get_cell_center(get_cell_id(0, 0)), (0, 0))
+        self.assertEqual(get_cell_center(get_cell_id(-90, -180)), (-90, -180))
+
+    def test_neighbors_share_cell(self):
+        """Test coordinates a few blocks apart share a cell, and coordinates in different cells do not."""
+
+        self.assertEqual(get_cell_id(47.6062, -122.3321), get_cell_id(47.6081, -122.3349))
+        self.assertNotEqual(get_cell_id(47.6062, -122.3321), get_cell_id(47.6162, -122.3321))
+
+    def test_antimeridian(self):
+        """Test longitude 180 and -180 are the same cell."""
+
+        self.assertEqual(get_cell_id(-17.8, 180), get_cell_id(-17.8, -180))
+        self.assertEqual(get_cell_id(-17.8, 179.999), get_cell_id(-17.8, -180))
+
+    def test_unique_ids(self):
+        """Test every cell of a coarse grid has its own id."""
+
+        ids = {get_cell_id(latitude, longitude, 0) for latitude in range(-90, 91) for longitude in range(-180, 180)}
+        self.assertEqual(len(ids), 181 * 360)
+
+    def test_user_solar_cell(self):
+        """Test setting a user's location saves its solar cell and the user's forecasts use the cell's center."""
+
+        user = User()
+        user.set_location(47.466748, -122.34722)
+
+        self.assertEqual(user.solar_cell, get_cell_id(47.466748, -122.34722))
+        self.assertEqual(user.get_cell_coordinates, {'latitude': 47.47, 'longitude': -122.35})
+
+        user.set_location(None, None)
+        self.assertIsNone(user.solar_cell)
+
+    def test_forcast_shared_by_cell(self):
+        """Test users in the same cell get the same forecast key and the same light forcast."""
+
+        plant_type = PlantType(id=1, name='Fern', base_water=5, base_sunlight=8, max_days_without_water=12)
+        water_schedule = WaterSchedule(id=1, water_date=datetime(2021, 5, 1), water_interval=7, plant_id=1)
+        first, second = User(), User()
+        first.set_location(47.6062, -122.3321)
+        second.set_location(47.6081, -122.3349)
+
+        self.assertEqual(get_forecast_key(get_record(water_schedule, plant_type, 'South', first)),
+                         get_forecast_key(get_record(water_schedule, plant_type, 'South', second)))
+        self.assertEqual(WaterCalculator(first, plant_type, water_schedule, 'South').light_forcast,
+                         WaterCalculator(second, plant_type, water_schedule, 'South').light_forcast)
@@ -0,0 +1,130 @@
+"""Solar Position Tests."""
+
+# python3 -m unittest tests.test_solar_position
+
+from unittest import TestCase
+from datetime import datetime
+from solar_position import get_solar_times, get_hour_angle
+from solar_calculator import SolarCalculator
+
+
+class TestSolarPosition(TestCase):
+    """Tests for the offline solar position equations and the local Solar Calculator provider."""
+
+    def setUp(self):
+        """Setup Solar Calculator Objects."""
+
+        seattle = SolarCalculator(
+            user_location={"latitude": "47.466748", "longitude": "-122.34722"},
+            current_date=datetime(2021, 5, 1),
+            water_interval=10,
+            light_type="West",
+            provider="local")
+
+        sydney = SolarCalculator(
+            user_location={"latitude": "-33.865143", "longitude": "151.209900"},
+            current_date=datetime(2021, 5, 29),
+            water_interval=3,
+            light_type="West",
+            provider="local")
+
+        self.seattle = seattle  # UTC -7
+        self.sydney = sydney  # UTC +10
+
+    def test_get_solar_times(self):
+        """Test calculating the solar events in minutes from midnight UTC."""
+
+        # Seattle 5/1/21: sunrise 12:52 UTC, solar noon 20:06 UTC, sunset 03:22 UTC on 5/2
+        seattle = get_solar_times(47.466748, -122.34722, datetime(2021, 5, 1))
+        self.assertAlmostEqual(seattle['sunrise'], 12 * 60 + 52, delta=1)
+        self.assertAlmostEqual(seattle['solar_noon'], 20 * 60 + 6, delta=1)
+        self.assertAlmostEqual(seattle['sunset'], 24 * 60 + 3 * 60 + 22, delta=1)
+
+        # Sydney 5/30/21: sunrise 20:50 UTC on 5/29, solar noon 01:52 UTC, sunset 06:55 UTC
+        sydney = get_solar_times(-33.865143, 151.2099, datetime(2021, 5, 30))
+        self.assertAlmostEqual(sydney['sunrise'], -(3 * 60 + 10), delta=1)
+        self.assertAlmostEqual(sydney['solar_noon'], 60 + 52, delta=1)
+        self.assertAlmostEqual(sydney['sunset'], 6 * 60 + 55, delta=1)
+
+        for times in [seattle, sydney]:
+            self.assertLess(times['sunrise'], times['solar_noon'])
+            self.assertLess(times['solar_noon'], times['sunset'])
+            self.assertAlmostEqual(times['day_length'], times['sunset'] - times['sunrise'])
+
+    def test_polar_day_and_night(self):
+        """Test the day length is capped during polar day and is zero during polar night."""
+
+        self.assertEqual(get_hour_angle(80, 23), 180.0)
+        self.assertEqual(get_hour_angle(80, -23), 0.0)
+
+        tromso_summer = get_solar_times(69.6492, 18.9553, datetime(2021, 6, 21))
+        tromso_winter = get_solar_times(69.6492, 18.9553, datetime(2021, 12, 21))
+
+        self.assertEqual(tromso_summer['day_length'], 1440)
+        self.assertEqual(tromso_winter['day_length'], 0)
+
+    def test_get_local_data(self):
+        """Test the local provider returns the same dict shape as the Sunset and sunrise times API."""
+
+        day1 = self.seattle.get_data(datetime(2021, 5, 1))
+        day2 = self.sydney.get_data(datetime(2021, 5, 30))
+
+        self.assertEqual(day1['date'], datetime(2021, 5, 1))
+        for key in ['sunrise', 'sunset', 'solar_noon', 'day_length']:
+            self.assertIsInstance(day1[key], datetime)
+            self.assertIsInstance(day2[key], datetime)
+
+        self.assertEqual(day1['sunrise'].day, 1)
+        self.assertEqual(day1['sunset'].day, 2)
+        self.assertEqual(day1['day_length'].hour, 14)
+
+        # sunrise in Sydney falls on the previous day in UTC
+        self.assertEqual(day2['sunrise'].day, 29)
+        self.assertEqual(day2['sunset'].day, 30)
+        self.assertEqual(day2['day_length'].hour, 10)
+
+    def test_get_local_daily_sunlight(self):
+        """Test the daily sunlight is calculated from the local solar data."""
+
+        daily_sunlight1 = self.seattle.get_daily_sunlight()
+        daily_sunlight2 = self.sydney.get_daily_sunlight()
+
+        self.assertEqual(len(daily_sunlight1), 10)
+        self.assertEqual(len(daily_sunlight2), 3)
+
+        # West light is solar noon to sunset, roughly 7:17 in Seattle and 5:02 in Sydney
+        self.assertAlmostEqual(daily_sunlight1[0].total_seconds(), 26236, delta=60)
+        self.assertAlmostEqual(daily_sunlight2[0].total_seconds(), 18126, delta=60)
+
+    def test_sampled_daily_sunlight(self):
+        """Test sampling every k-th day stays within the documented error bound of the full daily calculation,
+        near latitude 60 and at latitude -60 in the southern summer where the day length curves the most."""
+
+        oslo = SolarCalculator(
+            user_location={"latitude": "59.9139", "longitude": "10.7522"},
+            current_date=datetime(2021, 3, 1),
+            water_interval=60,
+            light_type="South",
+            provider="local")
+        south = SolarCalculator(
+            user_location={"latitude": "-60", "longitude": "0"},
+            current_date=datetime(2020, 12, 1),
+            water_interval=60,
+            light_type="North",
+            provider="local")
+
+        self.assertEqual(oslo.get_sample_indexes(7)[:3], [0, 7, 14])
+        self.assertEqual(oslo.get_sample_indexes(7)[-1], 59)
+
+        for calculator in [oslo, south]:
+            full = calculator.get_daily_sunlight()
+
+            for sample_every in [3, 7, 14]:
+                sampled = calculator.get_daily_sunlight(sample_every=sample_every)
+                bound = calculator.get_sampling_error_bound(sample_every) * 3600
+
+                self.assertEqual(len(sampled), 60)
+                self.assertEqual(sampled[0], full[0])
+                self.assertEqual(sampled[-1], full[-1])
+                for day in range(60):
+                    self.assertLessEqual(abs((sampled[day] - full[day]).total_seconds()), bound + 1)
@@ -0,0 +1,147 @@
+"""Solar Providers Tests."""
+
+# python3 -m unittest tests.test_solar_providers
+
+from unittest import TestCase
+from unittest.mock import patch
+from datetime import datetime
+from shared_cache import MemoryCache
+from solar_calculator import SolarCalculator
+from solar_providers import get_provider_chain, get_primary_provider_names, get_provider_stats, solar_providers
+
+
+class DictCache:
+    """An in-memory stand-in for models.SolarDay."""
+
+    def __init__(self):
+        self.days = {}
+
+    def get_day(self, latitude, longitude, day):
+        return self.days.get((latitude, longitude, day))
+
+    def save_day(self, latitude, longitude, data):
+        self.days[(latitude, longitude, data['date'])] = data
+
+
+class TestSolarProviders(TestCase):
+    """Tests for getting the solar data from an ordered chain of providers."""
+
+    def setUp(self):
+        """Setup a Solar Calculator with a cache and an API that counts its calls."""
+
+        self.cache = DictCache()
+        self.calculator = SolarCalculator(
+            user_location={"latitude": "47.466748", "longitude": "-122.34722"},
+            current_date=datetime(2021, 5, 1),
+            water_interval=5,
+            light_type="West",
+            provider="cache,remote,local",
+            cache=self.cache,
+            max_concurrency=1)
+
+        self.api_calls = []
+
+        def get_remote_data(day):
+            self.api_calls.append(day)
+            return self.calculator.get_local_data(day)
+
+        self.calculator.get_remote_data = get_remote_data
+
+    def get_counts(self):
+        """Returns the hits, misses and errors of every provider in this process."""
+
+        return {name: dict(provider.counts) for name, provider in solar_providers.items()}
+
+    def get_changes(self, before, name):
+        """Returns the change in a provider's counts since before."""
+
+        after = self.get_counts()[name]
+        return {stat: after[stat] - before[name][stat] for stat in ('hits', 'misses', 'errors', 'calls')}
+
+    def test_provider_chain(self):
+        """Test provider names and single provider names resolve to their chains."""
+
+        self.assertEqual([provider.name for provider in get_provider_chain('remote')], ['cache', 'remote', 'local'])
+        self.assertEqual([provider.name for provider in get_provider_chain('table, local')], ['table', 'local'])
+        self.assertEqual([provider.name for provider in get_provider_chain('local')], ['local'])
+
+        with self.assertRaises(ValueError):
+            get_provider_chain('cache,sundial')
+
+    def test_fall_through_on_miss(self):
+        """Test each provider is only asked for the dates the providers before it missed."""
+
+        self.cache.save_day("47.466748", "-122.34722", self.calculator.get_local_data(datetime(2021, 5, 3)))
+        before = self.get_counts()
+
+        solar_schedule = self.calculator.get_solar_schedule()
+
+        self.assertEqual([data['date'] for data in solar_schedule], self.calculator.generate_dates())
+        self.assertEqual(len(self.api_calls), 4)
+        self.assertNotIn(datetime(2021, 5, 3), self.api_calls)
+        self.assertEqual(self.get_changes(before, 'cache'), {'hits': 1, 'misses': 4, 'errors': 0, 'calls': 1})
+        self.assertEqual(self.get_changes(before, 'remote'), {'hits': 4, 'misses': 0, 'errors': 0, 'calls': 1})
+        self.assertEqual(self.get_changes(before, 'local'), {'hits': 0, 'misses': 0, 'errors': 0, 'calls': 0})
+
+    def test_fall_through_on_error(self):
+        """Test a provider that raises an error falls through to the next provider."""
+
+        self.calculator.provider = 'table,local'
+        before = self.get_counts()
+
+        with patch.object(self.calculator, 'get_table_data', side_effect=FileNotFoundError):
+            solar_schedule = self.calculator.get_solar_schedule()
+
+        self.assertEqual(solar_schedule[0], self.calculator.get_local_data(datetime(2021, 5, 2)))
+        self.assertEqual(self.get_changes(before, 'table'), {'hits': 0, 'misses': 0, 'errors': 1, 'calls': 1})
+        self.assertEqual(self.get_changes(before, 'local')['hits'], 5)
+
+    def test_no_provider_has_date(self):
+        """Test dates that every provider misses get the local solar data."""
+
+        self.calculator.provider = 'cache'
+
+        self.assertEqual(self.calculator.get_data(datetime(2021, 5, 2)),
+                         self.calculator.get_local_data(datetime(2021, 5, 2)))
+
+    def test_primary_data(self):
+        """Test only the dates evaluated with the primary providers of the chain are primary data."""
+
+        self.assertEqual(get_primary_provider_names('remote'), ['cache', 'remote'])
+        self.assertEqual(get_primary_provider_names('table,local'), ['table'])
+        self.assertEqual(get_primary_provider_names('local'), ['local'])
+
+        dates = self.calculator.generate_dates()
+        self.calculator.get_solar_schedule(dates[:2])
+
+        self.assertTrue(self.calculator.is_primary_data(dates[0]))
+        self.assertFalse(self.calculator.is_primary_data(dates[4]))
+
+        self.calculator.provider = 'table,local'
+        with patch.object(self.calculator, 'get_table_data', side_effect=FileNotFoundError):
+            self.calculator.get_solar_schedule(dates[2:4])
+
+        self.assertFalse(self.calculator.is_primary_data(dates[2]))
+
+        # dates that no provider has get the local solar data as an estimate
+        self.calculator.provider = 'cache'
+        self.calculator.get_solar_schedule(dates[4:])
+        self.assertFalse(self.calculator.is_primary_data(dates[4]))
+
+    def test_shared_stats(self):
+        """Test the counts are added to the shared cache and read back with this process' counts."""
+
+        shared_cache = MemoryCache()
+        unflushed = solar_providers['local'].counts['hits']
+        with patch('solar_providers.get_shared_cache', return_value=shared_cache), \
+                patch('solar_providers.STATS_FLUSH_EVERY', 1):
+            self.calculator.provider = 'local'
+            self.calculator.get_solar_schedule()
+
+            stats = {stats['provider']: stats for stats in get_provider_stats()}
+
+        self.assertEqual(shared_cache.read_stats()['solar_provider:local:hits'], unflushed + 5)
+        self.assertEqual(solar_providers['local'].counts['hits'], 0)
+        self.assertEqual(stats['local']['hits'], unflushed + 5)
+        self.assertEqual(stats['local']['hit_rate'], 1)
+        self.assertGreater(stats['local']['average_ms'], 0)
@@ -0,0 +1,71 @@
+"""Solar Table Tests."""
+
+# python3 -m unittest tests.test_solar_tables
+
+import os
+import tempfile
+from unittest import TestCase
+from datetime import datetime
+from solar_tables import build_solar_table, get_solar_table
+from solar_position import get_solar_times
+from solar_calculator import SolarCalculator
+import solar_tables
+
+
+class TestSolarTables(TestCase):
+    """Tests for the precomputed memory-mapped solar tables."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Build a small solar table once for all of the tests."""
+
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, 'solar_tables.npy')
+        build_solar_table(cls.path, resolution=0.5)
+
+    @classmethod
+    def tearDownClass(cls):
+        solar_tables._tables.clear()
+        cls.directory.cleanup()
+
+    def test_build_solar_table(self):
+        """Test the table has a row for each latitude and a column for each calendar date."""
+
+        table = get_solar_table(self.path)
+
+        self.assertEqual(table.table.shape, (361, 366, 3))
+        self.assertEqual(str(table.table.dtype), 'int16')
+        self.assertEqual(table.resolution, 0.5)
+        self.assertIs(get_solar_table(self.path), table)
+
+    def test_get_solar_times(self):
+        """Test the table lookups match the solar position equations to within a minute."""
+
+        table = get_solar_table(self.path)
+        locations = [(47.466748, -122.34722), (-33.865143, 151.2099), (3.5896654, 98.6738261), (60.142494, -45.239494)]
+
+        for latitude, longitude in locations:
+            for day in [datetime(2021, 1, 1), datetime(2021, 5, 30), datetime(2024, 12, 31)]:
+                expected = get_solar_times(latitude, longitude, day)
+                times = table.get_solar_times(latitude, longitude, day)
+
+                for key in ['sunrise', 'sunset', 'solar_noon', 'day_length']:
+                    self.assertAlmostEqual(times[key], expected[key], delta=1)
+
+    def test_table_provider(self):
+        """Test the table provider returns the same data as the local provider to within a minute."""
+
+        solar_tables._tables[solar_tables.SOLAR_TABLE_PATH] = get_solar_table(self.path)
+
+        calculator = SolarCalculator(
+            user_location={"latitude": "47.466748", "longitude": "-122.34722"},
+            current_date=datetime(2021, 5, 1),
+            water_interval=10,
+            light_type="West",
+            provider="table")
+
+        local = calculator.get_local_data(datetime(2021, 5, 1))
+        table = calculator.get_data(datetime(2021, 5, 1))
+
+        for key in ['sunrise', 'sunset', 'solar_noon', 'day_length']:
+            self.assertLessEqual(abs((table[key] - local[key]).total_seconds()), 60)
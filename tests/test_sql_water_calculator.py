@@ -0,0 +1,137 @@
+"""SQL Water Calculator Tests."""
+
+# FLASK_ENV=production python3 -m unittest tests.test_sql_water_calculator
+
+import os
+from unittest import TestCase
+from models import *
+from datetime import datetime, timedelta
+
+#set DB environment to test DB
+os.environ['DATABASE_URL'] = 'postgresql:///water_mate_react_test'
+
+from app import *
+from batch_water_calculator import get_adjustments, limit_water_intervals
+from recompute import recompute_water_dates
+from sql_water_calculator import install_water_interval_function, refresh_water_dates
+
+
+class TestSqlWaterCalculator(TestCase):
+    """A class to test the SQL water interval calculation matches the Python engine."""
+
+    def setUp(self):
+        """Setup DB rows and clear any old data."""
+
+        db.session.rollback()
+        db.session.remove()
+
+        #delete any old data from the tables
+        db.session.query(LightExposure).delete()
+        db.session.query(RecomputeJob).delete()
+        db.session.query(WaterForecast).delete()
+        db.session.query(WaterHistory).delete()
+        db.session.query(WaterSchedule).delete()
+        db.session.query(Plant).delete()
+        db.session.query(LightSource).delete()
+        db.session.query(Room).delete()
+        db.session.query(Collection).delete()
+        db.session.query(User).delete()
+        db.session.commit()
+
+        for user_id, latitude, longitude in [(1000, '47.466748', '-122.34722'), (1001, '-33.865143', '151.2099')]:
+            user = User.signup(
+                name='Pepper Cat',
+                email=f'peppercat{user_id}@gmail.com',
+                latitude=latitude,
+                longitude=longitude,
+                username=f'peppercat{user_id}',
+                password='meowmeow')
+            user.id = user_id
+            db.session.commit()
+
+            db.session.add(Collection(id=user_id, name='Home', user_id=user_id))
+            db.session.add(Room(id=user_id, name='Kitchen', user_id=user_id, collection_id=user_id))
+            db.session.commit()
+
+        light_types = LightType.query.order_by(LightType.id).all()
+        light_id = 0
+        for room_id in [1000, 1001]:
+            for light_type in light_types:
+                light_id += 1
+                db.session.add(LightSource(id=light_id, type=light_type.type, type_id=light_type.id, daily_total=8,
+                                           room_id=room_id))
+        db.session.commit()
+
+        # a plant for each light source with a mix of plant types, water dates and intervals
+        for light_source in LightSource.query.all():
+            room = Room.query.get(light_source.room_id)
+            db.session.add(Plant(id=light_source.id, name=f'Plant {light_source.id}', user_id=room.user_id,
+                                 type_id=light_source.id % 60 + 1, room_id=room.id, light_id=light_source.id))
+            db.session.commit()
+
+            water_date = datetime(2021, light_source.id % 12 + 1, 1)
+            water_schedule = WaterSchedule(id=light_source.id, water_date=water_date,
+                                           next_water_date=water_date + timedelta(days=7),
+                                           water_interval=light_source.id % 3 * 5 + 3, plant_id=light_source.id)
+
+            # every other plant was watered with an adjusted interval, some of them were snoozed since
+            if light_source.id % 2:
+                water_schedule.base_water_date = water_date - timedelta(days=10)
+                water_schedule.base_interval = 10
+                water_schedule.calculated_interval = water_schedule.water_interval - light_source.id % 5 % 2 * 3
+
+            db.session.add(water_schedule)
+        db.session.commit()
+
+    def tearDown(self):
+        """Rollback any sessions."""
+        db.session.rollback()
+        db.session.remove()
+
+    def get_next_water_dates(self):
+        db.session.expire_all()
+        return {water_schedule.id: water_schedule.next_water_date for water_schedule in WaterSchedule.query.all()}
+
+    def test_water_interval_function(self):
+        """Test the SQL thresholds and limits match the Python engine, including the differences that are not adjusted."""
+
+        install_water_interval_function()
+
+        differences = [0, 0.5, 1, 2.9, 3, 6, 8.9, 9, 9.5, 10, 30, -0.5, -1, -3, -6, -9, -9.5, -10, -30]
+        for water_interval, max_days_without_water in [(7, 10), (7, 30), (3, 90), (1, 2)]:
+            expected = limit_water_intervals(get_adjustments(differences) + water_interval, max_days_without_water)
+
+            for difference, new_water_interval in zip(differences, expected):
+                result = db.session.execute(
+                    db.text('SELECT calculate_water_interval(:average_hours, 8, :water_interval, :max_days)'),
+                    {'average_hours': 8 + difference, 'water_interval': water_interval,
+                     'max_days': max_days_without_water}).scalar()
+                self.assertEqual(result, new_water_interval)
+
+    def test_refresh_matches_recompute(self):
+        """Test the set-based refresh writes the same next water dates as the nightly recompute."""
+
+        original = self.get_next_water_dates()
+
+        report = refresh_water_dates()
+        self.assertGreater(report['light_exposure_added'], 0)
+        sql_dates = self.get_next_water_dates()
+
+        for water_schedule_id, next_water_date in original.items():
+            WaterSchedule.query.get(water_schedule_id).next_water_date = next_water_date
+        db.session.commit()
+
+        recompute_water_dates(workers=1)
+        python_dates = self.get_next_water_dates()
+
+        self.assertEqual(sql_dates, python_dates)
+
+        # artificial light schedules are not changed
+        artificial_ids = [light_source.id for light_source in LightSource.query.filter_by(type='Artificial')]
+        for water_schedule_id in artificial_ids:
+            self.assertEqual(sql_dates[water_schedule_id], original[water_schedule_id])
+
+        # the daily light hours are reused and nothing changes the second time
+        report = refresh_water_dates()
+        self.assertEqual(report['light_exposure_added'], 0)
+        self.assertEqual(report['updated'], 0)
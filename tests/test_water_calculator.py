@@ -3,6 +3,7 @@
 # FLASK_ENV=production python3 -m unittest test_water_calculator.py
 
 from unittest import TestCase
+from unittest.mock import patch
 from datetime import datetime, timedelta
 from water_calculator import WaterCalculator
 from models import User, PlantType, WaterSchedule, LightType
@@ -11,7 +12,12 @@ class TestWaterCalculator(TestCase):
     """Tests for the Water Calculator."""
 
     def setUp(self):
-        """Setup new Water Calculator Objects."""
+        """Setup new Water Calculator Objects with the local solar data, the NOAA solar equations give the same values
+        on every run without any network calls."""
+
+        patcher = patch('solar_calculator.SOLAR_PROVIDER', 'local')
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
         user = User(
             id=1,
@@ -105,27 +111,27 @@ class TestWaterCalculator(TestCase):
         light_forcast1 = self.wc1.get_light_forcast()
         light_forcast2 = self.wc2.get_light_forcast()
 
-        time1 = light_forcast1[0] # 11:55:48.500000 = 42948 seconds and 500000 microseconds
-        time2 = light_forcast1[5] # 12:10:03.375000 = 43803 seconds and 375000 microseconds
-        time3 = light_forcast2[0] # 7:09:45 = 25785 seconds and 0 micoseconds
-        time4 = light_forcast2[3] # 7:14:17 = 26057 seconds and 0 micoseconds
+        time1 = light_forcast1[0] # 10:12:03.750000 = 36723 seconds and 750000 microseconds
+        time2 = light_forcast1[5] # 10:24:18 = 37458 seconds and 0 microseconds
+        time3 = light_forcast2[0] # 7:08:22 = 25702 seconds and 0 micoseconds
+        time4 = light_forcast2[3] # 7:12:57 = 25977 seconds and 0 micoseconds
 
         float1 = self.wc1.convert_timedelta_to_float(time1)
         float2 = self.wc1.convert_timedelta_to_float(time2)
         float3 = self.wc2.convert_timedelta_to_float(time3)
         float4 = self.wc2.convert_timedelta_to_float(time4)
 
-        # (500000 / 1000000 + 42948 / 60) / 60 = 11.938333333333333
-        self.assertEqual(float1, 11.938333333333333)
+        # (750000 / 1000000 + 36723 / 60) / 60 = 10.213333333333333
+        self.assertEqual(float1, 10.213333333333333)
         
-        # (375000 / 1000000 + 43803 / 60) / 60 = 12.17375
-        self.assertEqual(float2, 12.17375)
+        # (0 / 1000000 + 37458 / 60) / 60 = 10.405
+        self.assertEqual(float2, 10.405)
 
-        # (0 / 1000000 + 25785 / 60) / 60 = 7.1625
-        self.assertEqual(float3, 7.1625)
+        # (0 / 1000000 + 25702 / 60) / 60 = 7.139444444444445
+        self.assertEqual(float3, 7.139444444444445)
 
-        # (0 / 1000000 + 26057 / 60) / 60 = 7.238055555555556
-        self.assertEqual(float4, 7.238055555555556)
+        # (0 / 1000000 + 25977 / 60) / 60 = 7.215833333333333
+        self.assertEqual(float4, 7.215833333333333)
 
     def test_calculate_average_hours(self):
         """Test calculatimg the average hours from a list of max daylight forcast. The list of max daylight is
@@ -139,12 +145,12 @@ class TestWaterCalculator(TestCase):
             flt = self.wc1.convert_timedelta_to_float(time)
             temp_ls1.append(flt)
         
-        #[11.938333333333333, 11.990555555555554, 12.03, 12.087638888888888, 12.130694444444446, 12.17375, 12.220416666666667, 12.267083333333334, 12.31736111111111, 12.367638888888887]
+        #[10.213333333333333, 10.250277777777777, 10.287222222222223, 10.328055555555554, 10.372777777777777, 10.405, 10.457500000000001, 10.493611111111111, 10.5375, 10.568888888888889]
 
         average1 = self.wc1.calculate_average_hours(light_forcast1)
-        # (11.938333333333333 + 11.990555555555554 + 12.03 + 12.087638888888888 + 12.130694444444446 + 12.17375 + 12.220416666666667 + 12.267083333333334 + 12.31736111111111 + 12.367638888888887) / 10 = 12.152347222222222
+        # (10.213333333333333 + 10.250277777777777 + 10.287222222222223 + 10.328055555555554 + 10.372777777777777 + 10.405 + 10.457500000000001 + 10.493611111111111 + 10.5375 + 10.568888888888889) / 10 = 10.391416666666666
 
-        self.assertEqual(average1, 12.152347222222222)
+        self.assertEqual(average1, 10.391416666666666)
         self.assertIsInstance(average1, float)
 
         light_forcast2 = self.wc2.get_light_forcast()
@@ -155,12 +161,12 @@ class TestWaterCalculator(TestCase):
             flt = self.wc2.convert_timedelta_to_float(time)
             temp_ls2.append(flt)
 
-        #[7.1625, 7.188055555555556, 7.213333333333334, 7.238055555555556, 7.263055555555556]
+        #[7.139444444444445, 7.165277777777778, 7.190833333333333, 7.215833333333333, 7.240833333333333]
 
         average2 = self.wc1.calculate_average_hours(light_forcast2)
-        # (7.1625 + 7.188055555555556 + 7.213333333333334 + 7.238055555555556 + 7.263055555555556) / 5 = 7.212999999999999
+        # (7.139444444444445 + 7.165277777777778 + 7.190833333333333 + 7.215833333333333 + 7.240833333333333) / 5 = 7.190444444444443
 
-        self.assertEqual(average2, 7.212999999999999)
+        self.assertEqual(average2, 7.190444444444443)
         self.assertIsInstance(average2, float)
 
     def test_calculate_water_interval(self):
@@ -170,23 +176,23 @@ class TestWaterCalculator(TestCase):
         of thresholds. The water interval that is calculated is the plant's current water interval +/- the threshold."""
 
         water_interval1 = self.wc1.calculate_water_interval()
-        # 1.The AVG for this plant's schedule is 12.152347222222222 hours per day in the current watering period.
+        # 1.The AVG for this plant's schedule is 10.391416666666666 hours per day in the current watering period.
 
         #2. The plant type's base light requirements are 14 hours per day of light.
-        # We check the difference by average_hours - base_light: 12.152347222222222 - 14 = -1.84
+        # We check the difference by average_hours - base_light: 10.391416666666666 - 14 = -3.61
         # A negative result means the plant is not recieving enough light. Therefore we need to increase the amount of time between watering to avoid overwatering this plant.
 
-        #3. We use the negative_threshold calculations in this case and will pull the value from the threshold key that is true. res <= -1 and res > -3 therefore the current water schedule interval will increase by 1 days. 10 + 1 = 11
+        #3. We use the negative_threshold calculations in this case and will pull the value from the threshold key that is true. res <= -3 and res > -6 therefore the current water schedule interval will increase by 2 days. 10 + 2 = 12
 
-        #check that the new water interval is not below 0, and is not greater than the plant type's max days without water. Both are false so we will return 11.
+        #check that the new water interval is not below 0, and is not greater than the plant type's max days without water. Both are false so we will return 12.
 
-        self.assertEqual(water_interval1, 11)
+        self.assertEqual(water_interval1, 12)
 
         water_interval2 = self.wc2.calculate_water_interval()
-         # 1.The AVG for this plant's schedule is 7.212999999999999 hours per day in the current watering period.
+         # 1.The AVG for this plant's schedule is 7.190444444444443 hours per day in the current watering period.
 
         #2. The plant type's base light requirements are 4 hours per day of light.
-        # We check the difference by average_hours - base_light: 7.212999999999999 - 4 = 3.21
+        # We check the difference by average_hours - base_light: 7.190444444444443 - 4 = 3.19
         # A postive result means the plant is recieving enough, or possibly too much light. Therefore we need to decrease the amount of time between watering to prevent the plant from drying up.
 
         #3. We use the positive_threshold calculations in this case and will pull the value from the threshold key that is true. res >= 3 and res < 6   therefore the current water schedule interval will decrease by -2 days. 5 - 2 = 3
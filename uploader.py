@@ -3,6 +3,7 @@
 import os
 from dotenv import load_dotenv
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 load_dotenv()  # take environment variables from .env.
@@ -10,6 +11,12 @@ UPLOAD_FOLDER = os.getenv('S3_LOCATION')
 BUCKET_NAME = os.getenv('S3_BUCKET')
 AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
 AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
+# set to use an S3 compatible server instead of Amazon S3, e.g. the local fake in fake_services.py
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')
+
+S3_OPTIONS = {'aws_access_key_id': AWS_ACCESS_KEY_ID, 'aws_secret_access_key': AWS_SECRET_ACCESS_KEY}
+if S3_ENDPOINT_URL:
+    S3_OPTIONS.update(endpoint_url=S3_ENDPOINT_URL, config=Config(s3={'addressing_style': 'path'}))
 
 class Uploader:
     """Create user paths, upload & display user images, and delete user images from Amazon S3 bucket."""
@@ -22,7 +29,7 @@ class Uploader:
 
         s3 = ''
         try:
-            s3 = boto3.client('s3', aws_access_key_id=AWS_ACCESS_KEY_ID, aws_secret_access_key=AWS_SECRET_ACCESS_KEY)
+            s3 = boto3.client('s3', **S3_OPTIONS)
 
             #create new path & set
             new_directory_name = f'uploads/user/{self.user_id}/'
@@ -38,7 +45,7 @@ class Uploader:
     def upload_image(self, key, img):
         """Upload a user's image to their upload path and return the url of the uploaded image."""
         try:
-            s3 = boto3.resource('s3', aws_access_key_id=AWS_ACCESS_KEY_ID, aws_secret_access_key=AWS_SECRET_ACCESS_KEY)
+            s3 = boto3.resource('s3', **S3_OPTIONS)
 
             # upload the image in the specified folder(key)
             s3.Bucket(BUCKET_NAME).put_object(Key=key+img.filename, Body=img)
@@ -52,7 +59,7 @@ class Uploader:
     def delete_image(self, url):
         """Delete a user's image from the user upload path using the file name."""
         try:
-            s3 = boto3.resource('s3', aws_access_key_id=AWS_ACCESS_KEY_ID, aws_secret_access_key=AWS_SECRET_ACCESS_KEY)
+            s3 = boto3.resource('s3', **S3_OPTIONS)
             bucket = s3.Bucket(BUCKET_NAME)
             file_name = os.path.basename(url);
             for obj in bucket.objects.filter(Prefix=f'uploads/user/{self.user_id}/'):
@@ -65,7 +72,7 @@ class Uploader:
     def delete_all(self):
         """Delete all of a user's images and upload path from S3."""
         try:
-            s3 = boto3.resource('s3', aws_access_key_id=AWS_ACCESS_KEY_ID, aws_secret_access_key=AWS_SECRET_ACCESS_KEY)
+            s3 = boto3.resource('s3', **S3_OPTIONS)
             bucket = s3.Bucket(BUCKET_NAME)
             for obj in bucket.objects.filter(Prefix=f'uploads/user/{self.user_id}/'):
                 obj.delete()
@@ -1,40 +1,97 @@
 """Water Calculator & helper methods."""
 
-from solar_calculator import SolarCalculator
-from datetime import datetime
+from solar_calculator import SolarCalculator, SOLAR_SAMPLE_EVERY
+from datetime import date, timedelta
 
 
 class WaterCalculator:
     """A class to make water schedule calculations.
-    Takes a User, a plant type, and a water_schedule."""
+    Takes a User, a plant type, a water_schedule, an optional solar cache for the solar forcast, and optional saved
+    daily light hours (models.LightExposure) that replace the solar forcast when every day of the forcast is saved.
+    With saved daily light hours only the days that are not saved yet are forcast, and then saved for the next
+    watering."""
 
-    def __init__(self, user, plant_type, water_schedule, light_type):
+    def __init__(self, user, plant_type, water_schedule, light_type, solar_cache=None, light_exposure=None):
         self.user = user
         self.plant_type = plant_type
         self.water_schedule = water_schedule
         self.light_type = light_type
-        self.light_forcast = self.get_light_forcast()
+        self.solar_cache = solar_cache
+        self.light_exposure = light_exposure
+        self.saved_average_hours = self.get_saved_average_hours()
+        self.light_forcast = self.get_light_forcast() if self.saved_average_hours is None else None
+
+    def get_saved_average_hours(self):
+        """Returns the average of the saved daily light hours of the plant's light source for the days after the
+        water date, or None if there are no saved light hours or any of the days are missing."""
+
+        if self.light_exposure:
+            water_date = self.water_schedule.water_date
+            first_date = date(water_date.year, water_date.month, water_date.day) + timedelta(days=1)
+
+            return self.light_exposure.get_average_hours(
+                self.water_schedule.plant_id, first_date, self.water_schedule.water_interval)
 
     def get_light_forcast(self):
         """Get the light forcast from the solar calculator.
         Uses the user's location, current date, water interval (days between water frequency),
         and the light type to calculate the maximum light potential for each day.
 
+        The forcast is for the center of the user's solar cell, so users in the same cell share the solar data.
+
         If the light forcast fails to populate raise an error."""
 
         calculator = SolarCalculator(
-            user_location=self.user.get_coordinates,
+            user_location=self.user.get_cell_coordinates,
             current_date=self.water_schedule.water_date,
             water_interval=self.water_schedule.water_interval,
-            light_type=self.light_type
+            light_type=self.light_type,
+            cache=self.solar_cache
         )
 
-        light_forcast = calculator.get_daily_sunlight()
+        if self.light_exposure:
+            light_forcast = self.get_incremental_light_forcast(calculator)
+        else:
+            light_forcast = calculator.get_daily_sunlight(sample_every=SOLAR_SAMPLE_EVERY)
 
         if (light_forcast):
             return light_forcast
         raise ConnectionRefusedError
 
+    def get_incremental_light_forcast(self, calculator):
+        """Returns the light forcast for every date in the water interval, reusing the saved daily light hours of the
+        plant's light source and only forcasting the dates that are not saved. The forcast dates that were evaluated
+        with the primary solar providers are saved, interpolated dates and fallback estimates are forcast again by the
+        next watering.
+
+        Consecutive waterings mostly overlap, so a watering usually only forcasts the few days after the previous
+        forcast ended."""
+
+        dates = calculator.generate_dates()
+        days = [date(day.year, day.month, day.day) for day in dates]
+        saved_hours = self.light_exposure.get_hours(self.water_schedule.plant_id, days[0], len(days)) if days else {}
+
+        missing = [i for i, day in enumerate(days) if day not in saved_hours]
+        if len(missing) == len(days):
+            forcast = calculator.get_daily_sunlight(sample_every=SOLAR_SAMPLE_EVERY)
+        else:
+            forcast = calculator.get_daily_sunlight_for_dates([dates[i] for i in missing]) if missing else []
+
+        if missing and not forcast:
+            return []
+
+        hours = {days[i]: light.total_seconds() / 3600 for i, light in zip(missing, forcast)
+                 if calculator.is_primary_data(dates[i])}
+        if hours:
+            self.light_exposure.save_plant_hours(self.water_schedule.plant_id, hours)
+
+        light_forcast = [timedelta(hours=saved_hours[day]) if day in saved_hours else None
+                         for day in days]
+        for i, light in zip(missing, forcast):
+            light_forcast[i] = light
+
+        return light_forcast
+
     def convert_timedelta_to_float(self, time_delta):
         """Accepts a datetime.timedelta object, extracts the minutes and microseconds,
         then converts the total minutes and microseconds to hours.
@@ -75,7 +132,10 @@ class WaterCalculator:
         new_water_interval = self.water_schedule.water_interval
 
         # compare the average hours with the optimal hours and adjust accordingly given the respective thresholds
-        average_hours = self.calculate_average_hours(self.light_forcast)
+        if self.saved_average_hours is not None:
+            average_hours = self.saved_average_hours
+        else:
+            average_hours = self.calculate_average_hours(self.light_forcast)
 
         res = average_hours - base_light
         adjustment = 0